@@ -1,182 +1,72 @@
-
-import sys, os, json, uuid
-from typing import Optional, Dict, Any, List
+import os, sys, time, threading
+_STARTED = time.perf_counter()
+import importlib.util
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QListWidget, QListWidgetItem, QPushButton,
+    QApplication, QMainWindow, QWidget, QListView, QPushButton,
     QHBoxLayout, QVBoxLayout, QSplitter, QInputDialog, QMessageBox, QTextEdit,
-    QLineEdit, QDialog, QDialogButtonBox, QLabel, QSystemTrayIcon, QMenu
+    QLineEdit, QDialog, QDialogButtonBox, QLabel, QSystemTrayIcon, QMenu, QFormLayout,
+    QPlainTextEdit, QCheckBox, QFileDialog, QProgressDialog
 )
-from PyQt6.QtGui import QIcon, QPixmap, QPainter, QColor, QAction
-from PyQt6.QtCore import Qt, QEvent
-
-# Try to import keyboard for global hotkeys.
+from PyQt6.QtGui import QIcon, QPixmap, QAction, QFontDatabase, QCursor, QKeySequence
+from PyQt6.QtCore import Qt, QEvent, QAbstractListModel, QModelIndex, QTimer, QByteArray, pyqtSignal
+
+from store import SettingsStore, open_template_store, ensure_default_files, resource_path, SETTINGS_FILE
+from daemon import send_command, daemon_port
+from dispatch import PasteRequest, queue_from_settings
+from paste import KeyboardHooks, engine_from_settings
+from placeholders import PlaceholderCache, default_builtins
+from profiling import PROFILER, LOG_FILE, PhaseTimer, profiled, configure_from_settings, nearest_rank
+from bulk import Cancelled, import_file, export_file
+from hotkeys import HotkeyManager, build_table, normalize_combo, combo_label
+from usage import USAGE_FILE, usage_from_settings, rank_templates
+from history import UndoHistory, AddCategory, RenameCategory, DeleteCategory, AddTemplate, EditTemplate, DeleteTemplate
+from dedup import NEAR_THRESHOLD, format_report
+from sync import STATE_FILE as SYNC_STATE_FILE, client_from_settings
+
+# keyboard (global hotkeys) is imported after the window is up, see load_keyboard().
 # If not available, the app still works without global hotkeys.
-try:
-    import keyboard  # pip install keyboard
-    KEYBOARD_AVAILABLE = True
-except Exception as e:
-    KEYBOARD_AVAILABLE = False
+keyboard = None
+KEYBOARD_AVAILABLE = importlib.util.find_spec("keyboard") is not None
 
-APP_NAME = "Şablon Yöneticisi"
-DATA_FILE = "templates.json"
-SETTINGS_FILE = "settings.json"
-
-def resource_path(relative_path: str) -> str:
-    # Resolve path to be compatible both in dev and PyInstaller bundle
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(os.path.dirname(__file__))
-    return os.path.join(base_path, relative_path)
-
-def ensure_default_files():
-    # Create default templates.json and settings.json if missing
-    data_path = resource_path(DATA_FILE)
-    settings_path = resource_path(SETTINGS_FILE)
-
-    if not os.path.exists(data_path):
-        sample = {
-            "categories": [
-                {
-                    "name": "İptal",
-                    "templates": [
-                        {"id": str(uuid.uuid4()), "title": "Üyelik İptal 1",
-                         "text": "Merhaba, talebiniz üzerine üyelik iptal işleminiz gerçekleştirildi. Herhangi bir sorunuz olursa yardımcı olmaktan memnuniyet duyarız."},
-                        {"id": str(uuid.uuid4()), "title": "Sipariş İptal 1",
-                         "text": "Bilgilendirme: İlgili sipariş iptal edilmiştir. Ücret iade süreci bankanıza bağlı olarak 1-7 iş günü içinde tamamlanacaktır."}
-                    ]
-                },
-                {
-                    "name": "Şikayet",
-                    "templates": [
-                        {"id": str(uuid.uuid4()), "title": "Kargo Gecikme Yanıtı",
-                         "text": "Yaşanan gecikme için üzgünüz. Kargo sürecini hızlandırmak adına ilgili birimle görüştük; en kısa sürede teslim edilecektir."}
-                    ]
-                },
-                {
-                    "name": "Özür",
-                    "templates": [
-                        {"id": str(uuid.uuid4()), "title": "Genel Özür",
-                         "text": "Yaşadığınız olumsuz deneyim için içtenlikle özür dileriz. Size daha iyi hizmet verebilmek için gerekli aksiyonları alıyoruz."}
-                    ]
-                }
-            ]
-        }
-        with open(data_path, "w", encoding="utf-8") as f:
-            json.dump(sample, f, ensure_ascii=False, indent=2)
-
-    if not os.path.exists(settings_path):
-        defaults = {
-            "hotkeys": {
-                # You can assign a template id to these hotkeys via UI (sağ tık -> kısayol ata).
-                "ctrl+shift+t": None,
-                "ctrl+shift+q": None
-            },
-            "auto_paste_on_click": True,
-            "minimize_to_tray_on_close": True
-        }
-        with open(settings_path, "w", encoding="utf-8") as f:
-            json.dump(defaults, f, ensure_ascii=False, indent=2)
-
-class TemplateStore:
-    def __init__(self, data_file: str):
-        self.data_file = resource_path(data_file)
-        self.data: Dict[str, Any] = {"categories": []}
-        self.load()
-
-    def load(self):
+def load_keyboard() -> bool:
+    global keyboard, KEYBOARD_AVAILABLE
+    if keyboard is None and KEYBOARD_AVAILABLE:
         try:
-            with open(self.data_file, "r", encoding="utf-8") as f:
-                self.data = json.load(f)
-            # normalize
-            if "categories" not in self.data or not isinstance(self.data["categories"], list):
-                self.data["categories"] = []
+            import keyboard as kb  # pip install keyboard
+            keyboard = kb
         except Exception:
-            self.data = {"categories": []}
-
-    def save(self):
-        try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print("Save error:", e)
-
-    # --- Category ops ---
-    def list_categories(self) -> List[Dict[str, Any]]:
-        return self.data["categories"]
-
-    def add_category(self, name: str):
-        self.data["categories"].append({"name": name, "templates": []})
-        self.save()
-
-    def rename_category(self, index: int, new_name: str):
-        self.data["categories"][index]["name"] = new_name
-        self.save()
-
-    def delete_category(self, index: int):
-        del self.data["categories"][index]
-        self.save()
+            KEYBOARD_AVAILABLE = False
+    return KEYBOARD_AVAILABLE
 
-    # --- Template ops ---
-    def list_templates(self, cat_index: int) -> List[Dict[str, Any]]:
-        return self.data["categories"][cat_index]["templates"]
-
-    def add_template(self, cat_index: int, title: str, text: str) -> str:
-        tid = str(uuid.uuid4())
-        self.data["categories"][cat_index]["templates"].append({"id": tid, "title": title, "text": text})
-        self.save()
-        return tid
-
-    def edit_template(self, cat_index: int, tpl_index: int, title: str, text: str):
-        self.data["categories"][cat_index]["templates"][tpl_index]["title"] = title
-        self.data["categories"][cat_index]["templates"][tpl_index]["text"] = text
-        self.save()
-
-    def delete_template(self, cat_index: int, tpl_index: int):
-        del self.data["categories"][cat_index]["templates"][tpl_index]
-        self.save()
-
-    def get_template_by_id(self, template_id: str) -> Optional[Dict[str, Any]]:
-        for c in self.data["categories"]:
-            for t in c["templates"]:
-                if t.get("id") == template_id:
-                    return t
-        return None
-
-class SettingsStore:
-    def __init__(self, settings_file: str):
-        self.settings_file = resource_path(settings_file)
-        self.settings: Dict[str, Any] = {}
-        self.load()
-
-    def load(self):
-        try:
-            with open(self.settings_file, "r", encoding="utf-8") as f:
-                self.settings = json.load(f)
-        except Exception:
-            self.settings = {"hotkeys": {}, "auto_paste_on_click": True, "minimize_to_tray_on_close": True}
-
-    def save(self):
-        try:
-            with open(self.settings_file, "w", encoding="utf-8") as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print("Settings save error:", e)
-
-    def get_hotkey_target(self, combo: str) -> Optional[str]:
-        return self.settings.get("hotkeys", {}).get(combo)
+APP_NAME = "Şablon Yöneticisi"
+SEARCH_LIMIT = 200
+# Quick palette (PaletteWindow): default hotkey ("palette_hotkey" in
+# settings.json, null = none), rows shown, and the hotkey table's target for it
+PALETTE_HOTKEY = "ctrl+shift+space"
+PALETTE_ROWS = 50
+PALETTE_TARGET = "<palette>"
+# Import/export file dialogs (see bulk.py)
+BULK_FILE_FILTER = "CSV veya JSON Lines (*.csv *.jsonl);;Tüm dosyalar (*)"
+# 64x64 tray icon (blue square with a white "T"), prebuilt so startup needn't paint it
+TRAY_ICON_PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAEAAAABACAIAAAAlC+aJAAAAXklEQVR42u3ZwQ0AIAgDQBZyUKdlBF1CJcQjHaD36oMYM1snAAAAAAAA"
+    "vgKs+wcAAAAAAFC7xKfKAQAAAAAAAAAAAAAAAAAAAAAAAAB0AnizAgAAAAAAAAAAAAC8yAZZDTNsBUP3+gAAAABJRU5ErkJggg=="
+)
 
-    def set_hotkey_target(self, combo: str, template_id: Optional[str]):
-        self.settings.setdefault("hotkeys", {})
-        self.settings["hotkeys"][combo] = template_id
-        self.save()
+# Startup phase timings; printed with --startup-report or SABLON_STARTUP_REPORT=1
+STARTUP = PhaseTimer(_STARTED)
+STARTUP.mark("imports")
 
-    def auto_paste_on_click(self) -> bool:
-        return bool(self.settings.get("auto_paste_on_click", True))
+class QtClipboard:
+    # paste.PasteEngine clipboard adapter; None when the clipboard holds no text
+    def get_text(self) -> Optional[str]:
+        cb = QApplication.clipboard()
+        return cb.text() if cb.mimeData().hasText() else None
 
-    def set_auto_paste_on_click(self, value: bool):
-        self.settings["auto_paste_on_click"] = bool(value)
-        self.save()
+    def set_text(self, text: str):
+        QApplication.clipboard().setText(text)
 
 class TemplateDialog(QDialog):
     def __init__(self, parent=None, title="Şablon", init_title="", init_text=""):
@@ -208,18 +98,443 @@ class TemplateDialog(QDialog):
     def get_values(self):
         return self.title_edit.text().strip(), self.text_edit.toPlainText()
 
+class FillInDialog(QDialog):
+    # One line per template variable ({musteri_adi} ...), prefilled with the last values
+    def __init__(self, names, last_values: Dict[str, str], parent=None, title="Değişkenler"):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setModal(True)
+        self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, True)
+
+        form_layout = QFormLayout()
+        self.edits: Dict[str, QLineEdit] = {}
+        for name in names:
+            edit = QLineEdit(self)
+            edit.setText(last_values.get(name, ""))
+            edit.selectAll()
+            form_layout.addRow(name.replace("_", " ") + ":", edit)
+            self.edits[name] = edit
+
+        btn_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel, parent=self)
+        btn_box.accepted.connect(self.accept)
+        btn_box.rejected.connect(self.reject)
+
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(form_layout)
+        main_layout.addWidget(btn_box)
+        self.setLayout(main_layout)
+
+    def get_values(self) -> Dict[str, str]:
+        return {name: edit.text() for name, edit in self.edits.items()}
+
+class CategoryListModel(QAbstractListModel):
+    # Category names straight from the store. Mutations go through the model
+    # so views get targeted insert/change/remove signals instead of a reset.
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._cats = store.list_categories() if store is not None else []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cats)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._cats):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._cats[index.row()]["name"]
+        return None
+
+    def reload(self):
+        self.beginResetModel()
+        self._cats = self.store.list_categories() if self.store is not None else []
+        self.endResetModel()
+
+    def add_category(self, name: str):
+        row = len(self._cats)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.add_category(name)
+        self._cats = self.store.list_categories()
+        self.endInsertRows()
+
+    def rename_category(self, row: int, name: str):
+        self.store.rename_category(row, name)
+        self._cats = self.store.list_categories()
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DisplayRole])
+
+    def delete_category(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.store.delete_category(row)
+        self._cats = self.store.list_categories()
+        self.endRemoveRows()
+
+class TemplateListModel(QAbstractListModel):
+    # Titles of one category, or of search results across all categories.
+    # Rows are only rendered when the view asks for them.
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.cat_row = -1
+        self.query = ""
+        self._rows: List[Dict[str, Any]] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        tpl = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if self.query:
+                cat = self.store.get_category_of(tpl["id"])
+                return f"{tpl['title']}  [{cat['name']}]" if cat else tpl["title"]
+            return tpl["title"]
+        if role == Qt.ItemDataRole.UserRole:
+            return tpl["id"]
+        return None
+
+    def template_id(self, row: int) -> Optional[str]:
+        return self._rows[row]["id"] if 0 <= row < len(self._rows) else None
+
+    def row_of(self, template_id: str) -> int:
+        for row, tpl in enumerate(self._rows):
+            if tpl["id"] == template_id:
+                return row
+        return -1
+
+    def _fetch(self):
+        if self.store is None:
+            # Library still loading (fast start)
+            self._rows = []
+        elif self.query:
+            self._rows = self.store.search(self.query, SEARCH_LIMIT)
+        elif 0 <= self.cat_row < len(self.store.list_categories()):
+            # TemplateStore hands out its live list, so this costs nothing;
+            # SQLite reads only ids and titles (texts via get_template_by_id)
+            list_titles = getattr(self.store, "list_titles", None)
+            self._rows = (list_titles or self.store.list_templates)(self.cat_row)
+        else:
+            self._rows = []
+
+    def show_category(self, cat_row: int, query: str = ""):
+        self.beginResetModel()
+        self.cat_row = cat_row
+        self.query = query.strip()
+        self._fetch()
+        self.endResetModel()
+
+    def add_template(self, title: str, text: str) -> str:
+        if self.query:
+            # The new template may or may not match; re-run the search
+            tid = self.store.add_template(self.cat_row, title, text)
+            self.show_category(self.cat_row, self.query)
+            return tid
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        tid = self.store.add_template(self.cat_row, title, text)
+        self._fetch()
+        self.endInsertRows()
+        return tid
+
+    def edit_template(self, row: int, title: str, text: str):
+        tid = self._rows[row]["id"]
+        pos = self.store.find_template(tid)
+        if pos is None:
+            return
+        self.store.edit_template(pos[0], pos[1], title, text)
+        # Stores that hand out copies (SQLite) need the row re-read
+        fresh = self.store.get_template_by_id(tid)
+        if fresh is not None and fresh is not self._rows[row]:
+            self._rows[row] = {"id": tid, "title": fresh["title"]}
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DisplayRole])
+
+    def templates_changed(self, template_ids: List[str]):
+        # Edited in place by another instance: repaint just those rows
+        wanted = set(template_ids)
+        for row, tpl in enumerate(self._rows):
+            if tpl["id"] in wanted:
+                idx = self.index(row)
+                self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DisplayRole])
+
+    def delete_template(self, row: int):
+        pos = self.store.find_template(self._rows[row]["id"])
+        if pos is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.store.delete_template(*pos)
+        if self.query:
+            del self._rows[row]
+        else:
+            self._fetch()
+        self.endRemoveRows()
+
+class StatsDialog(QDialog):
+    # Live view of the profiler (profiling.py) and the hotkey dispatch queue
+    def __init__(self, window: "MainWindow"):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("Performans istatistikleri")
+        self.resize(640, 480)
+
+        self.enabled_box = QCheckBox("Ölçüm kaydı açık (perf.jsonl)", self)
+        self.enabled_box.setChecked(PROFILER.enabled)
+        self.enabled_box.toggled.connect(self.on_toggled)
+        self.view = QPlainTextEdit(self)
+        self.view.setReadOnly(True)
+        self.view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        btn_reset = QPushButton("Sıfırla", self)
+        btn_reset.clicked.connect(self.on_reset)
+
+        top = QHBoxLayout()
+        top.addWidget(self.enabled_box)
+        top.addStretch(1)
+        top.addWidget(btn_reset)
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(top)
+        main_layout.addWidget(self.view)
+        self.setLayout(main_layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def on_toggled(self, checked: bool):
+        self.window.settings.settings["profiling"] = checked
+        self.window.settings.save()
+        configure_from_settings(self.window.settings.settings, resource_path(LOG_FILE))
+        self.refresh()
+
+    def on_reset(self):
+        PROFILER.reset()
+        self.refresh()
+
+    def refresh(self):
+        win = self.window
+        queue = win.hotkey_queue.report()
+        lines = ["Kısayol → yapıştırma", win.hotkey_queue.stats.summary(),
+                 f"atlanan: {queue['dropped']}, birleştirilen: {queue['merged']}, bekleyen: {queue['pending']}", "",
+                 "Hızlı seçim penceresi: tuş → görünür", win.palette.latency_summary() if win.palette else "kapalı", "",
+                 f"Kayıt: birleştirilen kaydetme {getattr(win.store, 'collapsed_saves', 0)}, "
+                 f"yapıştırılan {win.paste_engine.pasted}, geri yüklenen pano {win.paste_engine.restored}", "",
+                 "Eşitleme: " + (win.sync_client.summary() if win.sync_client else "kapalı"), "",
+                 STARTUP.report(), ""]
+        if PROFILER.enabled:
+            lines.append(PROFILER.summary())
+        else:
+            lines.append("Ölçüm kapalı. Depolama, yenileme ve yapıştırma sürelerini görmek için yukarıdan açın.")
+        self.view.setPlainText("\n".join(lines))
+
+class DuplicatesDialog(QDialog):
+    # Exact and near-duplicate templates across the library (dedup.py)
+    def __init__(self, window: "MainWindow"):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("Yinelenen şablonlar")
+        self.resize(640, 480)
+
+        self.view = QPlainTextEdit(self)
+        self.view.setReadOnly(True)
+        self.view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        btn_refresh = QPushButton("Yenile", self)
+        btn_refresh.clicked.connect(self.refresh)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Her grubun ilk şablonu tutulacak olan, diğerleri ona birleştirilebilir.", self))
+        top.addStretch(1)
+        top.addWidget(btn_refresh)
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(top)
+        main_layout.addWidget(self.view)
+        self.setLayout(main_layout)
+        self.refresh()
+
+    def refresh(self):
+        store = self.window.store
+        threshold = self.window.duplicate_threshold()
+        exact, near = store.duplicate_groups(threshold)
+        self.view.setPlainText(format_report(store, exact, near, threshold))
+
+class PaletteModel(QAbstractListModel):
+    # Palette rows (usage.rank_templates): "title  [category]"
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self._rows: List[Dict[str, Any]] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        tpl = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            cat = self.store.get_category_of(tpl["id"])
+            return f"{tpl['title']}  [{cat['name']}]" if cat else tpl["title"]
+        if role == Qt.ItemDataRole.UserRole:
+            return tpl["id"]
+        return None
+
+    def set_rows(self, rows: List[Dict[str, Any]]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+class PaletteWindow(QWidget):
+    # Frameless type-to-filter list of templates, opened by the palette
+    # hotkey. Built and laid out once (prewarm()), then only shown and hidden,
+    # so opening it costs a row refresh and a paint. Enter emits `picked`
+    picked = pyqtSignal(str)
+
+    def __init__(self, window: "MainWindow"):
+        super().__init__(None, Qt.WindowType.Tool | Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
+        self.window = window
+        self.setWindowTitle(APP_NAME)
+        self.resize(560, 380)
+
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Şablon ara... (Enter: yapıştır, Esc: kapat)")
+        self.model = PaletteModel(self)
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(6, 6, 6, 6)
+        main_layout.addWidget(self.search_edit)
+        main_layout.addWidget(self.list_view)
+        self.setLayout(main_layout)
+
+        self.search_edit.textChanged.connect(self.refresh)
+        self.search_edit.installEventFilter(self)
+        self.list_view.doubleClicked.connect(lambda index: self.pick(index.row()))
+        # Key press (hook thread stamp) -> first paint, in ms
+        self.show_ms: deque = deque(maxlen=256)
+        self._t_key: Optional[float] = None
+
+    def prewarm(self):
+        # Create the native window, polish and lay it out off screen
+        self.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen, True)
+        self.show()
+        self.hide()
+        self.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen, False)
+
+    def popup(self, t_key: Optional[float] = None):
+        if self.window.store is None:
+            return
+        self._t_key = time.perf_counter() if t_key is None else t_key
+        if self.search_edit.text():
+            self.search_edit.clear()
+        else:
+            self.refresh()
+        screen = QApplication.screenAt(QCursor.pos()) or QApplication.primaryScreen()
+        area = screen.availableGeometry()
+        self.move(area.center().x() - self.width() // 2, area.top() + area.height() // 4)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.search_edit.setFocus()
+
+    @profiled("palette.refresh", log=False)
+    def refresh(self, *_):
+        self.model.store = self.window.store
+        self.model.set_rows(rank_templates(self.window.store, self.window.usage, self.search_edit.text(), PALETTE_ROWS))
+        if self.model.rowCount():
+            self.list_view.setCurrentIndex(self.model.index(0))
+
+    def pick(self, row: int):
+        tpl_id = self.model.data(self.model.index(row), Qt.ItemDataRole.UserRole)
+        # Hide first: focus goes back to the window the text is pasted into
+        self.hide()
+        if tpl_id:
+            self.picked.emit(tpl_id)
+
+    def eventFilter(self, obj, event):
+        if obj is self.search_edit and event.type() == QEvent.Type.KeyPress:
+            key = event.key()
+            if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+                self.pick(self.list_view.currentIndex().row())
+                return True
+            if key == Qt.Key.Key_Escape:
+                self.hide()
+                return True
+            if key in (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+                # Arrows move in the list while typing continues in the box
+                QApplication.sendEvent(self.list_view, event)
+                return True
+        return super().eventFilter(obj, event)
+
+    def changeEvent(self, event):
+        # Clicking elsewhere closes it
+        if event.type() == QEvent.Type.ActivationChange and not self.isActiveWindow() and self.isVisible():
+            self.hide()
+        super().changeEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._t_key is not None:
+            ms = (time.perf_counter() - self._t_key) * 1000.0
+            self._t_key = None
+            self.show_ms.append(ms)
+            PROFILER.record("palette.show", ms)
+
+    def latency_summary(self) -> str:
+        if not self.show_ms:
+            return "Henüz ölçüm yok."
+        ordered = sorted(self.show_ms)
+        p50, p99 = nearest_rank(ordered, 50), nearest_rank(ordered, 99)
+        return f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, en fazla {ordered[-1]:.1f} ms (n={len(ordered)})"
+
 class MainWindow(QMainWindow):
+    # Emitted from the keyboard hook thread; delivered queued on the GUI thread
+    hotkey_ready = pyqtSignal()
+    # Palette hotkey, with the perf_counter() of the key press
+    palette_requested = pyqtSignal(float)
+    # A sync round's network step finished (on its worker thread)
+    sync_done = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(APP_NAME)
         self.resize(980, 600)
 
-        self.store = TemplateStore(DATA_FILE)
         self.settings = SettingsStore(SETTINGS_FILE)
+        configure_from_settings(self.settings.settings, resource_path(LOG_FILE))
+        STARTUP.mark("settings")
+        # Tray icon first, it is what users look for right after login
+        self.build_tray_icon()
+        STARTUP.mark("tray_icon")
+        # The library is opened in finish_startup(), by default after the window is shown
+        self.store = None
+        # When the headless hotkey daemon (daemon.py) runs, it owns the global
+        # hotkeys and is told to reload whenever we write a file
+        self.daemon_port = daemon_port(self.settings)
+        self.daemon_running = False
+        self.settings.set_save_listener(self.notify_daemon)
+        # Template uses for the palette's frecency ranking, written in batches
+        self.usage = usage_from_settings(self.settings.settings, resource_path(USAGE_FILE))
+        # Built and prewarmed once the library is loaded (finish_startup)
+        self.palette: Optional[PaletteWindow] = None
+        self.palette_requested.connect(self.show_palette)
 
         # Build UI
-        self.category_list = QListWidget(self)
-        self.template_list = QListWidget(self)
+        self.category_model = CategoryListModel(self.store, self)
+        self.template_model = TemplateListModel(self.store, self)
+        self.category_list = QListView(self)
+        self.category_list.setModel(self.category_model)
+        self.template_list = QListView(self)
+        self.template_list.setModel(self.template_model)
+        # Rows are laid out lazily; equal heights let the view skip measuring them
+        self.category_list.setUniformItemSizes(True)
+        self.template_list.setUniformItemSizes(True)
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Tüm şablonlarda ara...")
+        self.search_edit.setClearButtonEnabled(True)
 
         # Buttons
         self.btn_add_cat = QPushButton("Kategori Ekle")
@@ -241,6 +556,7 @@ class MainWindow(QMainWindow):
         left_widget.setLayout(left_layout)
 
         right_layout = QVBoxLayout()
+        right_layout.addWidget(self.search_edit)
         right_layout.addWidget(QLabel("Şablonlar"))
         right_layout.addWidget(self.template_list)
         right_layout.addWidget(self.btn_add_tpl)
@@ -267,14 +583,36 @@ class MainWindow(QMainWindow):
         central.setLayout(central_layout)
         self.setCentralWidget(central)
 
+        file_menu = self.menuBar().addMenu("Dosya")
+        file_menu.addAction(QAction("İçe aktar (CSV / JSONL)...", self, triggered=self.import_templates))
+        file_menu.addAction(QAction("Dışa aktar (CSV / JSONL)...", self, triggered=self.export_templates))
+        file_menu.addSeparator()
+        file_menu.addAction(QAction("Yinelenen şablonlar...", self, triggered=self.show_duplicates))
+        self.act_sync = QAction("Şimdi eşitle", self, triggered=lambda: self.sync_now(manual=True))
+        self.act_sync.setEnabled(False)
+        file_menu.addAction(self.act_sync)
+        # Undo/redo of category and template operations (see history.py)
+        self.history = UndoHistory(int(self.settings.settings.get("undo_depth", 100)))
+        edit_menu = self.menuBar().addMenu("Düzen")
+        self.act_undo = QAction("Geri al", self, triggered=self.undo)
+        self.act_undo.setShortcuts([QKeySequence(QKeySequence.StandardKey.Undo)])
+        self.act_redo = QAction("Yinele", self, triggered=self.redo)
+        self.act_redo.setShortcuts([QKeySequence("Ctrl+Y"), QKeySequence(QKeySequence.StandardKey.Redo)])
+        edit_menu.addAction(self.act_undo)
+        edit_menu.addAction(self.act_redo)
+        self.update_undo_actions()
+
         # Context menu for template list
         self.template_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.template_list.customContextMenuRequested.connect(self.on_template_context_menu)
 
         # Connect signals
-        self.category_list.currentRowChanged.connect(self.refresh_templates)
-        self.template_list.itemDoubleClicked.connect(self.on_template_double_clicked)
-        self.template_list.currentItemChanged.connect(self.on_template_selected)
+        self.category_list.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.on_category_changed(current.row()))
+        self.search_edit.textChanged.connect(self.on_search_changed)
+        self.template_list.doubleClicked.connect(self.on_template_double_clicked)
+        self.template_list.selectionModel().currentChanged.connect(self.on_template_selected)
+        self.template_model.modelReset.connect(self.preview_edit.clear)
 
         self.btn_add_cat.clicked.connect(self.add_category)
         self.btn_ren_cat.clicked.connect(self.rename_category)
@@ -284,33 +622,100 @@ class MainWindow(QMainWindow):
         self.btn_edit_tpl.clicked.connect(self.edit_template)
         self.btn_del_tpl.clicked.connect(self.delete_template)
 
-        self.build_tray_icon()
+        # Global hotkeys (registered in start_hotkeys); their callbacks only
+        # enqueue, the GUI thread pastes
+        self.hotkeys = HotkeyManager(KeyboardHooks(), self.on_hotkey)
+        self.paste_engine = engine_from_settings(self.settings.settings, QtClipboard(),
+                                                 KeyboardHooks() if KEYBOARD_AVAILABLE else None,
+                                                 schedule=lambda delay, cb: QTimer.singleShot(int(delay * 1000), cb))
+        # Compiled {değişken} templates, and the values computed at paste time
+        self.placeholders = PlaceholderCache()
+        self.builtins = default_builtins(QtClipboard().get_text)
+        self.hotkey_queue = queue_from_settings(self.settings.settings, on_ready=self.hotkey_ready.emit)
+        self.hotkey_ready.connect(self.drain_hotkeys)
+        self._draining = False
+        self.stats_dialog: Optional[StatsDialog] = None
+        # templates.json shared with other instances: a stat() per tick,
+        # changes are merged in by id (see shared.py)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(max(250, int(self.settings.settings.get("watch_interval_ms", 2000))))
+        self.watch_timer.timeout.connect(self.check_shared_file)
+        # Team library on a sync server (sync.py, settings.json "sync_server")
+        self.sync_client = None
+        self.sync_interval = max(500, int(self.settings.settings.get("sync_interval_ms", 5000)))
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(self.sync_interval)
+        self.sync_timer.timeout.connect(self.sync_now)
+        # The round in flight: its network step runs on sync_thread, which
+        # leaves (reply, error) in sync_outcome for finish_sync
+        self.sync_thread: Optional[threading.Thread] = None
+        self.sync_outcome: Optional[Tuple[Any, Any]] = None
+        self.sync_manual = False
+        # Last error reported, so a server that stays down is printed once
+        self.sync_error: Optional[str] = None
+        self.sync_done.connect(self.finish_sync)
+
+        central.setEnabled(False)
+        STARTUP.mark("ui")
+        if self.settings.settings.get("fast_start", True):
+            # Let the (empty) window paint first, then load the library
+            QTimer.singleShot(0, self.finish_startup)
+        else:
+            self.finish_startup()
+
+    def finish_startup(self):
+        self.store = open_template_store(self.settings)
+        self.store.set_save_listener(self.notify_daemon)
+        STARTUP.mark("library")
+        self.category_model.store = self.store
+        self.template_model.store = self.store
         self.refresh_categories()
-
-        # Register global hotkeys
-        self.hotkey_handles = []
+        self.centralWidget().setEnabled(True)
+        if getattr(self.store, "shared", None) is not None:
+            self.watch_timer.start()
+        self.sync_client = client_from_settings(self.settings.settings, self.store, resource_path(SYNC_STATE_FILE))
+        if self.sync_client is not None:
+            self.act_sync.setEnabled(True)
+            self.sync_timer.start()
+            QTimer.singleShot(0, self.sync_now)
+        STARTUP.mark("lists")
+        self.palette = PaletteWindow(self)
+        self.palette.picked.connect(self.on_palette_picked)
+        self.palette.prewarm()
+        STARTUP.mark("palette")
+        # Hotkeys come last: importing keyboard and hooking the OS is slow
+        QTimer.singleShot(0, self.start_hotkeys)
+
+    def start_hotkeys(self):
+        self.daemon_running = send_command("ping", self.daemon_port) is not None
+        if not self.daemon_running and not load_keyboard():
+            self.paste_engine.keyboard = None
+            # Inform user once about missing keyboard module (without blocking startup)
+            box = QMessageBox(QMessageBox.Icon.Information, "Bilgi",
+                              "Global kısayollar için 'keyboard' modülü bulunamadı.\n"
+                              "Kısayolları kullanmak isterseniz:\n\n"
+                              "    pip install keyboard\n\n"
+                              "komutunu çalıştırın (Windows'ta yönetici izni gerekebilir).", parent=self)
+            box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            box.show()
         self.register_hotkeys()
-
-    def on_template_selected(self, current, previous):
-        if current:
-            # Şablonun metnini al
-            template_text = current.data(256)  # Qt.UserRole için 256 kullanıyoruz
-            self.template_text.setPlainText(template_text)
+        STARTUP.mark("hotkeys")
+        if "--startup-report" in sys.argv or os.environ.get("SABLON_STARTUP_REPORT") == "1":
+            print(STARTUP.report())
+
+    def on_template_selected(self, current: QModelIndex, previous: QModelIndex):
+        tpl = self.store.get_template_by_id(current.data(Qt.ItemDataRole.UserRole)) if current.isValid() else None
+        if tpl:
+            # Şablonun metnini önizlemede göster
+            self.preview_edit.setPlainText(tpl["text"])
         else:
-            self.template_text.clear()
+            self.preview_edit.clear()
 
     # ---------- System Tray ----------
     def build_tray_icon(self):
-        # Create a simple icon programmatically
-        pm = QPixmap(64, 64)
-        pm.fill(QColor("#2d89ef"))
-        painter = QPainter(pm)
-        painter.setPen(Qt.GlobalColor.white)
-        painter.setBrush(Qt.GlobalColor.white)
-        # Draw a simple "T" for Templates
-        painter.drawRect(28, 10, 8, 36)  # vertical bar
-        painter.drawRect(16, 10, 32, 8)  # top bar
-        painter.end()
+        # A simple "T" for Templates
+        pm = QPixmap()
+        pm.loadFromData(QByteArray.fromBase64(TRAY_ICON_PNG.encode("ascii")), "PNG")
 
         icon = QIcon(pm)
         self.setWindowIcon(icon)
@@ -319,8 +724,12 @@ class MainWindow(QMainWindow):
             self.tray = QSystemTrayIcon(icon, self)
             menu = QMenu()
             act_show = QAction("Göster", self, triggered=self.show_normal_from_tray)
+            act_palette = QAction("Hızlı seçim", self, triggered=lambda: self.show_palette())
+            act_stats = QAction("Performans istatistikleri", self, triggered=self.show_stats)
             act_quit = QAction("Çıkış", self, triggered=self.quit_app)
             menu.addAction(act_show)
+            menu.addAction(act_palette)
+            menu.addAction(act_stats)
             menu.addSeparator()
             menu.addAction(act_quit)
             self.tray.setContextMenu(menu)
@@ -336,8 +745,37 @@ class MainWindow(QMainWindow):
 
     def quit_app(self):
         self.unregister_hotkeys()
+        self.flush_stores()
         QApplication.quit()
 
+    def flush_stores(self):
+        # Write out any pending (write-behind) changes before exiting; the
+        # templates file is left as a full snapshot so it can be copied around
+        if self.store is not None:
+            if getattr(self.store, "shared", None) is not None:
+                # Don't leave changes made elsewhere unmerged (our write would wait for them)
+                self.store.sync_external()
+            if self.sync_client is not None:
+                self.sync_timer.stop()
+                if self.sync_thread is not None:
+                    # Let the round in flight land first
+                    self.sync_thread.join(self.sync_client.timeout * 4 + 1)
+                if self.sync_thread is None or not self.sync_thread.is_alive():
+                    outcome, self.sync_outcome, self.sync_thread = self.sync_outcome, None, None
+                    try:
+                        if outcome is not None and outcome[0] is not None:
+                            self.sync_client.finish(outcome[0])
+                        self.sync_client.sync()
+                    except Exception:
+                        pass
+                    self.sync_client.close()
+                # Whatever could not be sent goes next time
+                self.sync_client.save_state()
+            self.store.compact()
+        self.settings.flush()
+        self.usage.flush()
+        PROFILER.close_log()
+
     def closeEvent(self, event):
         # Minimize to tray if enabled
         if self.settings.settings.get("minimize_to_tray_on_close", True) and self.tray:
@@ -347,24 +785,201 @@ class MainWindow(QMainWindow):
                 self.tray.showMessage(APP_NAME, "Arka planda çalışmaya devam ediyor.", QSystemTrayIcon.MessageIcon.Information, 2500)
         else:
             self.unregister_hotkeys()
+            self.flush_stores()
             event.accept()
 
     # ---------- Data/UI ----------
+    @profiled("ui.refresh_categories")
     def refresh_categories(self):
-        self.category_list.clear()
-        for cat in self.store.list_categories():
-            self.category_list.addItem(cat["name"])
-        if self.category_list.count() > 0 and self.category_list.currentRow() < 0:
-            self.category_list.setCurrentRow(0)
+        # Full reload (startup / external changes); edits use targeted model updates
+        self.category_model.reload()
+        if self.category_model.rowCount() > 0:
+            self.category_list.setCurrentIndex(self.category_model.index(0))
+        else:
+            self.refresh_templates(-1)
 
+    @profiled("ui.refresh_templates")
     def refresh_templates(self, cat_row: int):
-        self.template_list.clear()
-        if cat_row < 0 or cat_row >= len(self.store.list_categories()):
+        self.template_model.show_category(cat_row, self.search_edit.text())
+
+    def current_category_row(self) -> int:
+        return self.category_list.currentIndex().row()
+
+    def current_template_row(self) -> int:
+        return self.template_list.currentIndex().row()
+
+    def on_category_changed(self, cat_row: int):
+        # Picking a category leaves search mode (clearing re-fills the list)
+        if self.search_edit.text():
+            self.search_edit.clear()
+        else:
+            self.refresh_templates(cat_row)
+
+    def on_search_changed(self, text: str):
+        self.refresh_templates(self.current_category_row())
+
+    def check_shared_file(self):
+        # Not while a dialog is open: its row numbers must stay valid
+        if QApplication.activeModalWidget() is not None:
+            return
+        view = self.view_state()
+        result = self.store.sync_external()
+        if result:
+            self.apply_external_changes(result, view)
+
+    def sync_now(self, manual: bool = False):
+        # Starts a round with the sync server (sync.py). The request is built
+        # and the reply applied on the GUI thread, so the store never changes
+        # under them; only the network wait runs on a worker thread
+        if self.sync_client is None or self.sync_thread is not None:
+            return
+        if not manual and QApplication.activeModalWidget() is not None:
             return
-        for tpl in self.store.list_templates(cat_row):
-            item = QListWidgetItem(tpl["title"])
-            item.setData(Qt.ItemDataRole.UserRole, tpl["id"])
-            self.template_list.addItem(item)
+        try:
+            request = self.sync_client.begin()
+        except Exception as e:
+            print("Eşitleme hatası:", e)
+            return
+        client = self.sync_client
+        self.sync_manual = manual
+
+        def run():
+            try:
+                self.sync_outcome = (client.exchange(request), None)
+            except Exception as e:
+                self.sync_outcome = (None, e)
+            self.sync_done.emit()
+        self.sync_thread = threading.Thread(target=run, name="sync", daemon=True)
+        self.sync_thread.start()
+
+    def finish_sync(self):
+        if self.sync_outcome is None:
+            # Already taken by flush_stores
+            return
+        if QApplication.activeModalWidget() is not None:
+            # A dialog's row numbers must stay valid; the reply waits
+            QTimer.singleShot(500, self.finish_sync)
+            return
+        (reply, error), self.sync_outcome = self.sync_outcome, None
+        self.sync_thread = None
+        view = self.view_state()
+        result = None
+        if error is None:
+            try:
+                result = self.sync_client.finish(reply)
+            except Exception as e:
+                error = e
+        if error is not None:
+            # Unreachable: try again less and less often (up to 5 minutes)
+            self.sync_timer.setInterval(min(self.sync_timer.interval() * 2, 300000))
+            if self.sync_manual:
+                QMessageBox.warning(self, "Eşitleme", f"Eşitleme başarısız:\n{error}")
+            elif str(error) != self.sync_error:
+                print("Eşitleme hatası:", error)
+            self.sync_error = str(error)
+            return
+        self.sync_error = None
+        self.sync_timer.setInterval(self.sync_interval)
+        if result is None:
+            # The server has another library; ours goes up again right away
+            QTimer.singleShot(0, self.sync_now)
+        elif result:
+            self.apply_external_changes(result, view)
+
+    @profiled("ui.apply_external_changes")
+    def apply_external_changes(self, result, view: Tuple[Optional[str], Optional[str]]):
+        for tid in result.changed + result.removed:
+            self.placeholders.invalidate(tid)
+        for tid in result.removed:
+            self.usage.forget(tid)
+        rows_changed = bool(self.template_model.query) or view[0] in result.categories
+        if not result.structure and not rows_changed:
+            self.template_model.templates_changed(result.changed)
+        self.restore_view(view, result.structure, rows_changed)
+        self.notify_daemon()
+        if result.conflicts:
+            box = QMessageBox(QMessageBox.Icon.Warning, "Şablonlar başka bir yerde değişti", result.summary(), parent=self)
+            box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            box.show()
+
+    def view_state(self) -> Tuple[Optional[str], Optional[str]]:
+        # (current category name, selected template id). The models show the
+        # store's live lists, so take this before changing the store in bulk
+        cats = self.store.list_categories()
+        row = self.current_category_row()
+        return (cats[row]["name"] if 0 <= row < len(cats) else None,
+                self.template_model.template_id(self.current_template_row()))
+
+    def restore_view(self, view: Tuple[Optional[str], Optional[str]], categories_changed: bool, rows_changed: bool):
+        # Bring the lists up to date after a bulk change, keeping the current
+        # category and template where they still exist
+        cat_name, selected = view
+        if categories_changed:
+            self.category_model.reload()
+            names = [cat["name"] for cat in self.store.list_categories()]
+            cat_row = names.index(cat_name) if cat_name in names else (0 if names else -1)
+            selection = self.category_list.selectionModel()
+            selection.blockSignals(True)
+            self.category_list.setCurrentIndex(self.category_model.index(cat_row))
+            selection.blockSignals(False)
+            self.refresh_templates(cat_row)
+        elif rows_changed:
+            self.refresh_templates(self.current_category_row())
+        row = self.template_model.row_of(selected) if selected else -1
+        if row >= 0:
+            self.template_list.setCurrentIndex(self.template_model.index(row))
+            self.on_template_selected(self.template_list.currentIndex(), QModelIndex())
+
+    # ---------- Import / export ----------
+    def import_templates(self):
+        if self.store is None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Şablonları içe aktar", "", BULK_FILE_FILTER)
+        if not path:
+            return
+        view = self.view_state()
+        progress = QProgressDialog("Şablonlar içe aktarılıyor...", "İptal", 0, 1000, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+
+        def report_progress(done: int, total: int):
+            progress.setValue(done * 1000 // max(1, total))
+            if progress.wasCanceled():
+                raise Cancelled()
+
+        # The progress dialog runs the event loop; no merging mid-import
+        self.watch_timer.stop()
+        try:
+            report = import_file(self.store, path, progress=report_progress)
+        except Cancelled:
+            return
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "İçe aktarma", f"Dosya içe aktarılamadı:\n{e}")
+            return
+        finally:
+            progress.close()
+            if getattr(self.store, "shared", None) is not None:
+                self.watch_timer.start()
+        if report.added:
+            self.restore_view(view, True, True)
+        if report.save_error is not None:
+            QMessageBox.warning(self, "İçe aktarma", report.summary())
+        else:
+            QMessageBox.information(self, "İçe aktarma", report.summary())
+
+    def export_templates(self):
+        if self.store is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Şablonları dışa aktar", "sablonlar.csv", BULK_FILE_FILTER)
+        if not path:
+            return
+        try:
+            count = export_file(self.store, path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Dışa aktarma", f"Dosya yazılamadı:\n{e}")
+            return
+        if self.tray:
+            self.tray.showMessage(APP_NAME, f"{count} şablon dışa aktarıldı.", QSystemTrayIcon.MessageIcon.Information, 1800)
 
     # ---------- Category ops ----------
     def add_category(self):
@@ -374,11 +989,13 @@ class MainWindow(QMainWindow):
             if not name:
                 QMessageBox.warning(self, "Hata", "Kategori adı boş olamaz.")
                 return
-            self.store.add_category(name)
-            self.refresh_categories()
+            self.category_model.add_category(name)
+            self.record(AddCategory(self.category_model.rowCount() - 1, name))
+            if self.current_category_row() < 0:
+                self.category_list.setCurrentIndex(self.category_model.index(0))
 
     def rename_category(self):
-        row = self.category_list.currentRow()
+        row = self.current_category_row()
         if row < 0:
             return
         current_name = self.store.list_categories()[row]["name"]
@@ -388,94 +1005,199 @@ class MainWindow(QMainWindow):
             if not name:
                 QMessageBox.warning(self, "Hata", "Kategori adı boş olamaz.")
                 return
-            self.store.rename_category(row, name)
-            self.refresh_categories()
+            self.category_model.rename_category(row, name)
+            self.record(RenameCategory(row, current_name, name))
 
     def delete_category(self):
-        row = self.category_list.currentRow()
+        row = self.current_category_row()
         if row < 0:
             return
         reply = QMessageBox.question(self, "Silinsin mi?", "Bu kategoriyi ve içindeki tüm şablonları silmek istediğinize emin misiniz?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.store.delete_category(row)
-            self.refresh_categories()
-            self.template_list.clear()
+            # The step keeps the category's own template list (no copy)
+            step = DeleteCategory(row, self.store.list_categories()[row]["name"], self.store.list_templates(row))
+            for tpl in step.templates:
+                self.usage.forget(tpl["id"])
+            self.category_model.delete_category(row)
+            self.record(step)
+            # Category positions shifted; show whatever is current now
+            self.refresh_templates(self.current_category_row())
 
     # ---------- Template ops ----------
     def add_template(self):
-        cat_row = self.category_list.currentRow()
+        cat_row = self.current_category_row()
         if cat_row < 0:
             QMessageBox.warning(self, "Hata", "Önce bir kategori seçiniz.")
             return
         dlg = TemplateDialog(self, title="Yeni Şablon", init_title="", init_text="")
-        if dlg.exec() == QDialog.DialogCode.Accepted:
+        while dlg.exec() == QDialog.DialogCode.Accepted:
             title, text = dlg.get_values()
             if not title.strip():
                 QMessageBox.warning(self, "Hata", "Başlık boş olamaz.")
                 return
-            self.store.add_template(cat_row, title.strip(), text)
-            self.refresh_templates(cat_row)
+            # Declined because of a duplicate: back to the dialog, text kept
+            if not self.confirm_duplicates(text):
+                continue
+            tid = self.template_model.add_template(title.strip(), text)
+            self.record(AddTemplate(cat_row, self.store.list_categories()[cat_row]["name"], tid))
+            row = self.template_model.row_of(tid)
+            if row >= 0:
+                self.template_list.setCurrentIndex(self.template_model.index(row))
+            break
 
     def edit_template(self):
-        cat_row = self.category_list.currentRow()
-        tpl_row = self.template_list.currentRow()
-        if cat_row < 0 or tpl_row < 0:
+        row = self.current_template_row()
+        tpl = self.store.get_template_by_id(self.template_model.template_id(row)) if row >= 0 else None
+        if not tpl:
             return
-        tpl = self.store.list_templates(cat_row)[tpl_row]
         dlg = TemplateDialog(self, title="Şablon Düzenle", init_title=tpl["title"], init_text=tpl["text"])
-        if dlg.exec() == QDialog.DialogCode.Accepted:
+        while dlg.exec() == QDialog.DialogCode.Accepted:
             title, text = dlg.get_values()
             if not title.strip():
                 QMessageBox.warning(self, "Hata", "Başlık boş olamaz.")
                 return
-            self.store.edit_template(cat_row, tpl_row, title.strip(), text)
-            self.refresh_templates(cat_row)
+            old = (tpl["title"], tpl["text"])
+            if text != old[1] and not self.confirm_duplicates(text, tpl["id"]):
+                continue
+            self.template_model.edit_template(row, title.strip(), text)
+            self.record(EditTemplate(tpl["id"], old, (title.strip(), text)))
+            self.placeholders.invalidate(tpl["id"])
+            self.on_template_selected(self.template_list.currentIndex(), QModelIndex())
+            break
+
+    def duplicate_threshold(self) -> float:
+        return float(self.settings.settings.get("duplicate_threshold", NEAR_THRESHOLD))
+
+    def confirm_duplicates(self, text: str, template_id: Optional[str] = None) -> bool:
+        # Warn before saving a text the library already has (or nearly has)
+        exact, near = self.store.find_duplicates(text, template_id, self.duplicate_threshold())
+        if not exact and not near:
+            return True
+
+        def describe(tpl: Dict[str, Any]) -> str:
+            cat = self.store.get_category_of(tpl["id"])
+            return f"{tpl['title']} [{cat['name'] if cat else '?'}]"
+
+        lines = [f"• {describe(tpl)} (aynı metin)" for tpl in exact[:5]]
+        lines += [f"• {describe(tpl)} (%{round(score * 100)} benzer)" for tpl, score in near[:5]]
+        reply = QMessageBox.question(self, "Benzer şablon var",
+                                     "Bu metne sahip ya da çok benzeyen şablonlar var:\n\n" + "\n".join(lines) +
+                                     "\n\nYine de kaydedilsin mi?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        return reply == QMessageBox.StandardButton.Yes
+
+    def show_duplicates(self):
+        if self.store is None:
+            return
+        DuplicatesDialog(self).exec()
 
     def delete_template(self):
-        cat_row = self.category_list.currentRow()
-        tpl_row = self.template_list.currentRow()
-        if cat_row < 0 or tpl_row < 0:
+        row = self.current_template_row()
+        if row < 0:
             return
         reply = QMessageBox.question(self, "Silinsin mi?", "Bu şablonu silmek istediğinize emin misiniz?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.store.delete_template(cat_row, tpl_row)
-            self.refresh_templates(cat_row)
+            tid = self.template_model.template_id(row)
+            pos = self.store.find_template(tid)
+            step = DeleteTemplate(pos[0], self.store.list_categories()[pos[0]]["name"], pos[1],
+                                  self.store.get_template_by_id(tid)) if pos else None
+            self.placeholders.invalidate(tid)
+            self.usage.forget(tid)
+            self.template_model.delete_template(row)
+            if step is not None:
+                self.record(step)
+
+    # ---------- Undo / redo ----------
+    def record(self, step):
+        self.history.record(step)
+        self.update_undo_actions()
+
+    def update_undo_actions(self):
+        label = self.history.undo_label()
+        self.act_undo.setEnabled(label is not None)
+        self.act_undo.setText(f"Geri al: {label}" if label else "Geri al")
+        label = self.history.redo_label()
+        self.act_redo.setEnabled(label is not None)
+        self.act_redo.setText(f"Yinele: {label}" if label else "Yinele")
+
+    def undo(self):
+        self.apply_history(self.history.undo)
+
+    def redo(self):
+        self.apply_history(self.history.redo)
+
+    def apply_history(self, action):
+        # Not while a dialog is open: its row numbers must stay valid
+        if self.store is None or QApplication.activeModalWidget() is not None:
+            return
+        view = self.view_state()
+        try:
+            step = action(self.store)
+        except (LookupError, ValueError) as e:
+            QMessageBox.warning(self, "Geri al", f"Bu adım uygulanamadı (şablonlar başka yerde değişmiş olabilir); "
+                                                 f"geri alma geçmişi temizlendi.\n{e}")
+            step = None
+        self.update_undo_actions()
+        if step is None:
+            return
+        tid = getattr(step, "template_id", None)
+        # Templates the step took out of the library leave the palette ranking
+        for gone in [tid] if tid else [tpl["id"] for tpl in getattr(step, "templates", None) or ()]:
+            if self.store.find_template(gone) is None:
+                self.usage.forget(gone)
+        cats = self.store.list_categories()
+        if tid:
+            # Show the template where it now is
+            self.placeholders.invalidate(tid)
+            cat = self.store.get_category_of(tid)
+            view = (cat["name"] if cat else view[0], tid)
+        elif cats:
+            view = (cats[min(step.index, len(cats) - 1)]["name"], view[1])
+        self.restore_view(view, True, True)
 
     # ---------- Use template ----------
-    def on_template_double_clicked(self, item: QListWidgetItem):
-        tpl_id = item.data(Qt.ItemDataRole.UserRole)
+    def on_template_double_clicked(self, index: QModelIndex):
+        tpl_id = index.data(Qt.ItemDataRole.UserRole)
         tpl = self.store.get_template_by_id(tpl_id)
         if not tpl:
             return
-        self.use_template_text(tpl["text"])
-
-    def use_template_text(self, text: str, force_paste: Optional[bool] = None):
-        # Copy to clipboard
-        QApplication.clipboard().setText(text)
+        text = self.render_template(tpl)
+        if text is not None:
+            self.use_template_text(text, template_id=tpl_id)
+
+    def render_template(self, tpl: Dict[str, Any]) -> Optional[str]:
+        # Fill in the template's variables; None if the user cancelled the prompt
+        compiled = self.placeholders.get(tpl)
+        values = None
+        if compiled.names:
+            dlg = FillInDialog(compiled.names, self.placeholders.last_values, self, title=tpl["title"])
+            if dlg.exec() != QDialog.DialogCode.Accepted:
+                return None
+            values = dlg.get_values()
+        return self.placeholders.render(tpl, values, self.builtins)
+
+    @profiled("ui.use_template_text")
+    def use_template_text(self, text: str, force_paste: Optional[bool] = None, request: Optional[PasteRequest] = None,
+                          on_done=None, template_id: Optional[str] = None):
+        if template_id:
+            # Counted for the palette's ranking; written with the next batch
+            self.usage.record(template_id)
         auto_paste = self.settings.auto_paste_on_click() if force_paste is None else force_paste
-        if auto_paste:
-            # Hide window briefly so paste goes to previous app
-            # self.hide()
-            QApplication.processEvents()
-            # Try to paste via keyboard if available
-            if KEYBOARD_AVAILABLE:
-                try:
-                    keyboard.press_and_release("ctrl+v")
-                except Exception:
-                    pass
-            # If keyboard module is not available, user can Ctrl+V manually
-            # Brief info via tray
-            if self.tray:
+        # Clipboard, settle delay, Ctrl+V and restore run on timers (see paste.py).
+        # If keyboard module is not available, user can Ctrl+V manually
+        self.paste_engine.submit(text, paste=auto_paste, request=request, on_done=on_done)
+        # Brief info via tray
+        if self.tray:
+            if auto_paste:
                 self.tray.showMessage(APP_NAME, "Metin yapıştırıldı (veya panoya kopyalandı).", QSystemTrayIcon.MessageIcon.Information, 1800)
-        else:
-            if self.tray:
+            else:
                 self.tray.showMessage(APP_NAME, "Metin panoya kopyalandı.", QSystemTrayIcon.MessageIcon.Information, 1800)
 
     # ---------- Context menu on template list ----------
     def on_template_context_menu(self, pos):
-        item = self.template_list.itemAt(pos)
+        item = self.template_list.indexAt(pos)
         menu = QMenu(self)
 
         act_copy = QAction("Panoya Kopyala", self, triggered=lambda: self.context_copy(item))
@@ -484,85 +1206,182 @@ class MainWindow(QMainWindow):
         menu.addAction(act_paste)
 
         menu.addSeparator()
-        act_assign_t = QAction("Ctrl+Shift+T kısayoluna ata", self, triggered=lambda: self.assign_hotkey_to_item(item, "ctrl+shift+t"))
-        act_assign_q = QAction("Ctrl+Shift+Q kısayoluna ata", self, triggered=lambda: self.assign_hotkey_to_item(item, "ctrl+shift+q"))
-        menu.addAction(act_assign_t)
-        menu.addAction(act_assign_q)
+        # Every combo in settings.json, plus a new one; "*" marks this template's
+        tpl_id = item.data(Qt.ItemDataRole.UserRole) if item.isValid() else None
+        assign_menu = menu.addMenu("Kısayol Ata")
+        bound = []
+        for combo, target in self.settings.settings.get("hotkeys", {}).items():
+            label = combo_label(combo)
+            if target and target == tpl_id:
+                bound.append(combo)
+                label += "  *"
+            elif not target:
+                label += "  (boş)"
+            assign_menu.addAction(QAction(label, self, triggered=lambda _=False, c=combo: self.assign_hotkey_to_item(item, c)))
+        assign_menu.addSeparator()
+        assign_menu.addAction(QAction("Yeni Kısayol...", self, triggered=lambda: self.assign_new_hotkey(item)))
+        for combo in bound:
+            menu.addAction(QAction(f"{combo_label(combo)} Kısayolunu Kaldır", self,
+                                   triggered=lambda _=False, c=combo: self.clear_hotkey(c)))
 
         menu.exec(self.template_list.mapToGlobal(pos))
 
-    def context_copy(self, item: Optional[QListWidgetItem]):
-        if not item:
+    def context_copy(self, item: QModelIndex):
+        if not item.isValid():
             return
         tpl_id = item.data(Qt.ItemDataRole.UserRole)
         tpl = self.store.get_template_by_id(tpl_id)
         if not tpl:
             return
-        QApplication.clipboard().setText(tpl["text"])
+        text = self.render_template(tpl)
+        if text is None:
+            return
+        QApplication.clipboard().setText(text)
+        self.usage.record(tpl_id)
         if self.tray:
             self.tray.showMessage(APP_NAME, "Panoya kopyalandı.", QSystemTrayIcon.MessageIcon.Information, 1200)
 
-    def context_paste(self, item: Optional[QListWidgetItem]):
-        if not item:
+    def context_paste(self, item: QModelIndex):
+        if not item.isValid():
             return
         tpl_id = item.data(Qt.ItemDataRole.UserRole)
         tpl = self.store.get_template_by_id(tpl_id)
         if not tpl:
             return
-        self.use_template_text(tpl["text"], force_paste=True)
+        text = self.render_template(tpl)
+        if text is not None:
+            self.use_template_text(text, force_paste=True, template_id=tpl_id)
 
     # ---------- Hotkeys ----------
+    def notify_daemon(self):
+        if self.daemon_running:
+            send_command("reload", self.daemon_port)
+
     def unregister_hotkeys(self):
-        if KEYBOARD_AVAILABLE:
-            try:
-                keyboard.unhook_all_hotkeys()
-            except Exception:
-                pass
+        self.hotkeys.clear()
+
+    def hotkey_bindings(self, hotkeys: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        # settings.json "hotkeys" with the palette hotkey in front (it wins a tie)
+        bindings = {}
+        palette = self.settings.settings.get("palette_hotkey", PALETTE_HOTKEY)
+        if palette:
+            bindings[palette] = PALETTE_TARGET
+        for combo, tpl_id in hotkeys.items():
+            bindings.setdefault(combo, tpl_id)
+        return bindings
 
     def register_hotkeys(self):
-        if not KEYBOARD_AVAILABLE:
+        # Only the combos that changed are re-hooked (see hotkeys.py). While
+        # the daemon runs it owns the template hotkeys; the palette stays here
+        if not load_keyboard():
             return
-        self.unregister_hotkeys()
+        hotkeys = {} if self.daemon_running else self.settings.settings.get("hotkeys", {})
+        self.hotkeys.apply(self.hotkey_bindings(hotkeys))
+        for combo, what in self.hotkeys.conflicts:
+            print(f"Kısayol '{combo}': {what}")
+
+    @profiled("hotkey.callback")
+    def on_hotkey(self, combo: str, tpl_id: str):
+        # keyboard hook thread
+        if tpl_id == PALETTE_TARGET:
+            self.palette_requested.emit(time.perf_counter())
+            return
+        self.hotkey_queue.put(combo, tpl_id)
 
-        for combo, tpl_id in self.settings.settings.get("hotkeys", {}).items():
-            if tpl_id:
-                def make_cb(tid):
-                    def _cb():
-                        tpl = self.store.get_template_by_id(tid)
-                        if tpl:
-                            self.use_template_text(tpl["text"], force_paste=True)
-                    return _cb
-                try:
-                    keyboard.add_hotkey(combo, make_cb(tpl_id), suppress=False, trigger_on_release=True)
-                except Exception as e:
-                    print(f"Hotkey '{combo}' kaydı başarısız: {e}")
-
-    def assign_hotkey_to_item(self, item: Optional[QListWidgetItem], combo: str):
-        if not item:
-            return
-        if not KEYBOARD_AVAILABLE:
+    def show_palette(self, t_key: Optional[float] = None):
+        if self.palette is not None:
+            self.palette.popup(t_key)
+
+    def on_palette_picked(self, tpl_id: str):
+        tpl = self.store.get_template_by_id(tpl_id)
+        if not tpl:
+            return
+        text = self.render_template(tpl)
+        if text is not None:
+            self.use_template_text(text, force_paste=True, template_id=tpl_id)
+
+    def drain_hotkeys(self):
+        # GUI thread: hand queued hotkey requests to the paste engine, which
+        # pastes them in order; a request is done once its Ctrl+V was sent.
+        # The fill-in prompt runs a nested event loop, so don't re-enter here
+        if self._draining:
+            return
+        self._draining = True
+        try:
+            while True:
+                req = self.hotkey_queue.take()
+                if req is None:
+                    return
+                tpl = self.store.get_template_by_id(req.template_id)
+                text = self.render_template(tpl) if tpl else None
+                if text is not None:
+                    self.use_template_text(text, force_paste=True, request=req,
+                                           on_done=lambda r=req: self.hotkey_queue.done(r), template_id=req.template_id)
+                else:
+                    self.hotkey_queue.done(req)
+        finally:
+            self._draining = False
+
+    def show_stats(self):
+        if self.stats_dialog is None:
+            self.stats_dialog = StatsDialog(self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+    def assign_hotkey_to_item(self, item: QModelIndex, combo: str):
+        if not item.isValid():
+            return
+        if not KEYBOARD_AVAILABLE and not self.daemon_running:
             QMessageBox.warning(self, "Kısayol", "Global kısayollar için 'keyboard' modülünü kurmanız gerekir:\npip install keyboard\nWindows'ta yönetici izinleri gerekebilir.")
             return
+        try:
+            normalized = normalize_combo(combo)
+        except ValueError as e:
+            QMessageBox.warning(self, "Kısayol", str(e))
+            return
+        hotkeys = self.settings.settings.get("hotkeys", {})
+        # Reuse the existing entry for this combo, however it is spelled
+        for key in hotkeys:
+            try:
+                if normalize_combo(key) == normalized:
+                    combo = key
+                    break
+            except ValueError:
+                continue
         tpl_id = item.data(Qt.ItemDataRole.UserRole)
+        _, conflicts = build_table(self.hotkey_bindings(dict(hotkeys, **{combo: tpl_id})))
+        problems = [what for key, what in conflicts if key == combo]
+        if problems:
+            QMessageBox.warning(self, "Kısayol", f"{combo_label(normalized)}: " + "\n".join(problems))
+            if any(what.startswith("kullanılamaz") for what in problems):
+                return
         self.settings.set_hotkey_target(combo, tpl_id)
         self.register_hotkeys()
         if self.tray:
-            self.tray.showMessage(APP_NAME, f"{combo} kısayolu şablona atandı.", QSystemTrayIcon.MessageIcon.Information, 1800)
+            self.tray.showMessage(APP_NAME, f"{combo_label(normalized)} kısayolu şablona atandı.", QSystemTrayIcon.MessageIcon.Information, 1800)
+
+    def assign_new_hotkey(self, item: QModelIndex):
+        if not item.isValid():
+            return
+        combo, ok = QInputDialog.getText(self, "Yeni Kısayol",
+                                         "Tuşlar (ör. ctrl+alt+1, sıra için: ctrl+k, ctrl+c):")
+        if ok and combo.strip():
+            self.assign_hotkey_to_item(item, combo.strip())
+
+    def clear_hotkey(self, combo: str):
+        # The combo stays listed in settings.json, unassigned
+        self.settings.set_hotkey_target(combo, None)
+        self.register_hotkeys()
 
 def main():
     ensure_default_files()
+    STARTUP.mark("default_files")
 
     app = QApplication(sys.argv)
+    STARTUP.mark("qapplication")
     win = MainWindow()
     win.show()
-
-    if not KEYBOARD_AVAILABLE:
-        # Inform user once about missing keyboard module
-        QMessageBox.information(win, "Bilgi",
-                                "Global kısayollar için 'keyboard' modülü bulunamadı.\n"
-                                "Kısayolları kullanmak isterseniz:\n\n"
-                                "    pip install keyboard\n\n"
-                                "komutunu çalıştırın (Windows'ta yönetici izni gerekebilir).")
+    STARTUP.mark("window_shown")
     sys.exit(app.exec())
 
 if __name__ == "__main__":
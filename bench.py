@@ -0,0 +1,365 @@
+import os, sys, json, time, uuid, random, shutil, argparse, platform, tempfile, importlib, subprocess, tracemalloc
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+# Headless benchmarks for the data layer and the main window hot paths.
+#
+#   python bench.py                         # 1k/10k/100k, json storage, GUI if PyQt6 is installed
+#   python bench.py --sizes 1000,10000 --storage json,journal,lazy,sqlite
+#   python bench.py --out new.json --compare old.json
+#
+# Every run works on synthetic libraries in a temporary folder (via
+# SABLON_DATA_DIR), never on the real templates.json. Times are in
+# milliseconds (best of --repeat for whole-file operations, mean per call for
+# the rest); peak memory is the tracemalloc peak of the Python heap, and
+# bytes_per_template what a loaded store keeps on it, per template.
+
+from store import TemplateStore, SettingsStore, ensure_default_files, DATA_DIR_ENV, DATA_FILE, SETTINGS_FILE, DB_FILE
+from storage import make_backend
+
+WORDS = ("sipariş iptal iade kargo gecikme özür fatura ödeme teslimat üyelik şikayet bilgi talep "
+         "müşteri ürün değişim garanti destek kampanya indirim hesap şifre adres onay süre").split()
+
+# (label, template count, body words, category count)
+def library_matrix(sizes: List[int]) -> List[Dict[str, Any]]:
+    libs = []
+    for n in sizes:
+        libs.append({"label": f"{n}-short-few", "templates": n, "body_words": 20, "categories": 10})
+        libs.append({"label": f"{n}-long-few", "templates": n, "body_words": 250, "categories": 10})
+        libs.append({"label": f"{n}-short-many", "templates": n, "body_words": 20, "categories": max(10, n // 20)})
+    return libs
+
+def make_library(spec: Dict[str, Any], seed: int = 1) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    cats = [{"name": f"Kategori {i}", "templates": []} for i in range(spec["categories"])]
+    for i in range(spec["templates"]):
+        body = " ".join(rnd.choice(WORDS) for _ in range(spec["body_words"]))
+        tpl = {"id": str(uuid.UUID(int=rnd.getrandbits(128))), "title": f"{rnd.choice(WORDS).capitalize()} {i}", "text": body}
+        cats[i % len(cats)]["templates"].append(tpl)
+    return {"categories": cats}
+
+def write_library(folder: str, doc: Dict[str, Any], storage: str):
+    with open(os.path.join(folder, DATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+    settings = {"hotkeys": {}, "auto_paste_on_click": True, "minimize_to_tray_on_close": True,
+                "save_delay_ms": 500, "storage": storage}
+    with open(os.path.join(folder, SETTINGS_FILE), "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+    db_path = os.path.join(folder, DB_FILE)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+# ---------- Timing helpers ----------
+def best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000.0
+
+def per_call_ms(fn: Callable[[int], Any], count: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - t0) * 1000.0 / max(1, count)
+
+def peak_kb(fn: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak // 1024
+
+def retained_bytes(fn: Callable[[], Any]) -> Tuple[Any, int]:
+    # fn()'s result and the heap it still holds once built
+    tracemalloc.start()
+    try:
+        result = fn()
+        current = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+def open_store(folder: str, storage: str, save_delay: float = 0.5):
+    data_path = os.path.join(folder, DATA_FILE)
+    if storage == "sqlite":
+        from sqlite_store import SqliteTemplateStore, migrate_json_to_sqlite
+        db_path = os.path.join(folder, DB_FILE)
+        if not os.path.exists(db_path):
+            return migrate_json_to_sqlite(data_path, db_path)
+        return SqliteTemplateStore(db_path)
+    return TemplateStore(data_path, save_delay=save_delay, backend=make_backend(data_path, storage))
+
+# ---------- Data layer ----------
+def bench_store(folder: str, storage: str, ops: int, repeat: int) -> Dict[str, Any]:
+    m: Dict[str, Any] = {}
+    rnd = random.Random(7)
+    if storage == "sqlite":
+        # First open migrates templates.json into a fresh database
+        m["migrate_ms"] = best_ms(lambda: open_store(folder, storage), 1)
+
+    m["load_ms"] = best_ms(lambda: open_store(folder, storage), repeat)
+    m["load_peak_kb"] = peak_kb(lambda: open_store(folder, storage))
+    st, retained = retained_bytes(lambda: open_store(folder, storage))
+    count = sum(len(st.list_templates(i)) for i in range(len(st.list_categories())))
+    m["bytes_per_template"] = retained // max(1, count)
+
+    st = open_store(folder, storage, save_delay=0.0)
+    m["save_ms"] = best_ms(lambda: (st.save(), st.flush()), repeat)
+    m["compact_ms"] = best_ms(st.compact, 1)
+
+    # Mutations under the app's default write-behind window; the final flush
+    # (one coalesced write) is reported separately
+    st = open_store(folder, storage, save_delay=0.5)
+    cats = st.list_categories()
+    n_cats = len(cats)
+    ids = [tpl["id"] for cat_index in range(n_cats) for tpl in st.list_templates(cat_index)]
+    lookups = [rnd.choice(ids) for _ in range(max(ops, 10000))]
+
+    m["get_template_by_id_ms"] = per_call_ms(lambda i: st.get_template_by_id(lookups[i]), len(lookups))
+    m["find_template_ms"] = per_call_ms(lambda i: st.find_template(lookups[i]), min(len(lookups), ops * 10))
+    m["list_templates_ms"] = per_call_ms(lambda i: st.list_templates(i % n_cats), ops)
+
+    m["add_category_ms"] = per_call_ms(lambda i: st.add_category(f"Bench {i}"), ops)
+    m["rename_category_ms"] = per_call_ms(lambda i: st.rename_category(n_cats + i, f"Bench* {i}"), ops)
+    m["delete_category_ms"] = per_call_ms(lambda i: st.delete_category(len(st.list_categories()) - 1), ops)
+
+    targets = [rnd.randrange(n_cats) for _ in range(ops)]
+    m["add_template_ms"] = per_call_ms(lambda i: st.add_template(targets[i], f"Yeni {i}", "bench metni " * 10), ops)
+    m["edit_template_ms"] = per_call_ms(
+        lambda i: st.edit_template(targets[i], rnd.randrange(len(st.list_templates(targets[i]))), f"Düzenlendi {i}", "yeni metin"), ops)
+    m["delete_template_ms"] = per_call_ms(
+        lambda i: st.delete_template(targets[i], len(st.list_templates(targets[i])) - 1), ops)
+    m["flush_after_mutations_ms"] = best_ms(st.flush, 1)
+
+    queries = ["kargo", "iptal ia", "öz", "Müşteri ürün değişim", "zzz"]
+    m["search_first_ms"] = best_ms(lambda: st.search(queries[0], 50), 1)
+    m["search_ms"] = per_call_ms(lambda i: st.search(queries[i % len(queries)], 50), len(queries) * 20)
+    st.flush()
+    if storage == "json":
+        m.update(bench_shared(folder, ops))
+    return m
+
+def bench_shared(folder: str, ops: int) -> Dict[str, Any]:
+    # Two instances on one templates.json: the other one writes `ops` edits,
+    # then ours picks them up from the change log, or from the whole file
+    m: Dict[str, Any] = {}
+    data_path = os.path.join(folder, DATA_FILE)
+    ours = TemplateStore(data_path, save_delay=0.5, watch=True)
+    m["sync_check_ms"] = per_call_ms(lambda i: ours.sync_external(), 1000)
+    for via_log in (True, False):
+        other = TemplateStore(data_path, save_delay=0.5, watch=True)
+        for i in range(ops):
+            other.edit_template(i % len(other.list_categories()), 0, f"Ortak {i}", f"ortak metin {i}")
+        other.flush()
+        if not via_log:
+            os.remove(ours.shared.changes_path)
+        t0 = time.perf_counter()
+        while ours.sync_external() is None:
+            time.sleep(0.05)
+            t0 = time.perf_counter()
+        m["sync_log_ms" if via_log else "sync_full_ms"] = (time.perf_counter() - t0) * 1000.0
+    return m
+
+def bench_settings(folder: str, repeat: int) -> Dict[str, Any]:
+    m: Dict[str, Any] = {}
+    path = os.path.join(folder, SETTINGS_FILE)
+    m["settings_load_ms"] = best_ms(lambda: SettingsStore(path), repeat)
+    s = SettingsStore(path, save_delay=0.0)
+    m["settings_save_ms"] = best_ms(lambda: (s.save(), s.flush()), repeat)
+    m["set_hotkey_target_ms"] = per_call_ms(lambda i: s.set_hotkey_target(f"ctrl+alt+{i % 10}", None), 100)
+    return m
+
+def bench_default_files(repeat: int) -> Dict[str, Any]:
+    m: Dict[str, Any] = {}
+    folder = tempfile.mkdtemp(prefix="sablon-bench-")
+    try:
+        os.environ[DATA_DIR_ENV] = folder
+
+        def fresh():
+            for name in (DATA_FILE, SETTINGS_FILE):
+                path = os.path.join(folder, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            t0 = time.perf_counter()
+            ensure_default_files()
+            return time.perf_counter() - t0
+        m["ensure_default_files_create_ms"] = min(fresh() for _ in range(repeat)) * 1000.0
+        m["ensure_default_files_existing_ms"] = best_ms(ensure_default_files, repeat)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return m
+
+# ---------- GUI ----------
+def gui_available() -> bool:
+    try:
+        importlib.import_module("PyQt6.QtWidgets")
+        return True
+    except Exception:
+        return False
+
+def bench_gui(folder: str, repeat: int) -> Dict[str, Any]:
+    from PyQt6.QtWidgets import QApplication
+    import app as app_module
+    qapp = QApplication.instance() or QApplication([sys.argv[0]])
+    m: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    win = app_module.MainWindow()
+    m["main_window_init_ms"] = (time.perf_counter() - t0) * 1000.0
+    wait_for_library(qapp, win)
+    m["main_window_ready_ms"] = (time.perf_counter() - t0) * 1000.0
+    try:
+        m["refresh_categories_ms"] = best_ms(win.refresh_categories, repeat)
+        rows = win.category_model.rowCount()
+        biggest = max(range(rows), key=lambda r: len(win.store.list_templates(r))) if rows else -1
+        m["refresh_templates_ms"] = best_ms(lambda: win.refresh_templates(biggest), repeat)
+        m["search_box_ms"] = best_ms(lambda: (win.search_edit.setText("kargo iade"), win.search_edit.clear()), repeat)
+        qapp.processEvents()
+    finally:
+        win.store.flush()
+        win.settings.flush()
+        win.hide()
+        win.deleteLater()
+        qapp.processEvents()
+    return m
+
+def wait_for_library(qapp, win):
+    # With "fast_start" the library is loaded from the event loop after show()
+    while win.store is None:
+        qapp.processEvents()
+
+def cold_start_child():
+    # Runs in a fresh interpreter: main() up to the first shown window
+    t_start = time.perf_counter()
+    import app as app_module
+    from PyQt6.QtWidgets import QApplication
+    t_import = time.perf_counter()
+    ensure_default_files()
+    qapp = QApplication([sys.argv[0]])
+    win = app_module.MainWindow()
+    win.show()
+    qapp.processEvents()
+    t_shown = time.perf_counter()
+    wait_for_library(qapp, win)
+    t_ready = time.perf_counter()
+    win.store.flush()
+    win.settings.flush()
+    print(json.dumps({"import_ms": (t_import - t_start) * 1000.0, "shown_ms": (t_shown - t_start) * 1000.0,
+                      "ready_ms": (t_ready - t_start) * 1000.0}))
+
+def bench_cold_start(folder: str, repeat: int) -> Dict[str, Any]:
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env[DATA_DIR_ENV] = folder
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--cold-start-child"],
+                             env=env, capture_output=True, text=True, timeout=300)
+        wall = (time.perf_counter() - t0) * 1000.0
+        if out.returncode != 0:
+            return {"cold_start_error": out.stderr.strip().splitlines()[-1:] or ["?"]}
+        child = json.loads(out.stdout.strip().splitlines()[-1])
+        child["process_ms"] = wall
+        runs.append(child)
+    best = min(runs, key=lambda r: r["shown_ms"])
+    return {"cold_start_" + k: v for k, v in best.items()}
+
+# ---------- Driver ----------
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+def max_rss_kb() -> Optional[int]:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == "darwin" else rss
+    except Exception:
+        return None
+
+def compare(old_path: str, new: Dict[str, Any]):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    old_runs = {(r["library"], r["storage"]): r["metrics"] for r in old.get("results", [])}
+    print(f"\n{'library/storage':28} {'metric':34} {'önce':>10} {'sonra':>10} {'oran':>7}")
+    for run in new["results"]:
+        before = old_runs.get((run["library"], run["storage"]))
+        if not before:
+            continue
+        for key, value in run["metrics"].items():
+            prev = before.get(key)
+            if isinstance(value, (int, float)) and isinstance(prev, (int, float)) and prev > 0:
+                ratio = value / prev
+                flag = "  <--" if ratio > 1.2 else ""
+                print(f"{run['library'] + '/' + run['storage']:28} {key:34} {prev:10.3f} {value:10.3f} {ratio:6.2f}x{flag}")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Şablon Yöneticisi performans ölçümleri")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="şablon sayıları (virgülle)")
+    parser.add_argument("--storage", default="json", help="json, journal, lazy, sqlite (virgülle)")
+    parser.add_argument("--repeat", type=int, default=3, help="tüm dosya işlemleri için tekrar sayısı")
+    parser.add_argument("--ops", type=int, default=200, help="değişiklik ölçümü başına işlem sayısı")
+    parser.add_argument("--no-gui", action="store_true", help="pencere ölçümlerini atla")
+    parser.add_argument("--out", default="bench_results.json", help="sonuç dosyası")
+    parser.add_argument("--compare", default=None, help="önceki sonuç dosyasıyla karşılaştır")
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cold_start_child:
+        cold_start_child()
+        return 0
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    kinds = [k.strip() for k in args.storage.split(",") if k.strip()]
+    with_gui = not args.no_gui and gui_available()
+    if not args.no_gui and not with_gui:
+        print("PyQt6 bulunamadı; pencere ölçümleri atlanıyor.")
+
+    report: Dict[str, Any] = {
+        "meta": {"revision": git_revision(), "python": sys.version.split()[0], "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat, "ops": args.ops},
+        "global": bench_default_files(args.repeat),
+        "results": [],
+    }
+    folder = tempfile.mkdtemp(prefix="sablon-bench-")
+    try:
+        os.environ[DATA_DIR_ENV] = folder
+        for spec in library_matrix(sizes):
+            doc = make_library(spec)
+            for kind in kinds:
+                write_library(folder, doc, kind)
+                size_kb = os.path.getsize(os.path.join(folder, DATA_FILE)) // 1024
+                print(f"{spec['label']} / {kind} ({size_kb} KB) ...", flush=True)
+                metrics = {"file_kb": size_kb}
+                metrics.update(bench_store(folder, kind, args.ops, args.repeat))
+                metrics.update(bench_settings(folder, args.repeat))
+                if with_gui:
+                    write_library(folder, doc, kind)
+                    metrics.update(bench_gui(folder, args.repeat))
+                    write_library(folder, doc, kind)
+                    metrics.update(bench_cold_start(folder, args.repeat))
+                report["results"].append({"library": spec["label"], "storage": kind, "spec": spec, "metrics": metrics})
+            del doc
+        report["meta"]["max_rss_kb"] = max_rss_kb()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        os.environ.pop(DATA_DIR_ENV, None)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("Sonuçlar:", args.out)
+    if args.compare:
+        compare(args.compare, report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
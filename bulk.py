@@ -0,0 +1,256 @@
+import io, os, csv, sys, json, uuid, hashlib, argparse, itertools, tempfile
+from typing import Optional, Any, List, Tuple, Callable, Iterator, IO
+
+# Bulk import/export of templates as CSV or JSON Lines, without Qt.
+#
+#   python bulk.py import yanitlar.csv --category "Marka X"
+#   python bulk.py import yanitlar.jsonl --dry-run
+#   python bulk.py export yedek.csv
+#
+# Rows are streamed: the file is never read whole, and the store takes the
+# accepted rows from a generator in one add_templates() call, i.e. one save
+# (TemplateStore) or one transaction (SQLite) for the whole import.
+#
+# CSV: a header row naming the columns (id, category, title, text; Turkish
+# names kategori/başlık/metin also work). JSONL: one object per line with the
+# same keys. Only the title is required; rows without an id get a new one.
+# Rows whose id or (trimmed) text is already in the library, or earlier in the
+# same file, are skipped as duplicates.
+
+FORMATS = ("csv", "jsonl")
+COLUMNS = ("id", "category", "title", "text")
+COLUMN_ALIASES = {"kimlik": "id", "kategori": "category", "başlık": "title", "baslik": "title",
+                  "metin": "text", "şablon": "text", "sablon": "text"}
+DEFAULT_CATEGORY = "İçe aktarılanlar"
+# Progress callbacks run every this many rows
+PROGRESS_EVERY = 500
+# Row problems listed in the report (the rest are only counted)
+MAX_ERRORS = 20
+
+# Template bodies can be long; the csv module's default field limit is 128 KB
+csv.field_size_limit(64 * 1024 * 1024)
+
+class Cancelled(Exception):
+    # Raised from a progress callback to stop (and roll back) an import
+    pass
+
+class ImportReport:
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.added = 0
+        self.duplicate_ids = 0
+        self.duplicate_texts = 0
+        self.invalid = 0
+        # (line number, problem)
+        self.errors: List[Tuple[int, str]] = []
+        # Set when the imported templates could not be written to disk
+        self.save_error: Optional[str] = None
+
+    def error(self, line: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self) -> str:
+        verb = "eklenecek" if self.dry_run else "eklendi"
+        lines = [f"{self.rows} satır okundu: {self.added} şablon {verb}, "
+                 f"{self.duplicate_ids} aynı kimlikli, {self.duplicate_texts} aynı metinli atlandı, "
+                 f"{self.invalid} hatalı satır."]
+        lines.extend(f"  satır {line}: {message}" for line, message in self.errors)
+        if self.invalid > len(self.errors):
+            lines.append(f"  ... ve {self.invalid - len(self.errors)} hata daha")
+        if self.save_error is not None:
+            lines.append(f"Şablonlar diske yazılamadı: {self.save_error}")
+        return "\n".join(lines)
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Desteklenmeyen biçim: {fmt or path} (csv veya jsonl)")
+    return fmt
+
+def text_key(text: str) -> bytes:
+    # Duplicate check by content; a short digest keeps the set small
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=12).digest()
+
+# ---------- Reading ----------
+def _read_csv(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+    # Excel with Turkish regional settings saves with ';'
+    first = f.readline()
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    reader = csv.reader(itertools.chain([first], f), delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [COLUMN_ALIASES.get(h.strip().lower(), h.strip().lower()) for h in header]
+    if "title" not in names:
+        raise ValueError("CSV başlık satırında 'title' (veya 'başlık') sütunu yok")
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) > len(names):
+            yield reader.line_num, f"{len(names)} sütun beklenirken {len(row)} sütun var"
+            continue
+        yield reader.line_num, dict(zip(names, row))
+
+def _read_jsonl(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"geçersiz JSON ({e.msg})"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, "satır bir JSON nesnesi değil"
+            continue
+        yield line_no, {COLUMN_ALIASES.get(k, k): v for k, v in row.items()}
+
+def _existing(store) -> Tuple[set, set]:
+    # Ids and text digests already in the library
+    ids, texts = set(), set()
+    for cat_index in range(len(store.list_categories())):
+        for tpl in store.list_templates(cat_index):
+            ids.add(tpl["id"])
+            texts.add(text_key(tpl.get("text", "")))
+    return ids, texts
+
+def import_file(store, path: str, fmt: Optional[str] = None, category: str = DEFAULT_CATEGORY,
+                dry_run: bool = False, progress: Optional[Callable[[int, int], None]] = None) -> ImportReport:
+    # progress(bytes read, file size); raising Cancelled from it rolls back
+    fmt = detect_format(path, fmt)
+    report = ImportReport(dry_run)
+    ids, texts = _existing(store)
+    total = os.path.getsize(path)
+    raw = open(path, "rb")
+    try:
+        f = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+        rows = _read_csv(f) if fmt == "csv" else _read_jsonl(f)
+
+        def accepted() -> Iterator[Tuple[str, str, str, str]]:
+            for line, row in rows:
+                report.rows += 1
+                if progress is not None and report.rows % PROGRESS_EVERY == 0:
+                    progress(raw.tell(), total)
+                if isinstance(row, str):
+                    report.error(line, row)
+                    continue
+                fields = {key: row.get(key) for key in COLUMNS}
+                if any(value is not None and not isinstance(value, str) for value in fields.values()):
+                    report.error(line, "alanlar metin olmalı")
+                    continue
+                title = (fields["title"] or "").strip()
+                if not title:
+                    report.error(line, "başlık boş")
+                    continue
+                tid = (fields["id"] or "").strip() or str(uuid.uuid4())
+                if tid in ids:
+                    report.duplicate_ids += 1
+                    continue
+                text = fields["text"] or ""
+                key = text_key(text)
+                if key in texts:
+                    report.duplicate_texts += 1
+                    continue
+                ids.add(tid)
+                texts.add(key)
+                report.added += 1
+                yield (fields["category"] or "").strip() or category, tid, title, text
+
+        if dry_run:
+            for _ in accepted():
+                pass
+        else:
+            store.add_templates(accepted())
+            try:
+                store.flush(check=True)
+            except Exception as e:
+                report.save_error = str(e)
+        if progress is not None:
+            progress(total, total)
+    finally:
+        raw.close()
+    return report
+
+# ---------- Writing ----------
+def export_file(store, path: str, fmt: Optional[str] = None,
+                progress: Optional[Callable[[int, int], None]] = None) -> int:
+    # Streams every template to `path` (written atomically); progress(categories
+    # done, category count). Returns the number of templates written
+    fmt = detect_format(path, fmt)
+    categories = store.list_categories()
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer is not None:
+                writer.writerow(COLUMNS)
+            for cat_index, cat in enumerate(categories):
+                for tpl in store.list_templates(cat_index):
+                    row = (tpl["id"], cat["name"], tpl.get("title", ""), tpl.get("text", ""))
+                    if writer is not None:
+                        writer.writerow(row)
+                    else:
+                        f.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+                    count += 1
+                if progress is not None:
+                    progress(cat_index + 1, len(categories))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+# ---------- Command line ----------
+def main(argv: List[str]) -> int:
+    from store import SettingsStore, open_template_store, ensure_default_files, SETTINGS_FILE
+    from daemon import send_command, daemon_port
+
+    parser = argparse.ArgumentParser(description="Şablonları CSV / JSONL olarak toplu içe veya dışa aktar")
+    parser.add_argument("command", choices=("import", "export"), help="import: dosyadan ekle, export: dosyaya yaz")
+    parser.add_argument("path", help="CSV veya JSONL dosyası")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="dosya uzantısından anlaşılmıyorsa")
+    parser.add_argument("--category", default=DEFAULT_CATEGORY, help="kategorisi boş satırlar için kategori")
+    parser.add_argument("--dry-run", action="store_true", help="yalnızca denetle, kaydetme")
+    args = parser.parse_args(argv)
+
+    ensure_default_files()
+    settings = SettingsStore(SETTINGS_FILE)
+    store = open_template_store(settings)
+
+    def show(done: int, total: int):
+        print(f"\r{done * 100 // max(1, total):3d}%", end="", file=sys.stderr, flush=True)
+
+    try:
+        if args.command == "import":
+            report = import_file(store, args.path, args.format, args.category, args.dry_run, progress=show)
+            print(file=sys.stderr)
+            print(report.summary())
+            if report.save_error is not None:
+                return 1
+            if report.added and not args.dry_run:
+                store.compact()
+                # A running hotkey daemon picks the new templates up right away
+                send_command("reload", daemon_port(settings))
+        else:
+            count = export_file(store, args.path, args.format, progress=show)
+            print(file=sys.stderr)
+            print(f"{count} şablon yazıldı: {args.path}")
+    except (OSError, ValueError) as e:
+        print("Hata:", e)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
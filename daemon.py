@@ -0,0 +1,233 @@
+import os, sys, json, socket, secrets, argparse, threading, socketserver
+from typing import Optional, Dict, Any, List
+
+from store import SettingsStore, ensure_default_files, open_template_store, resource_path, SETTINGS_FILE
+from dispatch import PasteRequest, queue_from_settings
+from placeholders import PlaceholderCache, default_builtins
+from hotkeys import HotkeyManager
+from profiling import PROFILER, LOG_FILE, configure_from_settings
+from paste import PasteEngine, KeyboardHooks, NullKeyboard, MemoryClipboard, system_clipboard, engine_from_settings
+
+# Headless hotkey daemon: serves template pastes on global hotkeys without
+# loading Qt. The GUI (app.py) becomes an optional editor; when it is
+# running it tells the daemon to reload over a local JSON-lines socket.
+#
+#   python daemon.py              # serve hotkeys
+#   python daemon.py --dry-run    # no key hooks/injection, clipboard in memory
+#
+# Protocol: one JSON object per line, answered with one JSON object.
+#   {"token": ..., "cmd": "ping" | "reload" | "stop" | "status"}
+#   {"token": ..., "cmd": "trigger", "combo": "ctrl+shift+t"}   # as if pressed
+#       optional "values": {"musteri_adi": ...} for the template's variables
+# "status" includes the dispatch queue's p50/p99 hotkey-to-paste latencies.
+# The token is random per daemon run and stored in daemon.token next to
+# settings.json, so only local users who can read that file can talk to it.
+
+DAEMON_HOST = "127.0.0.1"
+DEFAULT_PORT = 47813
+TOKEN_FILE = "daemon.token"
+
+# ---------- Daemon ----------
+class HotkeyDaemon:
+    def __init__(self, settings: SettingsStore, store, keyboard, clipboard, engine: Optional[PasteEngine] = None):
+        self.settings = settings
+        self.store = store
+        self.keyboard = keyboard
+        self.clipboard = clipboard
+        # Clipboard/settle/Ctrl+V/restore steps run on timer threads
+        self.engine = engine or engine_from_settings(settings.settings, clipboard, keyboard)
+        # No prompt without a GUI: variables get the last values sent with
+        # "trigger" ({"values": {...}}), built-ins are computed at paste time
+        self.placeholders = PlaceholderCache()
+        self.builtins = default_builtins(clipboard.get_text)
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server: Optional[socketserver.BaseServer] = None
+        # Hook callbacks only enqueue; one worker thread feeds the paste engine in order
+        self.queue = queue_from_settings(settings.settings)
+        self.hotkeys = HotkeyManager(keyboard, self.queue.put)
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self):
+        self._worker = threading.Thread(target=self._consume, name="paste-worker", daemon=True)
+        self._worker.start()
+
+    # --- Hotkeys ---
+    def register_hotkeys(self):
+        # Only the combos that changed are re-hooked (see hotkeys.py)
+        self.hotkeys.apply(self.settings.settings.get("hotkeys", {}))
+        for combo, what in self.hotkeys.conflicts:
+            print(f"Kısayol '{combo}': {what}")
+
+    def unregister_hotkeys(self):
+        self.hotkeys.clear()
+
+    def fire(self, combo: str) -> bool:
+        # As if the combo was pressed ("trigger"): enqueue its template
+        tpl_id = self.hotkeys.target(combo)
+        if not tpl_id:
+            return False
+        return self.queue.put(combo, tpl_id)
+
+    def _consume(self):
+        while not self._stopped.is_set():
+            req = self.queue.take(timeout=None)
+            if req is None:
+                continue
+            if not self.paste(req):
+                self.queue.done(req)
+
+    def paste(self, req: PasteRequest) -> bool:
+        # Hand the template to the paste engine; the request completes when
+        # Ctrl+V has been sent
+        with self._lock:
+            tpl = self.store.get_template_by_id(req.template_id)
+            if not tpl:
+                return False
+            text = self.placeholders.render(tpl, None, self.builtins)
+        self.engine.submit(text, request=req, on_done=lambda: self.queue.done(req))
+        return True
+
+    def reload(self):
+        with self._lock:
+            self.settings.load()
+            if getattr(self.store, "shared", None) is not None:
+                # Only the templates the writer logged as changed (see shared.py)
+                result = self.store.sync_external()
+                for tid in (result.changed + result.removed if result else []):
+                    self.placeholders.invalidate(tid)
+            else:
+                self.store.load()
+                self.placeholders.clear()
+            self.register_hotkeys()
+            self.reloads += 1
+
+    # --- IPC ---
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        cmd = request.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if cmd == "reload":
+            self.reload()
+            return {"ok": True}
+        if cmd == "trigger":
+            values = request.get("values")
+            if isinstance(values, dict):
+                self.placeholders.last_values.update({str(k): str(v) for k, v in values.items()})
+            return {"ok": self.fire(str(request.get("combo", "")))}
+        if cmd == "status":
+            return {"ok": True, "hotkeys": sorted(self.hotkeys.table), "pastes": self.engine.pasted, "reloads": self.reloads,
+                    "conflicts": [f"{combo}: {what}" for combo, what in self.hotkeys.conflicts],
+                    "dispatch": self.queue.report(), "profile": PROFILER.snapshot()}
+        if cmd == "stop":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"bilinmeyen komut: {cmd}"}
+
+    def serve(self, port: int, token: str):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if not secrets.compare_digest(str(request.get("token", "")), token):
+                            reply = {"ok": False, "error": "yetkisiz"}
+                        else:
+                            reply = daemon.handle(request)
+                    except Exception as e:
+                        reply = {"ok": False, "error": str(e)}
+                    self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server((DAEMON_HOST, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        self.unregister_hotkeys()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._stopped.set()
+        self.queue.wake()
+
+    def wait(self):
+        self._stopped.wait()
+
+# ---------- Client (used by the GUI) ----------
+def daemon_port(settings: SettingsStore) -> int:
+    return int(settings.settings.get("daemon_port", DEFAULT_PORT))
+
+def send_command(cmd: str, port: int = DEFAULT_PORT, timeout: float = 0.5, **fields) -> Optional[Dict[str, Any]]:
+    # Returns the daemon's reply, or None when no daemon is listening
+    try:
+        with open(resource_path(TOKEN_FILE), "r", encoding="utf-8") as f:
+            token = f.read().strip()
+    except OSError:
+        return None
+    request = dict(fields, cmd=cmd, token=token)
+    try:
+        with socket.create_connection((DAEMON_HOST, port), timeout=timeout) as sock:
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Şablon Yöneticisi kısayol servisi (Qt olmadan)")
+    parser.add_argument("--port", type=int, default=None, help=f"IPC portu (varsayılan {DEFAULT_PORT})")
+    parser.add_argument("--dry-run", action="store_true", help="tuş kancası ve gerçek pano kullanma")
+    args = parser.parse_args(argv)
+
+    ensure_default_files()
+    settings = SettingsStore(SETTINGS_FILE)
+    configure_from_settings(settings.settings, resource_path(LOG_FILE))
+    store = open_template_store(settings)
+    port = args.port if args.port is not None else daemon_port(settings)
+    if send_command("ping", port) is not None:
+        print("Servis zaten çalışıyor.")
+        return 1
+
+    if args.dry_run:
+        keyboard, clipboard = NullKeyboard(), MemoryClipboard()
+    else:
+        try:
+            keyboard = KeyboardHooks()
+            keyboard.load()
+        except Exception as e:
+            print("'keyboard' modülü yüklenemedi (pip install keyboard):", e)
+            return 1
+        clipboard = system_clipboard()
+
+    daemon = HotkeyDaemon(settings, store, keyboard, clipboard)
+    daemon.start()
+    daemon.register_hotkeys()
+    token = secrets.token_hex(16)
+    port = daemon.serve(port, token)
+    token_path = resource_path(TOKEN_FILE)
+    with open(token_path, "w", encoding="utf-8") as f:
+        f.write(token)
+    print(f"Kısayol servisi çalışıyor (127.0.0.1:{port}). Durdurmak için Ctrl+C.")
+    try:
+        daemon.wait()
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        PROFILER.close_log()
+        try:
+            os.remove(token_path)
+        except OSError:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,387 @@
+import sys, bisect, hashlib, argparse
+from array import array
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Hashable
+
+from search import tokenize
+
+# Exact and near-duplicate templates, without comparing every pair.
+#
+#   python dedup.py                  # report for the whole library
+#   python dedup.py --threshold 0.7
+#
+# Exact: a template's text, whitespace collapsed, hashed to 64 bits.
+# Near: MinHash over the folded word pairs ("shingles") of the text, as
+# one-permutation hashing: every shingle is hashed once and kept as the
+# minimum of one of SKETCH bins, empty bins are filled from their right
+# neighbour. Two sketches agree in a bin with probability equal to the
+# Jaccard similarity of the shingle sets, so the share of equal bins
+# estimates it. Only 16 bits of each bin are kept (64 bytes a template).
+#
+# Candidates come from LSH: BANDS bands of ROWS bins each, so templates that
+# agree on a whole band share a bucket. With 8 x 4, a pair at 80% similarity
+# shares a bucket with 98.5% probability, one at 30% with 6%. A lookup
+# touches only those buckets; nothing is compared with the whole library.
+#
+# Buckets (and the exact hashes) are sorted array('Q')s of
+# (40-bit key << 24 | template number), searched with bisect: 8 bytes an
+# entry instead of a dict entry and int objects per template and band.
+# Edits don't insert into the arrays (a memmove of the whole table each):
+# new entries wait in a small dict per table and removed template numbers
+# in a stale set, and both are merged into the arrays in one sort once they
+# reach an eighth of the library.
+#
+# Python's str hash is used for shingles, so sketches differ between runs;
+# the index only lives in memory (TemplateStore builds it on first use and
+# then keeps it current, like search.SearchIndex).
+
+SHINGLE = 2
+# Bins per sketch; a power of two (the low bits of a hash pick the bin)
+SKETCH = 32
+BANDS = 8
+ROWS = SKETCH // BANDS
+# Estimated similarity from which two templates count as near duplicates
+NEAR_THRESHOLD = 0.75
+# Largest bucket whose members are compared pairwise for the report
+MAX_BUCKET = 64
+# Pending edits before the tables are re-sorted: at least this many, or an
+# eighth of the library
+MERGE_MIN = 256
+
+_HASHED = 1
+_SKETCHED = 2
+_NUM_BITS = 24
+_NUM_MASK = (1 << _NUM_BITS) - 1
+_MASK64 = (1 << 64) - 1
+_BIN_MASK = SKETCH - 1
+_TOP16 = (48).__rrshift__
+_GOLDEN = 0x9E3779B97F4A7C15
+
+def content_hash(text: str) -> int:
+    norm = " ".join(text.split())
+    return int.from_bytes(hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest(), "little")
+
+def shingles(text: str) -> set:
+    words = tokenize(text)
+    if len(words) <= SHINGLE:
+        return {" ".join(words)} if words else set()
+    return set(map(" ".join, zip(*(words[i:] for i in range(SHINGLE)))))
+
+def sketch(text: str) -> Optional[array]:
+    # SKETCH 16-bit bin fingerprints; None for a text without words
+    found = shingles(text)
+    if not found:
+        return None
+    # The low bits of a shingle's hash pick its bin; sorted high to low, the
+    # last one written to a bin is its minimum, and the loop stays in C
+    hashes = sorted(map(_MASK64.__and__, map(hash, found)), reverse=True)
+    mins = dict(zip(map(_BIN_MASK.__and__, hashes), hashes))
+    bins = list(map(mins.get, range(SKETCH)))
+    if len(mins) < SKETCH:
+        for i in range(SKETCH):
+            if bins[i] is None:
+                # Densification: the next filled bin, salted with the distance
+                d = 1
+                while (i + d) % SKETCH not in mins:
+                    d += 1
+                bins[i] = (mins[(i + d) % SKETCH] ^ d * _GOLDEN) * _GOLDEN & _MASK64
+    return array("H", map(_TOP16, bins))
+
+def _band_keys(sk: array) -> List[int]:
+    # A band's ROWS bins read as one integer, mixed and cut to 40 bits
+    raw = sk.tobytes()
+    step = 2 * ROWS
+    return [(int.from_bytes(raw[i:i + step], "little") * _GOLDEN & _MASK64) >> _NUM_BITS
+            for i in range(0, len(raw), step)]
+
+class _Table:
+    # Sorted (key << 24 | number) entries, and those added since the last
+    # merge as key -> numbers
+    __slots__ = ("sorted", "recent")
+
+    def __init__(self, entries: Iterable[int] = ()):
+        self.sorted = array("Q", sorted(entries))
+        self.recent: Dict[int, List[int]] = {}
+
+    def add(self, entry: int):
+        self.recent.setdefault(entry >> _NUM_BITS, []).append(entry & _NUM_MASK)
+
+    def discard(self, key: int, n: int):
+        # Only from the recent entries; sorted ones are left to the stale set
+        nums = self.recent.get(key)
+        if nums and n in nums:
+            nums.remove(n)
+            if not nums:
+                del self.recent[key]
+
+    def bucket(self, key: int, stale: set) -> List[int]:
+        table = self.sorted
+        lo = bisect.bisect_left(table, key << _NUM_BITS)
+        hi = bisect.bisect_left(table, (key + 1) << _NUM_BITS, lo)
+        nums = [n for n in map(_NUM_MASK.__and__, table[lo:hi]) if n not in stale]
+        nums.extend(self.recent.get(key, ()))
+        return nums
+
+    def merge(self, stale: set):
+        entries = [e for e in self.sorted if e & _NUM_MASK not in stale]
+        entries.extend(key << _NUM_BITS | n for key, nums in self.recent.items() for n in nums)
+        self.sorted = array("Q", sorted(entries))
+        self.recent = {}
+
+class DuplicateIndex:
+    def __init__(self):
+        self._ids: List[Optional[Hashable]] = []
+        self._nums: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+        # Per template number: content hash, what is indexed (_HASHED,
+        # _SKETCHED; nothing for a blank text), the sketch
+        self._hashes = array("Q")
+        self._kinds = bytearray()
+        self._sketches = array("H")
+        # (key << 24 | number): content hashes, and one table per band
+        self._exact = _Table()
+        self._bands = [_Table() for _ in range(BANDS)]
+        # Numbers whose sorted entries are out of date, and the edits since
+        # the last merge
+        self._stale: set = set()
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return len(self._nums)
+
+    def clear(self):
+        self.__init__()
+
+    def build(self, templates: Iterable[Tuple[Hashable, Dict[str, str]]]):
+        # Bulk load of (id, template) pairs; the tables are sorted once
+        self.clear()
+        exact: List[int] = []
+        bands: List[List[int]] = [[] for _ in range(BANDS)]
+        for tid, tpl in templates:
+            n = self._new_number(tid)
+            exact_entry, band_entries = self._describe(n, tpl.get("text", ""))
+            if exact_entry is not None:
+                exact.append(exact_entry)
+            for table, entry in zip(bands, band_entries):
+                table.append(entry)
+        self._exact = _Table(exact)
+        self._bands = [_Table(entries) for entries in bands]
+
+    def add(self, tid: Hashable, text: str):
+        if tid in self._nums:
+            self.remove(tid)
+        n = self._new_number(tid)
+        exact_entry, band_entries = self._describe(n, text)
+        if exact_entry is not None:
+            self._exact.add(exact_entry)
+        for table, entry in zip(self._bands, band_entries):
+            table.add(entry)
+        self._edited()
+
+    def update(self, tid: Hashable, text: str):
+        self.add(tid, text)
+
+    def remove(self, tid: Hashable):
+        n = self._nums.pop(tid, None)
+        if n is None:
+            return
+        if self._kinds[n] & _HASHED:
+            self._exact.discard(self._hashes[n] >> _NUM_BITS, n)
+        if self._kinds[n] & _SKETCHED:
+            for table, key in zip(self._bands, _band_keys(self._sketch_of(n))):
+                table.discard(key, n)
+        # Entries of n in the sorted arrays (if any) are skipped from now on;
+        # a reused n gets its new ones in recent
+        self._stale.add(n)
+        self._ids[n] = None
+        self._kinds[n] = 0
+        self._free.append(n)
+        self._edited()
+
+    def _edited(self):
+        self._pending += 1
+        if self._pending >= max(MERGE_MIN, len(self._nums) // 8):
+            self._merge()
+
+    def _merge(self):
+        for table in [self._exact] + self._bands:
+            table.merge(self._stale)
+        self._stale = set()
+        self._pending = 0
+
+    def _new_number(self, tid: Hashable) -> int:
+        if self._free:
+            n = self._free.pop()
+            self._ids[n] = tid
+        else:
+            n = len(self._ids)
+            if n > _NUM_MASK:
+                raise OverflowError("too many templates for the duplicate index")
+            self._ids.append(tid)
+            self._hashes.append(0)
+            self._kinds.append(0)
+            self._sketches.extend(array("H", [0]) * SKETCH)
+        self._nums[tid] = n
+        return n
+
+    def _describe(self, n: int, text: str) -> Tuple[Optional[int], List[int]]:
+        # Store template n's hash and sketch; its exact and band table entries.
+        # Blank texts are not duplicates of each other
+        self._kinds[n] = 0
+        if not text.strip():
+            return None, []
+        h = content_hash(text)
+        self._hashes[n] = h
+        self._kinds[n] = _HASHED
+        sk = sketch(text)
+        if sk is None:
+            return (h >> _NUM_BITS) << _NUM_BITS | n, []
+        self._kinds[n] |= _SKETCHED
+        self._sketches[n * SKETCH:(n + 1) * SKETCH] = sk
+        return (h >> _NUM_BITS) << _NUM_BITS | n, [key << _NUM_BITS | n for key in _band_keys(sk)]
+
+    def _sketch_of(self, n: int) -> array:
+        return self._sketches[n * SKETCH:(n + 1) * SKETCH]
+
+    def _similarity(self, sk: array, n: int) -> float:
+        other = self._sketch_of(n)
+        return sum(a == b for a, b in zip(sk, other)) / SKETCH
+
+    # --- Lookups ---
+    def exact(self, text: str, exclude: Optional[Hashable] = None) -> List[Hashable]:
+        # Templates whose text is the same (up to whitespace)
+        if not text.strip():
+            return []
+        h = content_hash(text)
+        out = []
+        for n in self._exact.bucket(h >> _NUM_BITS, self._stale):
+            if self._hashes[n] == h and self._ids[n] != exclude:
+                out.append(self._ids[n])
+        return out
+
+    def similar(self, text: str, threshold: float = NEAR_THRESHOLD, limit: int = 10,
+                exclude: Optional[Hashable] = None) -> List[Tuple[Hashable, float]]:
+        # (id, estimated similarity) of near duplicates, most similar first;
+        # exact duplicates are left to exact()
+        sk = sketch(text)
+        if sk is None:
+            return []
+        h = content_hash(text)
+        seen = set()
+        found = []
+        for table, key in zip(self._bands, _band_keys(sk)):
+            for n in table.bucket(key, self._stale):
+                if n in seen:
+                    continue
+                seen.add(n)
+                if self._ids[n] == exclude or self._hashes[n] == h:
+                    continue
+                score = self._similarity(sk, n)
+                if score >= threshold:
+                    found.append((score, n))
+        found.sort(key=lambda item: -item[0])
+        return [(self._ids[n], score) for score, n in found[:limit]]
+
+    def groups(self, threshold: float = NEAR_THRESHOLD) -> Tuple[List[List[Hashable]], List[List[Tuple[Hashable, float]]]]:
+        # Whole-library report: groups of exact duplicates, and clusters of
+        # near duplicates as (id, similarity to the cluster's first) lists
+        if self._pending:
+            self._merge()
+        exact_groups = []
+        run: List[int] = []
+        for entry in list(self._exact.sorted) + [-1]:
+            n = entry & _NUM_MASK if entry >= 0 else -1
+            if run and (n < 0 or self._hashes[n] >> _NUM_BITS != self._hashes[run[0]] >> _NUM_BITS):
+                by_hash: Dict[int, List[int]] = {}
+                for m in run:
+                    by_hash.setdefault(self._hashes[m], []).append(m)
+                exact_groups.extend(sorted(g) for g in by_hash.values() if len(g) > 1)
+                run = []
+            if n >= 0:
+                run.append(n)
+
+        # Union-find over pairs that share a bucket and pass the threshold;
+        # of each exact group only the first takes part
+        copies = {n for g in exact_groups for n in g[1:]}
+        parent: Dict[int, int] = {}
+
+        def root(n: int) -> int:
+            while parent[n] != n:
+                parent[n] = parent[parent[n]]
+                n = parent[n]
+            return n
+
+        checked = set()
+        for table in (band.sorted for band in self._bands):
+            start = 0
+            while start < len(table):
+                key = table[start] >> _NUM_BITS
+                end = start + 1
+                while end < len(table) and table[end] >> _NUM_BITS == key:
+                    end += 1
+                members = [n for n in map(_NUM_MASK.__and__, table[start:min(end, start + MAX_BUCKET)])
+                           if n not in copies]
+                start = end
+                for i, a in enumerate(members):
+                    sk = self._sketch_of(a)
+                    for b in members[i + 1:]:
+                        pair = (a, b) if a < b else (b, a)
+                        if pair in checked or self._hashes[a] == self._hashes[b]:
+                            continue
+                        checked.add(pair)
+                        if self._similarity(sk, b) >= threshold:
+                            parent.setdefault(a, a)
+                            parent.setdefault(b, b)
+                            ra, rb = root(a), root(b)
+                            if ra != rb:
+                                parent[max(ra, rb)] = min(ra, rb)
+        clusters: Dict[int, List[int]] = {}
+        for n in sorted(parent):
+            clusters.setdefault(root(n), []).append(n)
+        near_groups = []
+        for members in clusters.values():
+            first = self._sketch_of(members[0])
+            near_groups.append([(self._ids[n], 1.0 if i == 0 else self._similarity(first, n))
+                                for i, n in enumerate(members)])
+        ids = self._ids
+        return [[ids[n] for n in g] for g in exact_groups], sorted(near_groups, key=len, reverse=True)
+
+# ---------- Report ----------
+def format_report(store, exact: List[List[Dict[str, Any]]], near: List[List[Tuple[Dict[str, Any], float]]],
+                  threshold: float = NEAR_THRESHOLD) -> str:
+    # Groups as returned by TemplateStore.duplicate_groups(); in each group the
+    # first template is the one to keep, the others can be merged into it
+    def describe(tpl: Dict[str, Any]) -> str:
+        cat = store.get_category_of(tpl["id"])
+        return f"{tpl.get('title', '')}  [{cat['name'] if cat else '?'}]"
+
+    extra = sum(len(g) - 1 for g in exact)
+    lines = [f"Birebir aynı metin: {len(exact)} grup, {extra} fazla şablon",
+             f"Benzer metin (%{round(threshold * 100)} ve üzeri): {len(near)} grup, "
+             f"{sum(len(g) - 1 for g in near)} şablon", ""]
+    for i, group in enumerate(exact, 1):
+        lines.append(f"Aynı #{i}:")
+        lines.append(f"  tut:        {describe(group[0])}")
+        lines.extend(f"  birleştir:  {describe(tpl)}" for tpl in group[1:])
+    if exact:
+        lines.append("")
+    for i, group in enumerate(near, 1):
+        lines.append(f"Benzer #{i}:")
+        lines.append(f"  tut:         {describe(group[0][0])}")
+        lines.extend(f"  %{round(score * 100)} benzer: {describe(tpl)}" for tpl, score in group[1:])
+    return "\n".join(lines).rstrip()
+
+def main(argv: List[str]) -> int:
+    from store import SettingsStore, open_template_store, ensure_default_files, SETTINGS_FILE
+
+    parser = argparse.ArgumentParser(description="Aynı ve benzer şablonları listele")
+    parser.add_argument("--threshold", type=float, default=NEAR_THRESHOLD, help="benzerlik eşiği (0-1)")
+    args = parser.parse_args(argv)
+
+    ensure_default_files()
+    store = open_template_store(SettingsStore(SETTINGS_FILE))
+    exact, near = store.duplicate_groups(args.threshold)
+    print(format_report(store, exact, near, args.threshold))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,142 @@
+import time, threading
+from collections import deque
+from typing import Optional, Dict, Any, Callable
+
+from profiling import PROFILER, nearest_rank
+
+# Hotkey dispatch: the keyboard hook thread only enqueues PasteRequests and a
+# single consumer (the GUI thread in app.py, a worker thread in daemon.py)
+# takes them in order and performs the clipboard/paste step.
+
+# What to do with a hotkey that arrives while earlier ones are still pending:
+#   "queue" - keep it (up to max_pending), pastes run in arrival order
+#   "merge" - drop it if it repeats the newest pending combo (key bounce/auto-repeat)
+#   "drop"  - drop it; only one paste is pending at a time
+BURST_POLICIES = ("queue", "merge", "drop")
+
+class PasteRequest:
+    __slots__ = ("combo", "template_id", "t_key", "t_dequeue", "t_clipboard", "t_paste")
+
+    def __init__(self, combo: str, template_id: str):
+        self.combo = combo
+        self.template_id = template_id
+        # perf_counter() stamps: key release -> dequeue -> clipboard set -> Ctrl+V sent
+        self.t_key = time.perf_counter()
+        self.t_dequeue: Optional[float] = None
+        self.t_clipboard: Optional[float] = None
+        self.t_paste: Optional[float] = None
+
+    def stamp_clipboard(self):
+        self.t_clipboard = time.perf_counter()
+
+    def stamp_paste(self):
+        self.t_paste = time.perf_counter()
+
+class LatencyStats:
+    # Rolling window of per-stage latencies (milliseconds) of finished requests
+    STAGES = ("queue", "clipboard", "paste", "total")
+
+    def __init__(self, window: int = 1000):
+        self._samples: Dict[str, deque] = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, req: PasteRequest):
+        if req.t_dequeue is None or req.t_clipboard is None:
+            return
+        end = req.t_paste if req.t_paste is not None else req.t_clipboard
+        with self._lock:
+            self._samples["queue"].append((req.t_dequeue - req.t_key) * 1000.0)
+            self._samples["clipboard"].append((req.t_clipboard - req.t_dequeue) * 1000.0)
+            if req.t_paste is not None:
+                self._samples["paste"].append((req.t_paste - req.t_clipboard) * 1000.0)
+            self._samples["total"].append((end - req.t_key) * 1000.0)
+            self.count += 1
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        # {"total": {"p50": ms, "p99": ms, "max": ms, "n": count}, ...}
+        result = {}
+        with self._lock:
+            for stage, samples in self._samples.items():
+                if samples:
+                    ordered = sorted(samples)
+                    result[stage] = {"p50": nearest_rank(ordered, 50), "p99": nearest_rank(ordered, 99),
+                                     "max": ordered[-1], "n": len(ordered)}
+        return result
+
+    def summary(self) -> str:
+        lines = []
+        for stage, p in self.percentiles().items():
+            lines.append(f"{stage}: p50 {p['p50']:.1f} ms, p99 {p['p99']:.1f} ms, en fazla {p['max']:.1f} ms (n={p['n']})")
+        return "\n".join(lines) or "Henüz ölçüm yok."
+
+class HotkeyQueue:
+    def __init__(self, policy: str = "queue", max_pending: int = 32, on_ready: Optional[Callable[[], None]] = None):
+        self.policy = policy if policy in BURST_POLICIES else "queue"
+        self.max_pending = max(1, max_pending)
+        # Called (on the producing thread) after a request was enqueued; the
+        # consumer uses it to schedule a drain on its own thread
+        self.on_ready = on_ready
+        self.stats = LatencyStats()
+        self.dropped = 0
+        self.merged = 0
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        # Requests taken by the consumer and not yet done()
+        self._in_flight = 0
+
+    def put(self, combo: str, template_id: str) -> bool:
+        # Hook thread side: enqueue only, never touch the clipboard here
+        req = PasteRequest(combo, template_id)
+        with self._cond:
+            PROFILER.count("hotkey.requests")
+            if self.policy == "drop" and (self._pending or self._in_flight):
+                self.dropped += 1
+                return False
+            if self.policy == "merge" and self._pending and self._pending[-1].combo == combo:
+                self.merged += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append(req)
+            self._cond.notify()
+        if self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def take(self, timeout: Optional[float] = 0.0) -> Optional[PasteRequest]:
+        # Consumer side; timeout=None blocks until a request arrives
+        with self._cond:
+            if not self._pending and timeout != 0.0:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+            req = self._pending.popleft()
+            self._in_flight += 1
+        req.t_dequeue = time.perf_counter()
+        return req
+
+    def done(self, req: PasteRequest):
+        with self._cond:
+            self._in_flight -= 1
+        self.stats.record(req)
+        if PROFILER.enabled and req.t_paste is not None:
+            PROFILER.record("hotkey.to_paste", (req.t_paste - req.t_key) * 1000.0, combo=req.combo)
+
+    def wake(self):
+        # Unblock a consumer waiting in take() (shutdown)
+        with self._cond:
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def report(self) -> Dict[str, Any]:
+        return {"latency_ms": self.stats.percentiles(), "completed": self.stats.count,
+                "dropped": self.dropped, "merged": self.merged, "pending": self.pending()}
+
+def queue_from_settings(settings: Dict[str, Any], on_ready: Optional[Callable[[], None]] = None) -> HotkeyQueue:
+    return HotkeyQueue(policy=settings.get("hotkey_burst_policy", "queue"),
+                       max_pending=int(settings.get("hotkey_queue_max", 32)), on_ready=on_ready)
@@ -0,0 +1,199 @@
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
+
+# Undo/redo for the editor (app.py). Every step records the inverse of one
+# store operation and holds only what that operation touched: a deleted
+# category keeps its own template list (the very objects the store held, not
+# a copy), an edit keeps the old and new title/text. Nothing is ever copied
+# from the rest of the library, so a step costs memory in proportion to the
+# change. Works with TemplateStore and SqliteTemplateStore alike.
+#
+# Categories are addressed by position and checked by name before anything
+# is changed; templates by id. A step whose target has moved (e.g. merged
+# changes from another instance) raises LookupError and nothing is applied.
+
+def _check_category(store, index: int, name: str):
+    cats = store.list_categories()
+    if not 0 <= index < len(cats) or cats[index]["name"] != name:
+        raise LookupError(f"kategori bulunamadı: {name}")
+
+def _detach(templates: List[Dict[str, Any]]):
+    # Templates taken out of the store: lazy_storage ones read their body
+    # from the file the next write replaces, so it is read in now
+    for tpl in templates:
+        has_body = getattr(tpl, "has_body", None)
+        if has_body is not None and not has_body():
+            tpl["text"] = tpl["text"]
+
+def _position(store, template_id: str) -> Tuple[int, int]:
+    pos = store.find_template(template_id)
+    if pos is None:
+        raise LookupError(f"şablon bulunamadı: {template_id}")
+    return pos
+
+class AddCategory:
+    __slots__ = ("index", "name")
+    label = "Kategori ekleme"
+
+    def __init__(self, index: int, name: str):
+        self.index = index
+        self.name = name
+
+    def undo(self, store):
+        _check_category(store, self.index, self.name)
+        if store.list_templates(self.index):
+            raise LookupError(f"kategori boş değil: {self.name}")
+        store.delete_category(self.index)
+
+    def redo(self, store):
+        store.insert_category(self.index, self.name, [])
+
+class RenameCategory:
+    __slots__ = ("index", "old", "new")
+    label = "Kategori adlandırma"
+
+    def __init__(self, index: int, old: str, new: str):
+        self.index = index
+        self.old = old
+        self.new = new
+
+    def undo(self, store):
+        _check_category(store, self.index, self.new)
+        store.rename_category(self.index, self.old)
+
+    def redo(self, store):
+        _check_category(store, self.index, self.old)
+        store.rename_category(self.index, self.new)
+
+class DeleteCategory:
+    __slots__ = ("index", "name", "templates")
+    label = "Kategori silme"
+
+    def __init__(self, index: int, name: str, templates: List[Dict[str, Any]]):
+        # `templates`: the category's list, taken before it was deleted
+        self.index = index
+        self.name = name
+        self.templates = templates
+        _detach(templates)
+
+    def undo(self, store):
+        store.insert_category(self.index, self.name, self.templates)
+
+    def redo(self, store):
+        _check_category(store, self.index, self.name)
+        self.templates = store.list_templates(self.index)
+        _detach(self.templates)
+        store.delete_category(self.index)
+
+class AddTemplate:
+    __slots__ = ("cat_index", "cat_name", "template_id", "template")
+    label = "Şablon ekleme"
+
+    def __init__(self, cat_index: int, cat_name: str, template_id: str):
+        self.cat_index = cat_index
+        self.cat_name = cat_name
+        self.template_id = template_id
+        # Taken when undone, put back on redo
+        self.template: Optional[Dict[str, Any]] = None
+
+    def undo(self, store):
+        pos = _position(store, self.template_id)
+        self.template = store.get_template_by_id(self.template_id)
+        _detach([self.template])
+        store.delete_template(*pos)
+
+    def redo(self, store):
+        _check_category(store, self.cat_index, self.cat_name)
+        store.insert_template(self.cat_index, len(store.list_templates(self.cat_index)), self.template)
+
+class EditTemplate:
+    __slots__ = ("template_id", "old", "new")
+    label = "Şablon düzenleme"
+
+    def __init__(self, template_id: str, old: Tuple[str, str], new: Tuple[str, str]):
+        # (title, text) before and after
+        self.template_id = template_id
+        self.old = old
+        self.new = new
+
+    def undo(self, store):
+        store.edit_template(*_position(store, self.template_id), *self.old)
+
+    def redo(self, store):
+        store.edit_template(*_position(store, self.template_id), *self.new)
+
+class DeleteTemplate:
+    __slots__ = ("cat_index", "cat_name", "pos", "template")
+    label = "Şablon silme"
+
+    def __init__(self, cat_index: int, cat_name: str, pos: int, template: Dict[str, Any]):
+        self.cat_index = cat_index
+        self.cat_name = cat_name
+        self.pos = pos
+        self.template = template
+        _detach([template])
+
+    @property
+    def template_id(self) -> str:
+        return self.template["id"]
+
+    def undo(self, store):
+        _check_category(store, self.cat_index, self.cat_name)
+        store.insert_template(self.cat_index, self.pos, self.template)
+
+    def redo(self, store):
+        store.delete_template(*_position(store, self.template_id))
+
+class UndoHistory:
+    # Two stacks of steps; the oldest undo steps fall off past `depth`
+    def __init__(self, depth: int = 100):
+        self.depth = max(1, depth)
+        self._undo: deque = deque(maxlen=self.depth)
+        self._redo: List[Any] = []
+
+    def record(self, step: Any):
+        # A new change; whatever was undone can no longer be redone
+        self._undo.append(step)
+        self._redo.clear()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo_label(self) -> Optional[str]:
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self) -> Optional[str]:
+        return self._redo[-1].label if self._redo else None
+
+    def undo(self, store) -> Optional[Any]:
+        # The step undone, None if there was none; LookupError (history
+        # cleared) if its target is gone
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        try:
+            step.undo(store)
+        except (LookupError, ValueError):
+            self.clear()
+            raise
+        self._redo.append(step)
+        return step
+
+    def redo(self, store) -> Optional[Any]:
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        try:
+            step.redo(store)
+        except (LookupError, ValueError):
+            self.clear()
+            raise
+        self._undo.append(step)
+        return step
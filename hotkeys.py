@@ -0,0 +1,145 @@
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from profiling import PROFILER
+
+# Global hotkey table shared by the GUI (app.py) and the daemon (daemon.py).
+# settings.json "hotkeys" maps any number of combos to template ids (null =
+# listed but unassigned):
+#   "ctrl+shift+t"      a chord
+#   "ctrl+k, ctrl+c"    a sequence: chords pressed one after another
+# Combos are normalized ("Shift+Ctrl+T" is "ctrl+shift+t") and applied as a
+# diff: only added and removed combos touch the OS hooks. Pointing a combo at
+# another template just updates its Binding, which the hook callback reads,
+# so a key press never looks anything up.
+
+MODIFIERS = ("ctrl", "alt", "alt gr", "shift", "windows")
+KEY_ALIASES = {"control": "ctrl", "ctl": "ctrl", "win": "windows", "cmd": "windows", "command": "windows",
+               "super": "windows", "meta": "windows", "option": "alt", "altgr": "alt gr",
+               "esc": "escape", "del": "delete", "ins": "insert", "return": "enter",
+               "pgup": "page up", "pgdn": "page down"}
+# Combos the app sends itself; bound, they would fire on every paste
+RESERVED = {"ctrl+v": "yapıştırmak için gönderilen tuş"}
+
+def normalize_combo(combo: str) -> str:
+    # Canonical spelling: modifiers first in a fixed order, then other keys
+    # sorted; sequence steps joined by ", ". ValueError if malformed
+    steps = []
+    for step in str(combo).lower().split(","):
+        keys = [" ".join(k.split()) for k in step.split("+")]
+        keys = [KEY_ALIASES.get(k, k) for k in keys]
+        if not all(keys):
+            raise ValueError(f"geçersiz kısayol: '{combo}'")
+        if len(set(keys)) != len(keys):
+            raise ValueError(f"aynı tuş iki kez: '{combo}'")
+        mods = [m for m in MODIFIERS if m in keys]
+        steps.append("+".join(mods + sorted(k for k in keys if k not in MODIFIERS)))
+    return ", ".join(steps)
+
+def combo_label(combo: str) -> str:
+    # "ctrl+shift+t" -> "Ctrl+Shift+T" for menus
+    return ", ".join("+".join(k.title() for k in step.split("+")) for step in combo.split(", "))
+
+def build_table(hotkeys: Dict[str, Optional[str]]) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+    # Normalized combo -> template id for the assigned entries, and the
+    # problems found as (combo, what): malformed, defined twice (the first
+    # entry is used), reserved (not registered), or shadowed by a shorter
+    # combo that fires first
+    table: Dict[str, str] = {}
+    spelled: Dict[str, str] = {}
+    conflicts: List[Tuple[str, str]] = []
+    for raw, tpl_id in hotkeys.items():
+        if not tpl_id:
+            continue
+        try:
+            combo = normalize_combo(raw)
+        except ValueError as e:
+            conflicts.append((raw, str(e)))
+            continue
+        if combo in RESERVED:
+            conflicts.append((raw, f"kullanılamaz ({RESERVED[combo]})"))
+            continue
+        if combo in table:
+            if table[combo] != tpl_id:
+                conflicts.append((raw, f"'{spelled[combo]}' ile aynı kısayol, başka bir şablona atanmış; ilki kullanılıyor"))
+            continue
+        table[combo] = tpl_id
+        spelled[combo] = raw
+    for combo in table:
+        steps = combo.split(", ")
+        for n in range(1, len(steps)):
+            prefix = ", ".join(steps[:n])
+            if prefix in table:
+                conflicts.append((spelled[combo], f"önce '{spelled[prefix]}' tetiklenir, bu sıra çalışmaz"))
+                break
+    return table, conflicts
+
+class Binding:
+    __slots__ = ("combo", "template_id", "handle")
+
+    def __init__(self, combo: str, template_id: str):
+        self.combo = combo
+        self.template_id = template_id
+        self.handle: Any = None
+
+class HotkeyManager:
+    # `keyboard`: add_hotkey(combo, callback) -> handle, remove_hotkey(handle)
+    # (paste.KeyboardHooks / NullKeyboard). on_press(combo, template id) runs
+    # on the keyboard hook thread
+    def __init__(self, keyboard, on_press: Callable[[str, str], Any]):
+        self.keyboard = keyboard
+        self.on_press = on_press
+        self.conflicts: List[Tuple[str, str]] = []
+        self._bindings: Dict[str, Binding] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def table(self) -> Dict[str, str]:
+        return {combo: b.template_id for combo, b in self._bindings.items()}
+
+    def target(self, combo: str) -> Optional[str]:
+        # Template id bound to a combo, in any spelling
+        try:
+            binding = self._bindings.get(normalize_combo(combo))
+        except ValueError:
+            return None
+        return binding.template_id if binding is not None else None
+
+    def apply(self, hotkeys: Dict[str, Optional[str]]) -> Tuple[int, int, int]:
+        # Bring the hooks in line with `hotkeys`; (added, removed, retargeted)
+        table, self.conflicts = build_table(hotkeys)
+        added = removed = retargeted = 0
+        with self._lock, PROFILER.span("hotkeys.apply"):
+            for combo in [c for c in self._bindings if c not in table]:
+                self._unhook(self._bindings.pop(combo))
+                removed += 1
+            for combo, tpl_id in table.items():
+                binding = self._bindings.get(combo)
+                if binding is not None:
+                    if binding.template_id != tpl_id:
+                        binding.template_id = tpl_id
+                        retargeted += 1
+                    continue
+                binding = Binding(combo, tpl_id)
+                try:
+                    binding.handle = self.keyboard.add_hotkey(
+                        combo, lambda b=binding: self.on_press(b.combo, b.template_id))
+                except Exception as e:
+                    # Not kept, so the next apply() tries again
+                    print(f"Hotkey '{combo}' kaydı başarısız: {e}")
+                    continue
+                self._bindings[combo] = binding
+                added += 1
+        return added, removed, retargeted
+
+    def clear(self):
+        with self._lock:
+            for binding in self._bindings.values():
+                self._unhook(binding)
+            self._bindings = {}
+
+    def _unhook(self, binding: Binding):
+        try:
+            self.keyboard.remove_hotkey(binding.handle)
+        except Exception:
+            pass
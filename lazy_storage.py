@@ -0,0 +1,324 @@
+import os, re, json, mmap, threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+from storage import write_bytes_atomic
+
+# Lazy-body variant of the JSON backend. load() scans templates.json without
+# decoding template bodies: each template keeps only its id and title, plus
+# the byte span of its "text" value in the (memory-mapped) file. Bodies are
+# decoded on first access through a small LRU cache. The file format is the
+# regular templates.json.
+
+_TOKEN = re.compile(rb'\s*(?:(")|([{}\[\]:,])|(true|false|null)|(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?))')
+_LITERALS = {b"true": True, b"false": False, b"null": None}
+# Fast path for templates in the layout this app writes: {"id", "title", "text"}
+_TEMPLATE_HEAD = re.compile(rb'\s*\{\s*"id": "([^"\\]*)",\s*"title": "([^"\\]*(?:\\.[^"\\]*)*)",\s*"text": "')
+_OBJECT_END = re.compile(rb'\s*\}')
+
+class BodySource:
+    # Byte spans of template bodies in the current file, read on demand
+    def __init__(self, path: str, cache_size: int = 256):
+        self.path = path
+        self.cache_size = cache_size
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        self.reads = 0
+        self.hits = 0
+        self._lock = threading.RLock()
+        self._file = None
+        self._buf: Any = b""
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def open(self) -> Any:
+        # Returns the mapped file contents (b"" when missing/empty)
+        with self._lock:
+            self.close()
+            try:
+                self._file = open(self.path, "rb")
+                if os.fstat(self._file.fileno()).st_size:
+                    self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # No mmap support (or no file): fall back to reading it
+                self._buf = self._file.read() if self._file else b""
+            return self._buf
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._buf, mmap.mmap):
+                self._buf.close()
+            self._buf = b""
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._cache.clear()
+
+    def raw(self, tid: str) -> bytes:
+        # The still-encoded JSON string, quotes included
+        with self._lock:
+            start, end = self.spans[tid]
+            return self._buf[start:end]
+
+    def read(self, tid: str) -> str:
+        with self._lock:
+            text = self._cache.get(tid)
+            if text is not None:
+                self.hits += 1
+                self._cache.move_to_end(tid)
+                return text
+            self.reads += 1
+            text = json.loads(self.raw(tid))
+            self._cache[tid] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return text
+
+class LazyTemplate(dict):
+    # A template dict whose "text" is fetched from its BodySource when not set
+    __slots__ = ("_source",)
+
+    def __init__(self, fields: Dict[str, Any], source: BodySource):
+        super().__init__(fields)
+        self._source = source
+
+    def __missing__(self, key: str) -> Any:
+        if key == "text":
+            return self._source.read(dict.__getitem__(self, "id"))
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def has_body(self) -> bool:
+        return dict.__contains__(self, "text")
+
+class _Scanner:
+    # Minimal JSON reader over bytes/mmap that leaves "text" strings encoded
+    def __init__(self, buf: Any, source: BodySource):
+        self.buf = buf
+        self.source = source
+        self.spans: Dict[str, Tuple[int, int]] = {}
+
+    def parse(self) -> Any:
+        value, pos = self._value(0)
+        if _TOKEN.match(self.buf, pos) is not None:
+            raise ValueError(f"Extra data at byte {pos}")
+        return value
+
+    def _token(self, pos: int):
+        m = _TOKEN.match(self.buf, pos)
+        if m is None:
+            raise ValueError(f"Invalid JSON at byte {pos}")
+        return m
+
+    def _string(self, m) -> Tuple[int, int]:
+        return self._string_at(m.start(1))
+
+    def _string_at(self, quote: int) -> Tuple[int, int]:
+        # Span of the string starting at `quote`, quotes included. The closing
+        # quote is found with find() (memchr speed), skipping escaped quotes.
+        buf = self.buf
+        start = pos = quote + 1
+        while True:
+            q = buf.find(b'"', pos)
+            if q < 0:
+                raise ValueError(f"Unterminated string at byte {start - 1}")
+            k = q - 1
+            while buf[k] == 0x5C:
+                k -= 1
+            if (q - 1 - k) % 2 == 0:
+                return start - 1, q + 1
+            pos = q + 1
+
+    def _decode(self, start: int, end: int) -> str:
+        raw = self.buf[start + 1:end - 1]
+        if b"\\" not in raw:
+            return raw.decode("utf-8")
+        return json.loads(self.buf[start:end])
+
+    def _value(self, pos: int) -> Tuple[Any, int]:
+        m = self._token(pos)
+        if m.group(1):
+            start, end = self._string(m)
+            return self._decode(start, end), end
+        if m.group(2) == b"{":
+            return self._object(m.end())
+        if m.group(2) == b"[":
+            return self._array(m.end())
+        if m.group(3):
+            return _LITERALS[m.group(3)], m.end()
+        if m.group(4):
+            return json.loads(m.group(4)), m.end()
+        raise ValueError(f"Unexpected {m.group(2)!r} at byte {m.start(2)}")
+
+    def _array(self, pos: int) -> Tuple[List[Any], int]:
+        out: List[Any] = []
+        m = self._token(pos)
+        if m.group(2) == b"]":
+            return out, m.end()
+        while True:
+            value, pos = self._template(pos) or self._value(pos)
+            out.append(value)
+            m = self._token(pos)
+            if m.group(2) == b"]":
+                return out, m.end()
+            if m.group(2) != b",":
+                raise ValueError(f"Expected ',' or ']' at byte {pos}")
+            pos = m.end()
+
+    def _template(self, pos: int) -> Optional[Tuple[Any, int]]:
+        # One regex instead of a dozen tokens for the common template layout
+        head = _TEMPLATE_HEAD.match(self.buf, pos)
+        if head is None:
+            return None
+        tid = head.group(1).decode("utf-8")
+        if tid in self.spans:
+            return None
+        span = self._string_at(head.end() - 1)
+        end = _OBJECT_END.match(self.buf, span[1])
+        if end is None:
+            return None
+        self.spans[tid] = span
+        title = self._decode(head.start(2) - 1, head.end(2) + 1)
+        return LazyTemplate({"id": tid, "title": title}, self.source), end.end()
+
+    def _object(self, pos: int) -> Tuple[Dict[str, Any], int]:
+        obj: Dict[str, Any] = {}
+        text_span = None
+        m = self._token(pos)
+        if m.group(2) == b"}":
+            return obj, m.end()
+        while True:
+            m = self._token(pos)
+            if not m.group(1):
+                raise ValueError(f"Expected key at byte {pos}")
+            start, end = self._string(m)
+            key = self._decode(start, end)
+            m = self._token(end)
+            if m.group(2) != b":":
+                raise ValueError(f"Expected ':' at byte {end}")
+            pos = m.end()
+            m = self._token(pos)
+            if key == "text" and m.group(1):
+                text_span = self._string(m)
+                pos = text_span[1]
+            else:
+                obj[key], pos = self._value(pos)
+            m = self._token(pos)
+            if m.group(2) == b"}":
+                pos = m.end()
+                break
+            if m.group(2) != b",":
+                raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+            pos = m.end()
+        if text_span is None:
+            return obj, pos
+        tid = obj.get("id")
+        if isinstance(tid, str) and tid not in self.spans:
+            self.spans[tid] = text_span
+            return LazyTemplate(obj, self.source), pos
+        obj["text"] = self._decode(*text_span)
+        return obj, pos
+
+class _Writer:
+    # Same layout as json.dumps(indent=2, ensure_ascii=False), built as bytes
+    # so lazy bodies are copied over still encoded; records the new spans
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.spans: Dict[str, Tuple[int, int]] = {}
+
+    def _put(self, b: bytes):
+        self.chunks.append(b)
+        self.size += len(b)
+
+    def value(self, v: Any, level: int):
+        if isinstance(v, dict):
+            self._object(v, level)
+        elif isinstance(v, list):
+            if not v:
+                self._put(b"[]")
+                return
+            pad = b"\n" + b"  " * (level + 1)
+            self._put(b"[")
+            for i, item in enumerate(v):
+                self._put(pad if i == 0 else b"," + pad)
+                self.value(item, level + 1)
+            self._put(b"\n" + b"  " * level + b"]")
+        else:
+            self._put(json.dumps(v, ensure_ascii=False).encode("utf-8"))
+
+    def _object(self, obj: Dict[str, Any], level: int):
+        lazy = isinstance(obj, LazyTemplate) and not obj.has_body()
+        keys = list(dict.keys(obj))
+        if lazy:
+            keys.append("text")
+        if not keys:
+            self._put(b"{}")
+            return
+        pad = b"\n" + b"  " * (level + 1)
+        self._put(b"{")
+        for i, key in enumerate(keys):
+            self._put(pad if i == 0 else b"," + pad)
+            self._put(json.dumps(key, ensure_ascii=False).encode("utf-8") + b": ")
+            tid = dict.get(obj, "id")
+            if key == "text" and isinstance(tid, str):
+                raw = obj._source.raw(tid) if lazy else json.dumps(obj["text"], ensure_ascii=False).encode("utf-8")
+                self.spans[tid] = (self.size, self.size + len(raw))
+                self._put(raw)
+            else:
+                self.value(dict.__getitem__(obj, key), level + 1)
+        self._put(b"\n" + b"  " * level + b"}")
+
+    def payload(self) -> bytes:
+        return b"".join(self.chunks)
+
+class LazyJsonBackend:
+    # Templates stay LazyTemplate dicts (no model.Template compaction)
+    compact_templates = False
+
+    def __init__(self, path: str, cache_size: int = 256):
+        self.path = path
+        self.source = BodySource(path, cache_size)
+
+    def load(self) -> Dict[str, Any]:
+        buf = self.source.open()
+        try:
+            scanner = _Scanner(buf, self.source)
+            data = scanner.parse() if len(buf) else {}
+            self.source.spans = scanner.spans
+        except ValueError as e:
+            print("Load error:", e)
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        if "categories" not in data or not isinstance(data["categories"], list):
+            data["categories"] = []
+        return data
+
+    def record(self, op: Dict[str, Any]):
+        pass
+
+    def prepare_write(self, data: Dict[str, Any], force_snapshot: bool = False) -> _Writer:
+        # Runs under the store lock: copies bodies out of the current mapping
+        writer = _Writer()
+        writer.value(data, 0)
+        return writer
+
+    def write(self, batch: _Writer):
+        # Readers wait while the mapping is swapped for the new file (a mapped
+        # file cannot be replaced on Windows)
+        with self.source._lock:
+            self.source.close()
+            try:
+                write_bytes_atomic(self.path, batch.payload())
+                self.source.spans = batch.spans
+            finally:
+                self.source.open()
+
+    def export(self, data: Dict[str, Any], path: str):
+        writer = _Writer()
+        writer.value(data, 0)
+        write_bytes_atomic(path, writer.payload())
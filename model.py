@@ -0,0 +1,154 @@
+import sys, binascii
+from collections.abc import Mapping
+from typing import Optional, Dict, Any, List, Union
+
+# Compact in-memory templates. Held as plain dicts, a template costs ~840
+# bytes at 100k entries: the dict itself, its 36-character id, and Turkish
+# text, which Python stores at 2 bytes a character once it has ş, ğ or ı.
+# Template keeps the three fields in slots instead:
+#   key     the id as 16 bytes when it is a canonical (lowercase, dashed) UUID,
+#           otherwise the id string itself
+#   _text   the text, or its UTF-8 bytes where those are smaller (see _pack)
+#   _title  likewise; the same object as _text when both are equal
+# Template is a read-only Mapping plus item assignment for "title"/"text", so
+# tpl["id"], tpl.get("title", "") and dict(tpl) work as before, and it dumps
+# back to the same JSON (storage.dump_document).
+
+FIELDS = ("id", "title", "text")
+
+# Template id as held in the store's indexes
+Key = Union[bytes, str]
+# A title or text as held in a Template
+Packed = Union[bytes, str]
+
+def id_key(tid: str) -> Key:
+    if type(tid) is str and len(tid) == 36 and tid[8] == tid[13] == tid[18] == tid[23] == "-" and tid.islower():
+        digits = tid.replace("-", "")
+        if len(digits) == 32:
+            try:
+                return binascii.unhexlify(digits)
+            except ValueError:
+                pass
+    return tid
+
+def id_str(key: Key) -> str:
+    if type(key) is bytes:
+        h = key.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return key
+
+def _pack(s: str, _size=sys.getsizeof) -> Packed:
+    # ASCII and Latin-1 strings already take a byte a character
+    size = _size(s)
+    if s.isascii() or size < 2 * len(s) + 74:
+        return s
+    b = s.encode("utf-8")
+    return b if len(b) + 33 < size else s
+
+def _unpack(v: Packed) -> str:
+    return v if type(v) is str else v.decode("utf-8")
+
+class Template(Mapping):
+    __slots__ = ("key", "_title", "_text")
+
+    def __init__(self, key: Key, title: str, text: str):
+        self.key = key
+        self._text = _pack(text)
+        self._title = self._text if title == text else _pack(title)
+
+    def __getitem__(self, field: str) -> str:
+        if field == "title":
+            return _unpack(self._title)
+        if field == "text":
+            return _unpack(self._text)
+        if field == "id":
+            return id_str(self.key)
+        raise KeyError(field)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self[field] if field in FIELDS else default
+
+    def __setitem__(self, field: str, value: str):
+        if field == "title":
+            self._title = self._text if value == self["text"] else _pack(value)
+        elif field == "text":
+            self._text = _pack(value)
+            if value == self["title"]:
+                self._title = self._text
+        else:
+            raise KeyError(field)
+
+    def __contains__(self, field: Any) -> bool:
+        return field in FIELDS
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return 3
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"id": id_str(self.key), "title": _unpack(self._title), "text": _unpack(self._text)}
+
+def template_key(tpl: Any) -> Optional[Key]:
+    # Index key of a template (compact or plain dict); None without an id
+    if type(tpl) is Template:
+        return tpl.key
+    tid = tpl.get("id")
+    return id_key(tid) if isinstance(tid, str) and tid else tid or None
+
+def make_template(fields: Any) -> Any:
+    # Only {"id", "title", "text"} (in that order, all strings) is compacted;
+    # anything else stays as it is so it is written back unchanged
+    if type(fields) is dict and tuple(fields) == FIELDS:
+        tid, title, text = fields["id"], fields["title"], fields["text"]
+        if type(tid) is str and tid and type(title) is str and type(text) is str:
+            return Template(id_key(tid), title, text)
+    return fields
+
+def compact_templates(categories: List[Dict[str, Any]]):
+    # Replace a document's template dicts (or packed (key, title, text)
+    # tuples, see pack_document) with Templates in place; make_template()
+    # inlined, as this runs once per template at startup (see storage.gc_paused)
+    new = Template.__new__
+    for cat in categories:
+        templates = cat.get("templates") if isinstance(cat, dict) else None
+        if not isinstance(templates, list):
+            continue
+        for pos, fields in enumerate(templates):
+            if type(fields) is tuple:
+                tpl = new(Template)
+                tpl.key, tpl._title, tpl._text = fields
+                templates[pos] = tpl
+                continue
+            if type(fields) is not dict or tuple(fields) != FIELDS:
+                continue
+            tid, title, text = fields["id"], fields["title"], fields["text"]
+            if type(tid) is not str or not tid or type(title) is not str or type(text) is not str:
+                continue
+            tpl = new(Template)
+            tpl.key = id_key(tid)
+            tpl._text = _pack(text)
+            tpl._title = tpl._text if title == text else _pack(title)
+            templates[pos] = tpl
+
+def plain(value: Any) -> Any:
+    # json.dumps(default=...): a Template is written as its dict
+    if type(value) is Template:
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def pack_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Copy of a document for marshal: Templates as (key, title, text) tuples
+    # of their packed fields, so a cached start skips the conversion
+    categories = []
+    for cat in data.get("categories", []):
+        templates = cat.get("templates") if isinstance(cat, dict) else None
+        if isinstance(templates, list):
+            cat = dict(cat, templates=[(tpl.key, tpl._title, tpl._text) if type(tpl) is Template else tpl
+                                       for tpl in templates])
+        categories.append(cat)
+    return dict(data, categories=categories)
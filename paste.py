@@ -0,0 +1,359 @@
+import os, sys, time, shutil, threading, subprocess
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable
+
+from profiling import PROFILER
+
+# Paste engine shared by the GUI and the daemon. It sets the clipboard, waits
+# a settle delay, sends Ctrl+V and optionally restores the previous clipboard.
+# Every wait is a scheduled callback, so nothing ever blocks the caller's loop.
+# Keyboard, clipboard, clock and scheduler are injected (the GUI schedules on
+# QTimer, the daemon on threading.Timer); adapters for both live below.
+
+# ---------- Clipboard ----------
+class MemoryClipboard:
+    # In-process clipboard (dry runs, or no system clipboard available)
+    def __init__(self):
+        self.text = ""
+
+    def get_text(self) -> str:
+        return self.text
+
+    def set_text(self, text: str):
+        self.text = text
+
+class CommandClipboard:
+    # System clipboard through platform tools (pbcopy, wl-copy, xclip, xsel)
+    def __init__(self, copy_cmd: List[str], paste_cmd: List[str]):
+        self.copy_cmd = copy_cmd
+        self.paste_cmd = paste_cmd
+
+    def get_text(self) -> str:
+        out = subprocess.run(self.paste_cmd, capture_output=True, timeout=2)
+        return out.stdout.decode("utf-8", errors="replace")
+
+    def set_text(self, text: str):
+        subprocess.run(self.copy_cmd, input=text.encode("utf-8"), timeout=2, check=True)
+
+class WindowsClipboard:
+    # Win32 clipboard via ctypes (CF_UNICODETEXT)
+    CF_UNICODETEXT = 13
+    GMEM_MOVEABLE = 0x0002
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+        self.kernel32.GlobalLock.restype = wintypes.LPVOID
+        self.kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        self.user32.GetClipboardData.restype = wintypes.HANDLE
+        self.user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+
+    def _open(self):
+        for _ in range(10):
+            if self.user32.OpenClipboard(None):
+                return
+            time.sleep(0.01)
+        raise OSError("Pano açılamadı")
+
+    def get_text(self) -> str:
+        self._open()
+        try:
+            handle = self.user32.GetClipboardData(self.CF_UNICODETEXT)
+            if not handle:
+                return ""
+            ptr = self.kernel32.GlobalLock(handle)
+            try:
+                return self.ctypes.wstring_at(ptr)
+            finally:
+                self.kernel32.GlobalUnlock(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def set_text(self, text: str):
+        data = text.encode("utf-16-le") + b"\0\0"
+        self._open()
+        try:
+            self.user32.EmptyClipboard()
+            handle = self.kernel32.GlobalAlloc(self.GMEM_MOVEABLE, len(data))
+            ptr = self.kernel32.GlobalLock(handle)
+            self.ctypes.memmove(ptr, data, len(data))
+            self.kernel32.GlobalUnlock(handle)
+            self.user32.SetClipboardData(self.CF_UNICODETEXT, handle)
+        finally:
+            self.user32.CloseClipboard()
+
+def system_clipboard():
+    if sys.platform == "win32":
+        return WindowsClipboard()
+    if sys.platform == "darwin":
+        return CommandClipboard(["pbcopy"], ["pbpaste"])
+    if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-copy"):
+        return CommandClipboard(["wl-copy"], ["wl-paste", "--no-newline"])
+    if shutil.which("xclip"):
+        return CommandClipboard(["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"])
+    if shutil.which("xsel"):
+        return CommandClipboard(["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"])
+    print("Sistem panosu bulunamadı; metinler yalnızca bellekte tutulacak.")
+    return MemoryClipboard()
+
+# ---------- Keyboard ----------
+class KeyboardHooks:
+    # Global hotkeys and key injection through the `keyboard` package, which
+    # is imported on first use (it installs OS hooks and is slow to import)
+    def __init__(self):
+        self._kb = None
+
+    def load(self):
+        if self._kb is None:
+            import keyboard  # pip install keyboard
+            self._kb = keyboard
+        return self._kb
+
+    @property
+    def kb(self):
+        return self.load()
+
+    def add_hotkey(self, combo: str, callback: Callable[[], None]) -> Any:
+        return self.kb.add_hotkey(combo, callback, suppress=False, trigger_on_release=True)
+
+    def remove_hotkey(self, handle: Any):
+        self.kb.remove_hotkey(handle)
+
+    def send(self, combo: str):
+        self.kb.press_and_release(combo)
+
+class NullKeyboard:
+    # Dry run: records bindings and key presses instead of hooking the OS
+    def __init__(self):
+        self.hotkeys: Dict[str, Callable[[], None]] = {}
+        self.sent: List[str] = []
+
+    def add_hotkey(self, combo: str, callback: Callable[[], None]) -> Any:
+        self.hotkeys[combo] = callback
+        return combo
+
+    def remove_hotkey(self, handle: Any):
+        self.hotkeys.pop(handle, None)
+
+    def send(self, combo: str):
+        self.sent.append(combo)
+        print("tuş:", combo)
+
+def foreground_window() -> str:
+    # Key of the window that will receive the paste (per-target rate limit).
+    # Only Windows has one; elsewhere every paste gets "" and the limit
+    # applies to all pastes together
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            return str(ctypes.windll.user32.GetForegroundWindow())
+        except Exception:
+            return ""
+    return ""
+
+# ---------- Scheduling ----------
+def thread_scheduler(delay: float, callback: Callable[[], None]):
+    # Daemon side: run `callback` after `delay` seconds on a timer thread
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+
+class ManualScheduler:
+    # Deterministic scheduler/clock for headless runs: advance() fires due callbacks
+    def __init__(self):
+        self.now = 0.0
+        self._due: List[Any] = []
+        self._seq = 0
+
+    def clock(self) -> float:
+        return self.now
+
+    def __call__(self, delay: float, callback: Callable[[], None]):
+        self._seq += 1
+        self._due.append((self.now + max(0.0, delay), self._seq, callback))
+
+    def advance(self, seconds: float):
+        end = self.now + seconds
+        while True:
+            ready = [d for d in self._due if d[0] <= end]
+            if not ready:
+                break
+            item = min(ready)
+            self._due.remove(item)
+            self.now = max(self.now, item[0])
+            item[2]()
+        self.now = end
+
+# ---------- Engine ----------
+class PasteJob:
+    __slots__ = ("text", "paste", "target", "request", "on_done")
+
+    def __init__(self, text: str, paste: bool, target: str, request, on_done):
+        self.text = text
+        self.paste = paste
+        self.target = target
+        # Optional dispatch.PasteRequest to stamp
+        self.request = request
+        self.on_done = on_done
+
+class PasteEngine:
+    def __init__(self, clipboard, keyboard=None, schedule: Callable[[float, Callable[[], None]], None] = thread_scheduler,
+                 clock: Callable[[], float] = time.monotonic, target_of: Callable[[], str] = foreground_window,
+                 settle: float = 0.05, adaptive: bool = True, max_settle: float = 0.5,
+                 restore: bool = False, restore_delay: float = 0.3, min_interval: float = 0.1):
+        self.clipboard = clipboard
+        # None: copy only, the user pastes by hand
+        self.keyboard = keyboard
+        self.schedule = schedule
+        self.clock = clock
+        self.target_of = target_of
+        self.settle = settle
+        self.adaptive = adaptive
+        self.max_settle = max_settle
+        self.restore = restore
+        self.restore_delay = restore_delay
+        self.min_interval = min_interval
+        self.pasted = 0
+        self.copied = 0
+        self.restored = 0
+        # Smoothed lateness of our own timers; a loaded machine is slow to
+        # serve the clipboard too, so it is added to the settle delay
+        self.timer_lag = 0.0
+        self._jobs: deque = deque()
+        self._active = False
+        self._last_paste: Dict[str, float] = {}
+        # Clipboard text from before the first of a run of back-to-back pastes
+        self._saved: Optional[str] = None
+        self._restore_pending = False
+        # Text we put on the clipboard last
+        self._placed: Optional[str] = None
+        self._lock = threading.RLock()
+
+    def submit(self, text: str, paste: bool = True, target: Optional[str] = None,
+               request=None, on_done: Optional[Callable[[], None]] = None):
+        with self._lock:
+            if target is None:
+                target = self.target_of() if paste else ""
+            self._jobs.append(PasteJob(text, paste and self.keyboard is not None, target, request, on_done))
+            if not self._active:
+                self._active = True
+                self._next()
+
+    def settle_delay(self, text: str) -> float:
+        if not self.adaptive:
+            return self.settle
+        # Big payloads take target apps longer to fetch (~1 ms per 4 KB)
+        delay = self.settle + len(text) / 4_000_000 + self.timer_lag
+        return min(delay, self.max_settle)
+
+    def _later(self, delay: float, step: Callable[..., None], *args):
+        due = self.clock() + delay
+
+        def fire():
+            lag = max(0.0, self.clock() - due)
+            self.timer_lag = 0.8 * self.timer_lag + 0.2 * lag
+            step(*args)
+        self.schedule(delay, fire)
+
+    def _next(self):
+        # A loop, not recursion: copy-only and failed jobs finish at once, and
+        # a long queue of them must not grow the stack
+        with self._lock:
+            while self._jobs:
+                job = self._jobs.popleft()
+                wait = 0.0
+                if job.paste:
+                    last = self._last_paste.get(job.target)
+                    if last is not None:
+                        wait = last + self.min_interval - self.clock()
+                if wait > 0:
+                    self._later(wait, self._run, job)
+                    return
+                if not self._start(job):
+                    return
+            if self._restore_pending:
+                self._later(self.restore_delay, self._restore)
+            else:
+                self._active = False
+
+    def _run(self, job: PasteJob):
+        # A job started from a timer
+        with self._lock:
+            if self._start(job):
+                self._next()
+
+    def _start(self, job: PasteJob) -> bool:
+        # True if the job is already finished, False if a timer will finish it
+        with self._lock:
+            try:
+                if job.paste and self.restore and not self._restore_pending:
+                    self._saved = self.clipboard.get_text()
+                    self._restore_pending = True
+                with PROFILER.span("paste.clipboard"):
+                    self.clipboard.set_text(job.text)
+                self._placed = job.text
+                if job.request is not None:
+                    job.request.stamp_clipboard()
+            except Exception as e:
+                print("Pano ayarlanamadı:", e)
+                self._done(job)
+                return True
+            if job.paste:
+                self._later(self.settle_delay(job.text), self._send, job)
+                return False
+            self.copied += 1
+            self._done(job)
+            return True
+
+    def _send(self, job: PasteJob):
+        with self._lock:
+            try:
+                with PROFILER.span("paste.keyboard"):
+                    self.keyboard.send("ctrl+v")
+                self._last_paste[job.target] = self.clock()
+                self.pasted += 1
+                if job.request is not None:
+                    job.request.stamp_paste()
+            except Exception as e:
+                print("Yapıştırma başarısız:", e)
+            self._done(job)
+            self._next()
+
+    def _done(self, job: PasteJob):
+        if job.on_done is not None:
+            try:
+                job.on_done()
+            except Exception as e:
+                print("Yapıştırma bildirimi başarısız:", e)
+
+    def _restore(self):
+        with self._lock:
+            if self._jobs:
+                # More pastes arrived while waiting; restore after the last one
+                self._next()
+                return
+            saved, self._saved = self._saved, None
+            self._restore_pending = False
+            try:
+                # Leave it alone if something else was copied in the meantime
+                if saved is not None and self.clipboard.get_text() == self._placed:
+                    self.clipboard.set_text(saved)
+                    self.restored += 1
+            except Exception as e:
+                print("Pano geri yüklenemedi:", e)
+            self._active = False
+
+def engine_from_settings(settings: Dict[str, Any], clipboard, keyboard=None, **kwargs) -> PasteEngine:
+    def ms(key: str, default: int) -> float:
+        return max(0, int(settings.get(key, default))) / 1000.0
+    return PasteEngine(clipboard, keyboard,
+                       settle=ms("paste_settle_ms", 50),
+                       adaptive=bool(settings.get("paste_settle_adaptive", True)),
+                       restore=bool(settings.get("paste_restore_clipboard", False)),
+                       restore_delay=ms("paste_restore_delay_ms", 300),
+                       min_interval=ms("paste_min_interval_ms", 100), **kwargs)
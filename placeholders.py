@@ -0,0 +1,108 @@
+import re, datetime
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+# Template variables: "Sayın {musteri_adi}, {siparis_no} numaralı siparişiniz
+# {tarih} tarihinde kargoya verildi." Braces are doubled to stay literal:
+# "{{" -> "{", "}}" -> "}". Unknown names without a value are left as written.
+#
+# A template is compiled once into literal pieces and variable slots; render
+# only fills the slots and joins, so it costs microseconds per paste.
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{([^{}\s]+)\}")
+
+# Values computed at render time; English aliases for convenience
+BUILTIN_NAMES = {
+    "tarih": "date", "date": "date",
+    "saat": "time", "time": "time",
+    "pano": "clipboard", "clipboard": "clipboard",
+}
+
+class Compiled:
+    __slots__ = ("parts", "slots", "names", "text")
+
+    def __init__(self, text: str):
+        self.text = text
+        # Literal pieces with None where a variable goes
+        self.parts: List[Optional[str]] = []
+        # (index into parts, variable name)
+        self.slots: List[Tuple[int, str]] = []
+        literal: List[str] = []
+        pos = 0
+        for m in _TOKEN.finditer(text):
+            literal.append(text[pos:m.start()])
+            pos = m.end()
+            name = m.group(1)
+            if name is None:
+                literal.append(m.group(0)[0])
+                continue
+            self.parts.append("".join(literal))
+            literal = []
+            self.slots.append((len(self.parts), name))
+            self.parts.append(None)
+        literal.append(text[pos:])
+        self.parts.append("".join(literal))
+        # Names the user has to supply, in order of first appearance
+        self.names = tuple(dict.fromkeys(n for _, n in self.slots if n not in BUILTIN_NAMES))
+
+    def render(self, values: Dict[str, str], builtins: Optional[Dict[str, Callable[[], str]]] = None) -> str:
+        if not self.slots:
+            return self.parts[0]
+        parts = self.parts[:]
+        resolved: Dict[str, str] = {}
+        for index, name in self.slots:
+            value = values.get(name)
+            if value is None:
+                value = resolved.get(name)
+                if value is None:
+                    kind = BUILTIN_NAMES.get(name)
+                    getter = builtins.get(kind) if builtins and kind else None
+                    value = resolved[name] = getter() if getter else "{" + name + "}"
+            parts[index] = value
+        return "".join(parts)
+
+def default_builtins(clipboard_text: Optional[Callable[[], Optional[str]]] = None) -> Dict[str, Callable[[], str]]:
+    builtins = {
+        "date": lambda: datetime.date.today().strftime("%d.%m.%Y"),
+        "time": lambda: datetime.datetime.now().strftime("%H:%M"),
+    }
+    if clipboard_text is not None:
+        builtins["clipboard"] = lambda: clipboard_text() or ""
+    return builtins
+
+class PlaceholderCache:
+    # template id -> (hash of text, Compiled); a stale hash recompiles, and
+    # edits/deletes drop the entry explicitly
+    def __init__(self):
+        self._compiled: Dict[str, Tuple[int, Compiled]] = {}
+        # Last value typed for each variable, offered again in the fill-in prompt
+        self.last_values: Dict[str, str] = {}
+        self.compiles = 0
+
+    def get(self, tpl: Dict[str, Any]) -> Compiled:
+        text = tpl["text"]
+        key = hash(text)
+        entry = self._compiled.get(tpl["id"])
+        if entry is not None and entry[0] == key and entry[1].text == text:
+            return entry[1]
+        compiled = Compiled(text)
+        self._compiled[tpl["id"]] = (key, compiled)
+        self.compiles += 1
+        return compiled
+
+    def invalidate(self, template_id: str):
+        self._compiled.pop(template_id, None)
+
+    def clear(self):
+        self._compiled.clear()
+
+    def render(self, tpl: Dict[str, Any], values: Optional[Dict[str, str]] = None,
+               builtins: Optional[Dict[str, Callable[[], str]]] = None) -> str:
+        # Missing user values fall back to the last ones typed
+        compiled = self.get(tpl)
+        if values:
+            merged = dict(self.last_values)
+            merged.update(values)
+            self.last_values.update(values)
+        else:
+            merged = self.last_values
+        return compiled.render(merged, builtins)
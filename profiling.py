@@ -0,0 +1,197 @@
+import os, json, time, queue, logging, threading, functools
+from collections import deque
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Optional, Dict, Any, List, Callable
+
+# Lightweight spans and counters. Disabled by default: span() then hands out
+# one shared no-op context manager and @profiled costs a single flag check.
+#
+#   with PROFILER.span("store.write"):
+#       ...
+#   PROFILER.count("store.bytes", len(payload))
+#
+# When enabled, every finished span is kept in a small per-name window (for
+# the stats panel) and, if a log file is configured, appended as one JSON line
+# to a rotating log written by a background thread.
+
+WINDOW = 256
+LOG_FILE = "perf.jsonl"
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class _Span:
+    __slots__ = ("profiler", "name", "fields", "t0")
+
+    def __init__(self, profiler: "Profiler", name: str, fields: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.fields = fields
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.profiler.record(self.name, ms, **self.fields)
+        return False
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._spans: Dict[str, deque] = {}
+        self._span_counts: Dict[str, int] = {}
+        # name -> [events, summed value]
+        self._counters: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._log: Optional[logging.Logger] = None
+        self._listener: Optional[QueueListener] = None
+
+    # --- Configuration ---
+    def configure(self, enabled: bool, log_path: Optional[str] = None, max_kb: int = 1024, backups: int = 3):
+        self.close_log()
+        if enabled and log_path:
+            handler = RotatingFileHandler(log_path, maxBytes=max(1, max_kb) * 1024, backupCount=max(0, backups),
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records: queue.Queue = queue.Queue()
+            self._listener = QueueListener(records, handler)
+            self._listener.start()
+            log = logging.getLogger("sablon.perf")
+            log.handlers = [QueueHandler(records)]
+            log.setLevel(logging.INFO)
+            log.propagate = False
+            self._log = log
+        self.enabled = enabled
+
+    def close_log(self):
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+        self._log = None
+
+    # --- Recording ---
+    def span(self, name: str, **fields):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, fields)
+
+    def record(self, name: str, ms: float, log: bool = True, **fields):
+        if not self.enabled:
+            return
+        with self._lock:
+            window = self._spans.get(name)
+            if window is None:
+                window = self._spans[name] = deque(maxlen=WINDOW)
+            window.append(ms)
+            self._span_counts[name] = self._span_counts.get(name, 0) + 1
+        if log and self._log is not None:
+            fields.update(t=round(time.time(), 3), span=name, ms=round(ms, 3))
+            self._log.info(json.dumps(fields, ensure_ascii=False))
+
+    def count(self, name: str, value: float = 0):
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._counters.get(name)
+            if entry is None:
+                entry = self._counters[name] = [0, 0]
+            entry[0] += 1
+            entry[1] += value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._span_counts.clear()
+            self._counters.clear()
+
+    # --- Reporting ---
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {name: (sorted(window), window[-1], self._span_counts[name])
+                     for name, window in self._spans.items() if window}
+            counters = {name: {"count": int(c), "total": v} for name, (c, v) in self._counters.items()}
+        result: Dict[str, Any] = {"enabled": self.enabled, "spans": {}, "counters": counters}
+        for name, (ordered, last, total) in sorted(spans.items()):
+            result["spans"][name] = {"n": total, "last": last, "p50": nearest_rank(ordered, 50),
+                                     "p99": nearest_rank(ordered, 99), "max": ordered[-1]}
+        return result
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        lines = [f"{'ölçüm':28} {'adet':>7} {'son':>9} {'p50':>9} {'p99':>9} {'en fazla':>9}  (ms)"]
+        for name, s in snap["spans"].items():
+            lines.append(f"{name:28} {s['n']:7d} {s['last']:9.2f} {s['p50']:9.2f} {s['p99']:9.2f} {s['max']:9.2f}")
+        if snap["counters"]:
+            lines.append("")
+            lines.append(f"{'sayaç':28} {'adet':>7} {'toplam':>12}")
+            for name, c in sorted(snap["counters"].items()):
+                lines.append(f"{name:28} {c['count']:7d} {c['total']:12.0f}")
+        return "\n".join(lines)
+
+def nearest_rank(ordered: List[float], pct: int) -> float:
+    # Nearest-rank percentile of an ascending list (also used by dispatch.py, app.py)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[rank - 1]
+
+PROFILER = Profiler()
+
+def profiled(name: str, log: bool = True) -> Callable:
+    # Decorator: time every call as span `name` while profiling is on;
+    # log=False keeps very hot calls (lookups) out of the log file
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not PROFILER.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                PROFILER.record(name, (time.perf_counter() - t0) * 1000.0, log)
+        return inner
+    return wrap
+
+def configure_from_settings(settings: Dict[str, Any], log_path: Optional[str]):
+    # "profiling": true (or SABLON_PROFILE=1) turns recording on; the log goes
+    # next to settings.json unless "profiling_log" is false
+    enabled = bool(settings.get("profiling", False)) or os.environ.get("SABLON_PROFILE") == "1"
+    if settings.get("profiling_log", True) is False:
+        log_path = None
+    PROFILER.configure(enabled, log_path, max_kb=int(settings.get("profiling_log_kb", 1024)),
+                       backups=int(settings.get("profiling_log_backups", 3)))
+
+class PhaseTimer:
+    # Startup phases: mark() closes the phase that began at the previous mark
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._last = self.t0
+        # (phase, ms in phase, ms since t0)
+        self.phases: List[Any] = []
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        ms = (now - self._last) * 1000.0
+        self.phases.append((name, ms, (now - self.t0) * 1000.0))
+        self._last = now
+        PROFILER.record("startup." + name, ms)
+
+    def report(self) -> str:
+        lines = [f"{'açılış aşaması':28} {'süre':>9} {'toplam':>9}  (ms)"]
+        for name, ms, total in self.phases:
+            lines.append(f"{name:28} {ms:9.1f} {total:9.1f}")
+        return "\n".join(lines)
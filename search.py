@@ -0,0 +1,272 @@
+import re, bisect, heapq, unicodedata
+from collections import OrderedDict, defaultdict, deque
+from itertools import repeat
+from typing import Optional, Dict, List, Set, Tuple, Iterable, Union, Hashable
+
+# In-memory type-ahead index for template titles and texts.
+# Words are folded (Turkish casing, diacritics removed) and kept in an
+# inverted index word -> documents. A sorted vocabulary lets every query word
+# match as a prefix via bisect, so "kar" finds "Kargo" and "kargoya".
+#
+# Documents are numbered, and postings are either a set of numbers (rare
+# words) or an int used as a bitmap (frequent words, where a bitmap is
+# smaller than a set). Prefix matches are computed as bitmaps, so a short
+# prefix matching hundreds of common words costs a few big-int ORs instead
+# of a huge set union.
+
+# "İ".lower() is "i" + combining dot, so İ is mapped before lower(). Matching
+# is diacritic-insensitive: I/ı/İ/i, ş/s, ğ/g, ç/c, ö/o, ü/u all fold together.
+# Chained str.replace is much faster than str.translate on non-ASCII text.
+_TR_PLAIN = (("ı", "i"), ("ş", "s"), ("ğ", "g"), ("ç", "c"), ("ö", "o"), ("ü", "u"),
+             ("â", "a"), ("î", "i"), ("û", "u"))
+_WORD_RE = re.compile(r"\w+")
+
+Posting = Union[Set[int], int]
+
+def fold(text: str) -> str:
+    text = text.replace("İ", "i").lower()
+    if text.isascii():
+        return text
+    for src, dst in _TR_PLAIN:
+        if src in text:
+            text = text.replace(src, dst)
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(fold(text))
+
+def _bitmap(numbers: Set[int]) -> int:
+    # Build the bitmap through a '0'/'1' string so the loop stays in C
+    if not numbers:
+        return 0
+    buf = bytearray(b"0") * (max(numbers) + 1)
+    deque(map(buf.__setitem__, numbers, repeat(49)), maxlen=0)
+    return int(buf[::-1], 2)
+
+def _bits(bm: int, limit: int) -> List[int]:
+    # Positions of the lowest `limit` set bits
+    s = bin(bm)[:1:-1]
+    out: List[int] = []
+    pos = s.find("1")
+    while pos >= 0 and len(out) < limit:
+        out.append(pos)
+        pos = s.find("1", pos + 1)
+    return out
+
+def _as_bitmap(p: Posting) -> int:
+    return _bitmap(p) if isinstance(p, set) else p
+
+def _posting_add(table: Dict[str, Posting], key: str, n: int, dense_at: int) -> bool:
+    # Returns True when `key` is new
+    p = table.get(key)
+    if p is None:
+        table[key] = {n}
+        return True
+    if isinstance(p, set):
+        p.add(n)
+        if len(p) > dense_at:
+            table[key] = _bitmap(p)
+    else:
+        table[key] = p | (1 << n)
+    return False
+
+def _posting_discard(table: Dict[str, Posting], key: str, n: int) -> bool:
+    # Returns True when `key` is gone
+    p = table[key]
+    if isinstance(p, set):
+        p.discard(n)
+    else:
+        p &= ~(1 << n)
+        table[key] = p
+    if p:
+        return False
+    del table[key]
+    return True
+
+class _Postings:
+    # word -> documents, plus short prefix -> documents so the broadest
+    # (1 to PREFIX_LEN character) prefixes are a single lookup. Longer
+    # prefixes are expanded through the sorted vocabulary.
+    PREFIX_LEN = 3
+
+    def __init__(self):
+        self.words: Dict[str, Posting] = {}
+        self.prefixes: Dict[str, Posting] = {}
+        self.vocab: List[str] = []
+
+    @classmethod
+    def _doc_prefixes(cls, words: Iterable[str]) -> Set[str]:
+        return {w[:i] for w in words for i in range(1, min(len(w), cls.PREFIX_LEN) + 1)}
+
+    def add_doc(self, n: int, words: Iterable[str], dense_at: int):
+        words = set(words)
+        for w in words:
+            if _posting_add(self.words, w, n, dense_at):
+                bisect.insort(self.vocab, w)
+        for p in self._doc_prefixes(words):
+            _posting_add(self.prefixes, p, n, dense_at)
+
+    def remove_doc(self, n: int, words: Iterable[str]):
+        words = set(words)
+        for w in words:
+            if _posting_discard(self.words, w, n):
+                del self.vocab[bisect.bisect_left(self.vocab, w)]
+        for p in self._doc_prefixes(words):
+            _posting_discard(self.prefixes, p, n)
+
+    def bulk_load(self, collected: Dict[str, Set[int]], dense_at: int):
+        self.words = {w: (_bitmap(ids) if len(ids) > dense_at else ids) for w, ids in collected.items()}
+        self.vocab = sorted(collected)
+        dense: Dict[str, int] = defaultdict(int)
+        sparse: Dict[str, Set[int]] = defaultdict(set)
+        for w, p in self.words.items():
+            for i in range(1, min(len(w), self.PREFIX_LEN) + 1):
+                if isinstance(p, set):
+                    sparse[w[:i]] |= p
+                else:
+                    dense[w[:i]] |= p
+        self.prefixes = {}
+        for key in dense.keys() | sparse.keys():
+            ids = sparse.get(key)
+            if key in dense:
+                self.prefixes[key] = dense[key] | _bitmap(ids) if ids else dense[key]
+            elif len(ids) > dense_at:
+                self.prefixes[key] = _bitmap(ids)
+            else:
+                self.prefixes[key] = ids
+
+    def prefix_bitmap(self, prefix: str) -> int:
+        if len(prefix) <= self.PREFIX_LEN:
+            p = self.prefixes.get(prefix)
+            return 0 if p is None else _as_bitmap(p)
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + "\uffff", lo)
+        acc = 0
+        sparse: Set[int] = set()
+        for w in self.vocab[lo:hi]:
+            p = self.words[w]
+            if isinstance(p, set):
+                sparse |= p
+            else:
+                acc |= p
+        return acc | _bitmap(sparse) if sparse else acc
+
+class SearchIndex:
+    # Most candidates that are ranked individually per query
+    RANK_LIMIT = 500
+    CACHE_SIZE = 256
+
+    def __init__(self):
+        self._all = _Postings()
+        self._title = _Postings()
+        self._ids: List[Optional[Hashable]] = []
+        self._nums: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+        # number -> (folded title words, distinct words, title length)
+        self._docs: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...], int]] = {}
+        # prefix -> (all bitmap, title bitmap); dropped on every mutation
+        self._cache: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def clear(self):
+        self.__init__()
+
+    def build(self, templates: Iterable[Tuple[Hashable, Dict[str, str]]]):
+        # Bulk load of (id, template) pairs: collect plain sets first, sort
+        # the vocabulary once. Ids are whatever the caller looks templates up by
+        self.clear()
+        all_words: Dict[str, Set[int]] = defaultdict(set)
+        title_words_map: Dict[str, Set[int]] = defaultdict(set)
+        for tid, tpl in templates:
+            n = len(self._ids)
+            self._ids.append(tid)
+            self._nums[tid] = n
+            title_words = tuple(tokenize(tpl.get("title", "")))
+            words = tuple(set(title_words).union(tokenize(tpl.get("text", ""))))
+            self._docs[n] = (title_words, words, len(tpl.get("title", "")))
+            for w in words:
+                all_words[w].add(n)
+            for w in title_words:
+                title_words_map[w].add(n)
+        dense_at = self._dense_at()
+        self._all.bulk_load(all_words, dense_at)
+        self._title.bulk_load(title_words_map, dense_at)
+
+    def _dense_at(self) -> int:
+        # A set entry costs ~300 bits, a bitmap one bit per document
+        return max(32, len(self._ids) // 300)
+
+    def add(self, tid: Hashable, title: str, text: str):
+        if tid in self._nums:
+            self.remove(tid)
+        self._cache.clear()
+        if self._free:
+            n = self._free.pop()
+            self._ids[n] = tid
+        else:
+            n = len(self._ids)
+            self._ids.append(tid)
+        self._nums[tid] = n
+        title_words = tuple(tokenize(title))
+        words = tuple(set(title_words).union(tokenize(text)))
+        self._docs[n] = (title_words, words, len(title))
+        dense_at = self._dense_at()
+        self._all.add_doc(n, words, dense_at)
+        self._title.add_doc(n, title_words, dense_at)
+
+    def update(self, tid: Hashable, title: str, text: str):
+        self.add(tid, title, text)
+
+    def remove(self, tid: Hashable):
+        n = self._nums.pop(tid, None)
+        if n is None:
+            return
+        self._cache.clear()
+        title_words, words, _ = self._docs.pop(n)
+        self._all.remove_doc(n, words)
+        self._title.remove_doc(n, title_words)
+        self._ids[n] = None
+        self._free.append(n)
+
+    def _prefix(self, prefix: str) -> Tuple[int, int]:
+        hit = self._cache.get(prefix)
+        if hit is None:
+            hit = self._cache[prefix] = (self._all.prefix_bitmap(prefix), self._title.prefix_bitmap(prefix))
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(prefix)
+        return hit
+
+    def search(self, query: str, limit: int = 50) -> List[Hashable]:
+        # Template ids where every query word starts some word of the title
+        # or text. Title hits rank first, then more/exact title matches, then
+        # shorter titles.
+        qwords = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not qwords:
+            return []
+        matches = -1
+        for q in qwords:
+            matches &= self._prefix(q)[0]
+            if not matches:
+                return []
+        in_title = matches & self._prefix(qwords[0])[1]
+        pool = _bits(in_title, self.RANK_LIMIT)
+        if len(pool) < limit:
+            pool += _bits(matches & ~in_title, limit - len(pool))
+        ids = self._ids
+        return [ids[n] for n in heapq.nsmallest(limit, pool, key=lambda n: self._rank_key(n, qwords))]
+
+    def _rank_key(self, n: int, qwords: List[str]) -> Tuple[int, int]:
+        title_words, _, title_len = self._docs[n]
+        score = 0
+        for q in qwords:
+            for w in title_words:
+                if w.startswith(q):
+                    score += 3 if w == q else 2
+                    break
+        return -score, title_len
@@ -0,0 +1,165 @@
+import os, json, time, zlib
+from typing import Optional, Dict, Any, List, Tuple
+
+from storage import _loads_quiet, _normalize, write_text_atomic
+
+# templates.json shared by several instances (a network folder, a synced
+# drive). SharedFile notices when someone else rewrote the file with one
+# stat() per check; TemplateStore.sync_external() then folds the changes in
+# by template id (see store.py). Our own writes are refused while the file
+# has changed underneath us, so nothing is overwritten before it was merged.
+#
+# Every write also appends what it changed to templates.json.changes:
+#   {"from": [mtime_ns, size], "to": [mtime_ns, size],
+#    "put": [{"cat": name, "tpl": {...}}], "del": [id], "cats": [name], "drop": [name]}
+# An instance that last saw the file at "from" applies just those entries,
+# without reading templates.json. If the chain is broken (hand edits, an
+# older version, a trimmed log) the whole file is read and diffed instead.
+
+CHANGES_SUFFIX = ".changes"
+# The log is restarted with the newest entry once it grows past this
+CHANGES_MAX_BYTES = 512 * 1024
+# A writer appends its entry right after replacing the file; a newer file
+# without one is given this long before falling back to a full read
+CHANGES_GRACE_NS = 2 * 10 ** 9
+
+# Title suffix of the copy kept when both sides changed the same template
+CONFLICT_SUFFIX = " (çakışma)"
+
+class ExternalChange(Exception):
+    # Raised instead of writing over a file another instance has changed
+    pass
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class SharedFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.changes_path = path + CHANGES_SUFFIX
+        # (mtime_ns, size) and CRC-32 of the file as memory last matched it
+        self.stat = _stat_key(path)
+        self.crc: Optional[int] = None
+        self.checks = 0
+        self.log_syncs = 0
+        self.full_syncs = 0
+
+    def changed(self) -> bool:
+        # One stat() call; cheap enough to run on a timer
+        self.checks += 1
+        return _stat_key(self.path) != self.stat
+
+    def mark_synced(self):
+        # Memory and file agree (after a load)
+        self.stat = _stat_key(self.path)
+        self.crc = None
+
+    # --- Change log ---
+    def log_write(self, before: Optional[Tuple[int, int]], entry: Dict[str, Any]):
+        # After one of our writes: remember the new stat and log what changed
+        self.stat = _stat_key(self.path)
+        self.crc = None
+        if before is None or self.stat is None:
+            return
+        entry["from"], entry["to"] = list(before), list(self.stat)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        try:
+            size = os.path.getsize(self.changes_path)
+        except OSError:
+            size = 0
+        if len(line) > CHANGES_MAX_BYTES:
+            # A bulk change: reading the whole file is cheaper for the others
+            line = ""
+        try:
+            if size + len(line) > CHANGES_MAX_BYTES or not line:
+                write_text_atomic(self.changes_path, line)
+            else:
+                with open(self.changes_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            # Others fall back to reading the whole file
+            print("Change log write error:", e)
+
+    def read_changes(self) -> Optional[List[Dict[str, Any]]]:
+        # Log entries leading from self.stat to the file as it is now, oldest
+        # first; [] if the file is new enough that its entry may still be
+        # coming, None if it has to be read in full
+        stat = _stat_key(self.path)
+        if stat is None or self.stat is None:
+            return None
+        try:
+            with open(self.changes_path, "rb") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            lines = []
+        chain: List[Dict[str, Any]] = []
+        want = list(stat)
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if not isinstance(entry, dict) or entry.get("to") != want:
+                continue
+            chain.append(entry)
+            want = entry.get("from")
+            if want == list(self.stat):
+                chain.reverse()
+                self.stat = stat
+                self.crc = None
+                self.log_syncs += 1
+                return chain
+        if time.time_ns() - stat[0] < CHANGES_GRACE_NS:
+            return []
+        return None
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        # The whole document; None if the content did not change or could not
+        # be read (a non-atomic writer still busy; retried when its next write
+        # changes the stat again)
+        stat = _stat_key(self.path)
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        self.stat = stat
+        crc = zlib.crc32(raw)
+        if crc == self.crc:
+            return None
+        try:
+            doc = _normalize(_loads_quiet(json.loads, raw.decode("utf-8")))
+        except ValueError:
+            return None
+        self.crc = crc
+        self.full_syncs += 1
+        return doc
+
+class MergeResult:
+    # What sync_external() changed in memory, for targeted view updates
+    def __init__(self):
+        self.added: List[str] = []
+        self.changed: List[str] = []
+        self.removed: List[str] = []
+        # Names of categories whose template list gained or lost entries
+        self.categories = set()
+        # Categories were added or removed
+        self.structure = False
+        # (template title, what happened)
+        self.conflicts: List[Tuple[str, str]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed or self.structure or self.conflicts)
+
+    def summary(self) -> str:
+        lines = [f"Başka bir kopyadan gelen değişiklikler: {len(self.added)} yeni, "
+                 f"{len(self.changed)} değişen, {len(self.removed)} silinen şablon."]
+        if self.conflicts:
+            lines.append("")
+            lines.append(f"{len(self.conflicts)} çakışma:")
+            lines.extend(f"  • {title}: {what}" for title, what in self.conflicts)
+        return "\n".join(lines)
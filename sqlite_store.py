@@ -0,0 +1,484 @@
+import os, sys, uuid, sqlite3, threading
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable, Set
+
+from storage import read_document, dump_document, write_text_atomic
+from dedup import DuplicateIndex, NEAR_THRESHOLD
+from search import fold
+
+# SQLite-backed drop-in for TemplateStore, for libraries too large to keep in
+# memory as one nested dict. Only the rows a caller asks for are loaded; every
+# mutation is a single-row transaction. Category and template positions are
+# sparse sort keys, so list indexes used by the UI map onto ORDER BY/OFFSET
+# over an index.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS categories_position ON categories(position);
+
+CREATE TABLE IF NOT EXISTS templates (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS templates_category ON templates(category_id, position);
+"""
+
+# The full-text index holds the titles and texts folded the way search.py
+# folds them (fold() is registered on the connection), so ı/İ/ş/ğ match as
+# they do on the other backends. It is contentless: the triggers pass the
+# folded old values back to it on update and delete.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS templates_fts USING fts5(
+    title, text, content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS templates_ai AFTER INSERT ON templates BEGIN
+    INSERT INTO templates_fts(rowid, title, text) VALUES (new.rowid, fold(new.title), fold(new.text));
+END;
+CREATE TRIGGER IF NOT EXISTS templates_ad AFTER DELETE ON templates BEGIN
+    INSERT INTO templates_fts(templates_fts, rowid, title, text)
+        VALUES ('delete', old.rowid, fold(old.title), fold(old.text));
+END;
+CREATE TRIGGER IF NOT EXISTS templates_au AFTER UPDATE OF title, text ON templates BEGIN
+    INSERT INTO templates_fts(templates_fts, rowid, title, text)
+        VALUES ('delete', old.rowid, fold(old.title), fold(old.text));
+    INSERT INTO templates_fts(rowid, title, text) VALUES (new.rowid, fold(new.title), fold(new.text));
+END;
+"""
+
+def fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+class SqliteTemplateStore:
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.create_function("fold", 1, fold, deterministic=True)
+        self.has_fts = fts5_available()
+        self._on_saved: Optional[Callable[[], None]] = None
+        # Duplicate index (dedup.py) over template id strings, built on first
+        # use and then kept current by the mutations below
+        self._dedup: Optional[DuplicateIndex] = None
+        # Template ids and category names changed here since they were last
+        # handed to a sync client (sync.py); None until one attaches
+        self._unsynced: Optional[Set[str]] = None
+        self._unsynced_cats: Set[str] = set()
+        self._unsynced_drops: Set[str] = set()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            if self.has_fts:
+                self.conn.executescript(FTS_SCHEMA)
+
+    # Every mutation commits immediately; these exist for TemplateStore parity
+    def load(self):
+        self._dedup = None
+
+    def save(self):
+        pass
+
+    def flush(self, check: bool = False):
+        pass
+
+    def compact(self):
+        pass
+
+    @property
+    def collapsed_saves(self) -> int:
+        return 0
+
+    def set_save_listener(self, callback: Optional[Callable[[], None]]):
+        # Called after every committed mutation
+        self._on_saved = callback
+
+    def _saved(self):
+        if self._on_saved is not None:
+            self._on_saved()
+
+    def close(self):
+        self.conn.close()
+
+    # --- Helpers ---
+    def _category_row(self, index: int) -> sqlite3.Row:
+        row = None
+        if index >= 0:
+            row = self.conn.execute(
+                "SELECT id, name, position FROM categories ORDER BY position LIMIT 1 OFFSET ?", (index,)).fetchone()
+        if row is None:
+            raise IndexError("category index out of range")
+        return row
+
+    def _template_row(self, cat_index: int, tpl_index: int) -> sqlite3.Row:
+        cat = self._category_row(cat_index)
+        row = None
+        if tpl_index >= 0:
+            row = self.conn.execute(
+                "SELECT rowid, id, title, text, position FROM templates WHERE category_id = ? "
+                "ORDER BY position LIMIT 1 OFFSET ?", (cat["id"], tpl_index)).fetchone()
+        if row is None:
+            raise IndexError("template index out of range")
+        return row
+
+    @staticmethod
+    def _tpl_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {"id": row["id"], "title": row["title"], "text": row["text"]}
+
+    # --- Category ops ---
+    def list_categories(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute("SELECT id, name FROM categories ORDER BY position").fetchall()
+        return [{"id": r["id"], "name": r["name"]} for r in rows]
+
+    def count_templates(self, cat_index: int) -> int:
+        with self._lock:
+            cat = self._category_row(cat_index)
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM templates WHERE category_id = ?", (cat["id"],)).fetchone()[0]
+
+    def add_category(self, name: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO categories(name, position) "
+                "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM categories))", (name,))
+            self._category_synced(added=name)
+        self._saved()
+
+    def rename_category(self, index: int, new_name: str):
+        with self._lock, self.conn:
+            cat = self._category_row(index)
+            self.conn.execute("UPDATE categories SET name = ? WHERE id = ?", (new_name, cat["id"]))
+            if self._unsynced is not None:
+                # Every template moves to the new name
+                self._unsynced.update(r[0] for r in self.conn.execute(
+                    "SELECT id FROM templates WHERE category_id = ?", (cat["id"],)))
+            self._category_synced(added=new_name, dropped=cat["name"])
+        self._saved()
+
+    def delete_category(self, index: int):
+        # Templates go with it (ON DELETE CASCADE)
+        with self._lock, self.conn:
+            cat = self._category_row(index)
+            ids = [] if self._dedup is None and self._unsynced is None else [r[0] for r in self.conn.execute(
+                "SELECT id FROM templates WHERE category_id = ?", (cat["id"],))]
+            self.conn.execute("DELETE FROM categories WHERE id = ?", (cat["id"],))
+            self._text_removed(*ids)
+            self._category_synced(dropped=cat["name"])
+        self._saved()
+
+    def insert_category(self, index: int, name: str, templates: List[Dict[str, Any]]):
+        # Put a category back at `index` with its templates, ids kept (undo)
+        with self._lock, self.conn:
+            position = self._make_room("categories", "1 = 1", (), index)
+            cat_id = self.conn.execute("INSERT INTO categories(name, position) VALUES (?, ?)",
+                                       (name, position)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO templates(id, category_id, position, title, text) VALUES (?, ?, ?, ?, ?)",
+                ((tpl["id"], cat_id, pos, tpl.get("title", ""), tpl.get("text", "")) for pos, tpl in enumerate(templates)))
+            for tpl in templates:
+                self._text_added(tpl["id"], tpl.get("text", ""))
+            self._category_synced(added=name)
+        self._saved()
+
+    def _make_room(self, table: str, where: str, params: Tuple[Any, ...], index: int) -> int:
+        # Sort key for a new row at list position `index`: the rows from there
+        # on move up one
+        row = None
+        if index >= 0:
+            row = self.conn.execute(f"SELECT position FROM {table} WHERE {where} ORDER BY position LIMIT 1 OFFSET ?",
+                                    (*params, index)).fetchone()
+        if row is None:
+            return self.conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {table} WHERE {where}",
+                                     params).fetchone()[0]
+        self.conn.execute(f"UPDATE {table} SET position = position + 1 WHERE {where} AND position >= ?",
+                          (*params, row["position"]))
+        return row["position"]
+
+    # --- Template ops ---
+    def list_templates(self, cat_index: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            cat = self._category_row(cat_index)
+            rows = self.conn.execute(
+                "SELECT id, title, text FROM templates WHERE category_id = ? ORDER BY position",
+                (cat["id"],)).fetchall()
+        return [self._tpl_dict(r) for r in rows]
+
+    def list_titles(self, cat_index: int) -> List[Dict[str, Any]]:
+        # list_templates() without the texts, for list views; a row's text is
+        # read when it is needed (get_template_by_id)
+        with self._lock:
+            cat = self._category_row(cat_index)
+            rows = self.conn.execute(
+                "SELECT id, title FROM templates WHERE category_id = ? ORDER BY position",
+                (cat["id"],)).fetchall()
+        return [{"id": r["id"], "title": r["title"]} for r in rows]
+
+    def add_template(self, cat_index: int, title: str, text: str) -> str:
+        tid = str(uuid.uuid4())
+        with self._lock, self.conn:
+            cat = self._category_row(cat_index)
+            self.conn.execute(
+                "INSERT INTO templates(id, category_id, position, title, text) VALUES "
+                "(?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM templates WHERE category_id = ?), ?, ?)",
+                (tid, cat["id"], cat["id"], title, text))
+            self._text_added(tid, text)
+        self._saved()
+        return tid
+
+    def edit_template(self, cat_index: int, tpl_index: int, title: str, text: str):
+        with self._lock, self.conn:
+            row = self._template_row(cat_index, tpl_index)
+            self.conn.execute("UPDATE templates SET title = ?, text = ? WHERE rowid = ?",
+                              (title, text, row["rowid"]))
+            self._text_added(row["id"], text)
+        self._saved()
+
+    def delete_template(self, cat_index: int, tpl_index: int):
+        with self._lock, self.conn:
+            row = self._template_row(cat_index, tpl_index)
+            self.conn.execute("DELETE FROM templates WHERE rowid = ?", (row["rowid"],))
+            self._text_removed(row["id"])
+        self._saved()
+
+    def insert_template(self, cat_index: int, tpl_index: int, tpl: Dict[str, Any]):
+        # Put a template back at a position, id kept (undo)
+        with self._lock, self.conn:
+            cat = self._category_row(cat_index)
+            position = self._make_room("templates", "category_id = ?", (cat["id"],), tpl_index)
+            self.conn.execute("INSERT INTO templates(id, category_id, position, title, text) VALUES (?, ?, ?, ?, ?)",
+                              (tpl["id"], cat["id"], position, tpl.get("title", ""), tpl.get("text", "")))
+            self._text_added(tpl["id"], tpl.get("text", ""))
+        self._saved()
+
+    def get_template_by_id(self, template_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT id, title, text FROM templates WHERE id = ?",
+                                    (template_id,)).fetchone()
+        return self._tpl_dict(row) if row else None
+
+    def find_template(self, template_id: str) -> Optional[Tuple[int, int]]:
+        # Reverse lookup: (category index, template index) of a template id
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT t.category_id, t.position, c.position AS cat_position FROM templates t "
+                "JOIN categories c ON c.id = t.category_id WHERE t.id = ?", (template_id,)).fetchone()
+            if row is None:
+                return None
+            cat_index = self.conn.execute(
+                "SELECT COUNT(*) FROM categories WHERE position < ?", (row["cat_position"],)).fetchone()[0]
+            tpl_index = self.conn.execute(
+                "SELECT COUNT(*) FROM templates WHERE category_id = ? AND position < ?",
+                (row["category_id"], row["position"])).fetchone()[0]
+        return cat_index, tpl_index
+
+    def get_category_of(self, template_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT c.id, c.name FROM templates t JOIN categories c ON c.id = t.category_id "
+                "WHERE t.id = ?", (template_id,)).fetchone()
+        return {"id": row["id"], "name": row["name"]} if row else None
+
+    # --- Full-text search ---
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        # Every word must match (as a prefix) in the title or text, best
+        # matches first; both sides are folded (search.fold)
+        words = fold(query).split()
+        if not words:
+            return []
+        with self._lock:
+            if self.has_fts:
+                match = " ".join('"{}"*'.format(w.replace('"', '""')) for w in words)
+                rows = self.conn.execute(
+                    "SELECT t.id, t.title, t.text FROM templates_fts f JOIN templates t ON t.rowid = f.rowid "
+                    "WHERE templates_fts MATCH ? ORDER BY bm25(templates_fts, 10.0, 1.0) LIMIT ?",
+                    (match, limit)).fetchall()
+            else:
+                where = " AND ".join(r"(fold(title) LIKE ? ESCAPE '\' OR fold(text) LIKE ? ESCAPE '\')"
+                                     for _ in words)
+                params: List[Any] = []
+                for w in words:
+                    w = w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    params += [f"%{w}%", f"%{w}%"]
+                rows = self.conn.execute(
+                    f"SELECT id, title, text FROM templates WHERE {where} LIMIT ?", (*params, limit)).fetchall()
+        return [self._tpl_dict(r) for r in rows]
+
+    # --- Sync (sync.py) ---
+    def track_sync(self):
+        with self._lock:
+            if self._unsynced is None:
+                self._unsynced = set()
+
+    def take_sync_changes(self) -> Tuple[List[str], List[str], List[str]]:
+        with self._lock:
+            if self._unsynced is None:
+                return [], [], []
+            ids, cats, drops = self._unsynced, self._unsynced_cats, self._unsynced_drops
+            self._unsynced, self._unsynced_cats, self._unsynced_drops = set(), set(), set()
+        return sorted(ids), sorted(cats), sorted(drops)
+
+    def _category_synced(self, added: Optional[str] = None, dropped: Optional[str] = None):
+        if self._unsynced is None:
+            return
+        if dropped is not None:
+            self._unsynced_cats.discard(dropped)
+            self._unsynced_drops.add(dropped)
+        if added is not None:
+            self._unsynced_drops.discard(added)
+            self._unsynced_cats.add(added)
+
+    # --- Duplicates ---
+    def _text_added(self, tid: str, text: str):
+        # A template added or edited (the caller holds the lock)
+        if self._dedup is not None:
+            self._dedup.add(tid, text)
+        if self._unsynced is not None:
+            self._unsynced.add(tid)
+
+    def _text_removed(self, *ids: str):
+        if self._dedup is not None:
+            for tid in ids:
+                self._dedup.remove(tid)
+        if self._unsynced is not None:
+            self._unsynced.update(ids)
+
+    def _duplicates(self) -> DuplicateIndex:
+        if self._dedup is None:
+            self._dedup = DuplicateIndex()
+            rows = self.conn.execute("SELECT id, text FROM templates")
+            self._dedup.build((r["id"], {"text": r["text"]}) for r in rows)
+        return self._dedup
+
+    def _rows_by_id(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for tid in ids:
+            tpl = self.get_template_by_id(tid)
+            if tpl is not None:
+                found[tid] = tpl
+        return found
+
+    def find_duplicates(self, text: str, exclude_id: Optional[str] = None,
+                        threshold: float = NEAR_THRESHOLD) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], float]]]:
+        with self._lock:
+            dedup = self._duplicates()
+            exact = dedup.exact(text, exclude_id)
+            near = dedup.similar(text, threshold, exclude=exclude_id)
+            rows = self._rows_by_id(exact + [tid for tid, _ in near])
+        return [rows[tid] for tid in exact if tid in rows], [(rows[tid], score) for tid, score in near if tid in rows]
+
+    def duplicate_groups(self, threshold: float = NEAR_THRESHOLD) -> Tuple[List[List[Dict[str, Any]]], List[List[Tuple[Dict[str, Any], float]]]]:
+        with self._lock:
+            exact, near = self._duplicates().groups(threshold)
+            rows = self._rows_by_id([tid for g in exact for tid in g] + [tid for g in near for tid, _ in g])
+        return ([[rows[tid] for tid in g if tid in rows] for g in exact],
+                [[(rows[tid], score) for tid, score in g if tid in rows] for g in near])
+
+    # --- Import / export ---
+    def import_document(self, data: Dict[str, Any]):
+        # Append all categories of a templates.json document in one transaction
+        with self._lock, self.conn:
+            next_cat = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM categories").fetchone()[0]
+            last_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM templates").fetchone()[0]
+            for cat in data.get("categories", []):
+                cur = self.conn.execute("INSERT INTO categories(name, position) VALUES (?, ?)",
+                                        (cat.get("name", ""), next_cat))
+                next_cat += 1
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO templates(id, category_id, position, title, text) VALUES (?, ?, ?, ?, ?)",
+                    ((tpl.get("id") or str(uuid.uuid4()), cur.lastrowid, pos, tpl.get("title", ""), tpl.get("text", ""))
+                     for pos, tpl in enumerate(cat.get("templates", []))))
+            # Ids already present were skipped; read back on the next lookup
+            self._dedup = None
+            if self._unsynced is not None:
+                self._unsynced.update(tid for tid, in self.conn.execute(
+                    "SELECT id FROM templates WHERE rowid > ?", (last_rowid,)))
+                for cat in data.get("categories", []):
+                    self._category_synced(added=cat.get("name", ""))
+        self._saved()
+
+    def add_templates(self, items: Iterable[Tuple[str, str, str, str]]) -> int:
+        # Bulk append of (category name, id, title, text) in one transaction;
+        # categories are created by name as needed. Rolled back if `items` raises
+        cat_ids: Dict[str, int] = {}
+        next_pos: Dict[int, int] = {}
+        added: List[Tuple[str, str]] = []
+        new_cats: List[str] = []
+        with self._lock, self.conn:
+            for row in self.conn.execute("SELECT id, name FROM categories ORDER BY position DESC").fetchall():
+                cat_ids[row["name"]] = row["id"]
+            next_cat = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM categories").fetchone()[0]
+            for name, tid, title, text in items:
+                cat_id = cat_ids.get(name)
+                if cat_id is None:
+                    cat_id = cat_ids[name] = self.conn.execute(
+                        "INSERT INTO categories(name, position) VALUES (?, ?)", (name, next_cat)).lastrowid
+                    next_cat += 1
+                    new_cats.append(name)
+                pos = next_pos.get(cat_id)
+                if pos is None:
+                    pos = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM templates WHERE category_id = ?",
+                                            (cat_id,)).fetchone()[0]
+                self.conn.execute("INSERT INTO templates(id, category_id, position, title, text) VALUES (?, ?, ?, ?, ?)",
+                                  (tid, cat_id, pos, title, text))
+                next_pos[cat_id] = pos + 1
+                added.append((tid, text))
+        # Indexed once committed
+        with self._lock:
+            for tid, text in added:
+                self._text_added(tid, text)
+            for name in new_cats:
+                self._category_synced(added=name)
+        if added:
+            self._saved()
+        return len(added)
+
+    def export_json(self, path: str):
+        categories = []
+        with self._lock:
+            for cat in self.conn.execute("SELECT id, name FROM categories ORDER BY position").fetchall():
+                rows = self.conn.execute(
+                    "SELECT id, title, text FROM templates WHERE category_id = ? ORDER BY position",
+                    (cat["id"],)).fetchall()
+                categories.append({"name": cat["name"], "templates": [self._tpl_dict(r) for r in rows]})
+        write_text_atomic(path, dump_document({"categories": categories}))
+
+def migrate_json_to_sqlite(json_file: str, db_file: str) -> SqliteTemplateStore:
+    # One-shot migration of a templates.json file into a fresh database
+    if os.path.exists(db_file):
+        raise FileExistsError(db_file)
+    store = SqliteTemplateStore(db_file)
+    store.import_document(read_document(json_file))
+    return store
+
+def main(argv: List[str]):
+    # python sqlite_store.py migrate templates.json templates.db
+    # python sqlite_store.py export templates.db templates.json
+    if len(argv) != 3 or argv[0] not in ("migrate", "export"):
+        print("Kullanım: sqlite_store.py migrate <templates.json> <templates.db>\n"
+              "          sqlite_store.py export <templates.db> <templates.json>")
+        return 2
+    if argv[0] == "migrate":
+        store = migrate_json_to_sqlite(argv[1], argv[2])
+    else:
+        store = SqliteTemplateStore(argv[1])
+        store.export_json(argv[2])
+    store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,382 @@
+import os, gc, sys, json, zlib, struct, marshal, tempfile, threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from model import plain, pack_document, compact_templates
+
+# Storage backends for TemplateStore.
+# A backend loads the whole document ({"categories": [...]}) and persists
+# changes in two steps: prepare_write() runs under the store lock and
+# captures what has to be written, write() does the (slow) I/O afterwards.
+
+def write_bytes_atomic(path: str, payload: bytes) -> os.stat_result:
+    # Write to a temp file in the same folder, then rename over the target,
+    # so a crash mid-write never leaves a truncated file behind. Returns the
+    # written file's stat (taken before the rename, so no other writer's)
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        os.replace(tmp_path, path)
+        return stat
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write_text_atomic(path: str, payload: str) -> os.stat_result:
+    return write_bytes_atomic(path, payload.encode("utf-8"))
+
+class WriteBehind:
+    # Collapses save requests made within `delay` seconds into a single write
+    # that runs on a background thread. delay <= 0 writes synchronously.
+    # A failed write stays pending and is tried again after RETRY_DELAY
+    # seconds, doubling up to RETRY_MAX while it keeps failing.
+    RETRY_DELAY = 1.0
+    RETRY_MAX = 60.0
+
+    def __init__(self, write_fn: Callable[[], None], delay: float = 0.0, label: str = "Save"):
+        self.write_fn = write_fn
+        self.delay = delay
+        self.label = label
+        # Called (on the writing thread) after each successful write
+        self.on_written: Optional[Callable[[], None]] = None
+        self.requested = 0
+        self.written = 0
+        self.collapsed = 0
+        self.failures = 0
+        # The error of the last write, None once a write succeeds
+        self.last_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+
+    def request(self):
+        with self._lock:
+            self.requested += 1
+            if self._dirty:
+                # A write is already pending; this change rides along with it
+                self.collapsed += 1
+            self._dirty = True
+            if self.delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.delay, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self._write_if_dirty()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self._write_if_dirty()
+
+    def _write_if_dirty(self):
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                self.write_fn()
+                self.written += 1
+            except Exception as e:
+                print(f"{self.label} error:", e)
+                self.last_error = e
+                self._retry()
+                return
+            self.failures = 0
+            self.last_error = None
+            if self.on_written is not None:
+                self.on_written()
+
+    def _retry(self):
+        # Requests made meanwhile ride along with the retry
+        with self._lock:
+            self._dirty = True
+            self.failures += 1
+            if self._timer is None:
+                wait = min(self.RETRY_MAX, max(self.delay, self.RETRY_DELAY) * 2 ** (self.failures - 1))
+                self._timer = threading.Timer(wait, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, check: bool = False):
+        # Cancel the pending timer and write now (blocks until done).
+        # check=True raises the write's error instead of only printing it
+        # (the write is still retried later)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self._write_if_dirty()
+        if check and self._dirty and self.last_error is not None:
+            raise self.last_error
+
+    def pending(self) -> bool:
+        return self._dirty
+
+@contextmanager
+def gc_paused():
+    # Building 100k+ containers triggers many useless full GC passes
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _loads_quiet(loads: Callable[[Any], Any], payload: Any) -> Any:
+    with gc_paused():
+        return loads(payload)
+
+def _normalize(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        data = {}
+    if "categories" not in data or not isinstance(data["categories"], list):
+        data["categories"] = []
+    return data
+
+def read_document(path: str) -> Dict[str, Any]:
+    # Read a templates.json style document, normalized; empty on any error
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return _normalize(_loads_quiet(json.loads, f.read()))
+    except Exception:
+        return {"categories": []}
+
+def dump_document(data: Dict[str, Any]) -> str:
+    # Compact templates (model.py) are written as the dicts they were read from
+    return json.dumps(data, ensure_ascii=False, indent=2, default=plain)
+
+# --- Snapshot cache ---
+# templates.json.cache holds the parsed document in marshal format, which
+# skips JSON tokenizing. Its header records the source file's mtime, size and
+# CRC-32; any mismatch falls back to (and re-caches) the JSON file.
+#   <u32 header length> <marshal header> <marshal document>
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = (2, sys.version_info[0], sys.version_info[1], marshal.version)
+
+def _digest(raw: bytes) -> int:
+    return zlib.crc32(raw)
+
+def write_snapshot_cache(path: str, data: Dict[str, Any], stat: os.stat_result, digest: int):
+    # `stat`/`digest` describe the source file exactly as `data` was read
+    # from or written to it; never re-stat it here, another writer may have
+    # replaced it since
+    try:
+        header = marshal.dumps((CACHE_VERSION, stat.st_mtime_ns, stat.st_size, digest))
+        write_bytes_atomic(path + CACHE_SUFFIX, struct.pack("<I", len(header)) + header + marshal.dumps(pack_document(data)))
+    except (OSError, ValueError) as e:
+        print("Snapshot cache write error:", e)
+
+def read_document_cached(path: str) -> Dict[str, Any]:
+    # read_document(), served from the snapshot cache when it is current
+    try:
+        with open(path, "rb") as src:
+            stat = os.fstat(src.fileno())
+            raw = src.read()
+    except OSError:
+        return {"categories": []}
+    digest = _digest(raw)
+    try:
+        with open(path + CACHE_SUFFIX, "rb") as f:
+            cached = f.read()
+        size = struct.unpack_from("<I", cached)[0]
+        header = marshal.loads(cached[4:4 + size])
+        if header == (CACHE_VERSION, stat.st_mtime_ns, stat.st_size, digest):
+            with gc_paused():
+                data = _normalize(marshal.loads(memoryview(cached)[4 + size:]))
+                compact_templates(data["categories"])
+            return data
+    except (OSError, EOFError, ValueError, TypeError, IndexError, struct.error):
+        pass
+    try:
+        with gc_paused():
+            data = _normalize(json.loads(raw.decode("utf-8")))
+            compact_templates(data["categories"])
+    except Exception:
+        return {"categories": []}
+    write_snapshot_cache(path, data, stat, digest)
+    return data
+
+class JsonBackend:
+    # The classic format: the whole document rewritten to one JSON file
+    def __init__(self, path: str, snapshot_cache: bool = False):
+        self.path = path
+        self.snapshot_cache = snapshot_cache
+        # (stat, digest) of the file as last written here, for refresh_cache
+        self._written: Optional[Tuple[os.stat_result, int]] = None
+
+    def load(self) -> Dict[str, Any]:
+        if self.snapshot_cache:
+            return read_document_cached(self.path)
+        return read_document(self.path)
+
+    def refresh_cache(self, data: Dict[str, Any]):
+        # After a flush the file matches `data`; cache it for the next start
+        if self.snapshot_cache and self._written is not None:
+            write_snapshot_cache(self.path, data, *self._written)
+
+    def record(self, op: Dict[str, Any]):
+        # Whole-file backend: individual mutations are not recorded
+        pass
+
+    def prepare_write(self, data: Dict[str, Any], force_snapshot: bool = False) -> str:
+        return dump_document(data)
+
+    def write(self, batch: str):
+        raw = batch.encode("utf-8")
+        stat = write_bytes_atomic(self.path, raw)
+        self._written = (stat, _digest(raw)) if self.snapshot_cache else None
+
+    def export(self, data: Dict[str, Any], path: str):
+        write_text_atomic(path, dump_document(data))
+
+# --- Journal ---
+
+def apply_op(data: Dict[str, Any], op: Dict[str, Any]):
+    # Replay one mutation record onto a document. Category ops address
+    # categories by position, template ops address templates by id.
+    cats = data["categories"]
+    kind = op.get("op")
+    if kind == "add_category":
+        cats.append({"name": op["name"], "templates": []})
+    elif kind == "rename_category":
+        cats[op["cat"]]["name"] = op["name"]
+    elif kind == "delete_category":
+        del cats[op["cat"]]
+    elif kind == "insert_category":
+        cats.insert(op["cat"], {"name": op["name"], "templates": op["templates"]})
+    elif kind == "add_template":
+        cats[op["cat"]].setdefault("templates", []).append(
+            {"id": op["id"], "title": op["title"], "text": op["text"]})
+    elif kind == "insert_template":
+        cats[op["cat"]].setdefault("templates", []).insert(
+            op["pos"], {"id": op["id"], "title": op["title"], "text": op["text"]})
+    elif kind in ("edit_template", "delete_template"):
+        for cat in cats:
+            templates = cat.get("templates", [])
+            for pos, tpl in enumerate(templates):
+                if tpl.get("id") == op["id"]:
+                    if kind == "edit_template":
+                        tpl["title"] = op["title"]
+                        tpl["text"] = op["text"]
+                    else:
+                        del templates[pos]
+                    return
+    else:
+        raise ValueError(f"Unknown journal op: {kind!r}")
+
+class JournalBackend:
+    # Snapshot (the regular templates.json) plus an append-only journal of
+    # mutation records, one JSON object per line. Each record carries a
+    # sequence number; the snapshot remembers the last one it contains
+    # ("journal_seq") so a crash between compaction steps never replays twice.
+    SEQ_KEY = "journal_seq"
+
+    def __init__(self, path: str, journal_path: Optional[str] = None, compact_bytes: int = 1024 * 1024,
+                 snapshot_cache: bool = False):
+        self.path = path
+        self.snapshot_cache = snapshot_cache
+        self.journal_path = journal_path or path + ".journal"
+        self.compact_bytes = compact_bytes
+        self.seq = 0
+        self.journal_size = 0
+        self.compactions = 0
+        self._buffer: List[Dict[str, Any]] = []
+        # (stat, digest) of the snapshot as last written here, for refresh_cache
+        self._written: Optional[Tuple[os.stat_result, int]] = None
+
+    def load(self) -> Dict[str, Any]:
+        data = read_document_cached(self.path) if self.snapshot_cache else read_document(self.path)
+        self.seq = int(data.pop(self.SEQ_KEY, 0) or 0)
+        self._buffer = []
+        self.journal_size = 0
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.journal_size += len(line.encode("utf-8"))
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # Torn last record from a crash mid-append
+                        continue
+                    if op.get("seq", 0) <= self.seq:
+                        continue
+                    try:
+                        apply_op(data, op)
+                    except (LookupError, ValueError) as e:
+                        print("Journal replay error:", e)
+                    self.seq = op["seq"]
+        except FileNotFoundError:
+            pass
+        return data
+
+    def record(self, op: Dict[str, Any]):
+        # Called under the store lock, in mutation order
+        self.seq += 1
+        op["seq"] = self.seq
+        self._buffer.append(op)
+
+    def prepare_write(self, data: Dict[str, Any], force_snapshot: bool = False) -> Tuple[str, Any, List[Dict[str, Any]]]:
+        # The taken records travel with the batch so a failed write can put
+        # them back (restore)
+        ops, self._buffer = self._buffer, []
+        lines = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        if force_snapshot or self.journal_size + len(lines.encode("utf-8")) > self.compact_bytes:
+            doc = dict(data)
+            doc[self.SEQ_KEY] = self.seq
+            return "snapshot", dump_document(doc), ops
+        return "append", lines, ops
+
+    def restore(self, batch: Tuple[str, Any, List[Dict[str, Any]]]):
+        # Under the store lock, after write() failed: the records go back in
+        # front of any made since, to be written with the next batch
+        self._buffer[:0] = batch[2]
+
+    def write(self, batch: Tuple[str, Any, List[Dict[str, Any]]]):
+        kind, payload, _ = batch
+        if kind == "append":
+            if not payload:
+                return
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_size += len(payload.encode("utf-8"))
+        else:
+            # Compaction: the snapshot already holds every record, so the
+            # journal can be emptied once the snapshot is safely on disk
+            raw = payload.encode("utf-8")
+            stat = write_bytes_atomic(self.path, raw)
+            self._written = (stat, _digest(raw)) if self.snapshot_cache else None
+            write_text_atomic(self.journal_path, "")
+            self.journal_size = 0
+            self.compactions += 1
+
+    def export(self, data: Dict[str, Any], path: str):
+        write_text_atomic(path, dump_document(data))
+
+    def refresh_cache(self, data: Dict[str, Any]):
+        # Only valid right after compaction, when the snapshot holds everything
+        if self.snapshot_cache and self.journal_size == 0 and self._written is not None:
+            doc = dict(data)
+            doc[self.SEQ_KEY] = self.seq
+            write_snapshot_cache(self.path, doc, *self._written)
+
+def make_backend(path: str, kind: str = "json", **options) -> Any:
+    if kind == "journal":
+        return JournalBackend(path, **options)
+    if kind == "lazy":
+        from lazy_storage import LazyJsonBackend
+        return LazyJsonBackend(path, **options)
+    return JsonBackend(path, **options)
@@ -0,0 +1,812 @@
+import os, sys, json, uuid, threading
+from typing import Optional, Dict, Any, List, Tuple, Callable, Set, Iterable
+
+from search import SearchIndex
+from dedup import DuplicateIndex, NEAR_THRESHOLD
+from storage import WriteBehind, JsonBackend, make_backend, write_text_atomic, gc_paused
+from profiling import PROFILER, profiled
+from shared import SharedFile, MergeResult, ExternalChange, CONFLICT_SUFFIX
+from model import Key, Template, id_key, id_str, template_key, make_template, compact_templates
+
+# Data layer shared by the GUI (app.py) and the headless hotkey daemon
+# (daemon.py); must not import Qt.
+
+DATA_FILE = "templates.json"
+SETTINGS_FILE = "settings.json"
+DB_FILE = "templates.db"
+# Keep templates/settings in another folder (portable installs, benchmarks)
+DATA_DIR_ENV = "SABLON_DATA_DIR"
+
+def resource_path(relative_path: str) -> str:
+    # Resolve path to be compatible both in dev and PyInstaller bundle
+    data_dir = os.environ.get(DATA_DIR_ENV)
+    if data_dir:
+        return os.path.join(os.path.abspath(data_dir), relative_path)
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+def ensure_default_files():
+    # Create default templates.json and settings.json if missing
+    data_path = resource_path(DATA_FILE)
+    settings_path = resource_path(SETTINGS_FILE)
+
+    if not os.path.exists(data_path):
+        sample = {
+            "categories": [
+                {
+                    "name": "İptal",
+                    "templates": [
+                        {"id": str(uuid.uuid4()), "title": "Üyelik İptal 1",
+                         "text": "Merhaba, talebiniz üzerine üyelik iptal işleminiz gerçekleştirildi. Herhangi bir sorunuz olursa yardımcı olmaktan memnuniyet duyarız."},
+                        {"id": str(uuid.uuid4()), "title": "Sipariş İptal 1",
+                         "text": "Bilgilendirme: İlgili sipariş iptal edilmiştir. Ücret iade süreci bankanıza bağlı olarak 1-7 iş günü içinde tamamlanacaktır."}
+                    ]
+                },
+                {
+                    "name": "Şikayet",
+                    "templates": [
+                        {"id": str(uuid.uuid4()), "title": "Kargo Gecikme Yanıtı",
+                         "text": "Yaşanan gecikme için üzgünüz. Kargo sürecini hızlandırmak adına ilgili birimle görüştük; en kısa sürede teslim edilecektir."}
+                    ]
+                },
+                {
+                    "name": "Özür",
+                    "templates": [
+                        {"id": str(uuid.uuid4()), "title": "Genel Özür",
+                         "text": "Yaşadığınız olumsuz deneyim için içtenlikle özür dileriz. Size daha iyi hizmet verebilmek için gerekli aksiyonları alıyoruz."}
+                    ]
+                }
+            ]
+        }
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump(sample, f, ensure_ascii=False, indent=2)
+
+    if not os.path.exists(settings_path):
+        defaults = {
+            "hotkeys": {
+                # You can assign a template id to these hotkeys via UI (sağ tık -> kısayol ata).
+                "ctrl+shift+t": None,
+                "ctrl+shift+q": None
+            },
+            "auto_paste_on_click": True,
+            "minimize_to_tray_on_close": True,
+            # Edits within this window are written to disk together, off the GUI thread
+            "save_delay_ms": 500
+        }
+        with open(settings_path, "w", encoding="utf-8") as f:
+            json.dump(defaults, f, ensure_ascii=False, indent=2)
+
+# (category name, title, text) of a template
+Version = Tuple[str, str, str]
+
+def _version(cat: Dict[str, Any], tpl: Dict[str, Any]) -> Version:
+    return cat.get("name", ""), tpl.get("title", ""), tpl.get("text", "")
+
+class TemplateStore:
+    def __init__(self, data_file: str, save_delay: float = 0.0, backend=None, watch: bool = False):
+        self.data_file = resource_path(data_file)
+        # Persistence strategy (see storage.py); whole-file JSON by default
+        self.backend = backend or JsonBackend(self.data_file)
+        # Templates are held as model.Template objects unless the backend keeps its own
+        self.compact_memory = getattr(self.backend, "compact_templates", True)
+        # watch=True: the file may be rewritten by other instances (see shared.py).
+        # Only the plain JSON format is merged; the other backends own their files
+        self.shared: Optional[SharedFile] = None
+        if watch and type(self.backend) is JsonBackend:
+            self.shared = SharedFile(self.backend.path)
+        # Local changes not written yet: template key -> version last read from
+        # or written to the file (None = created here), and touched category names
+        self._local: Dict[Key, Optional[Version]] = {}
+        self._local_cats: Set[str] = set()
+        self._dropped_cats: Set[str] = set()
+        # Changed here since they were last handed to a sync client (sync.py):
+        # template keys, and category names added and dropped; None until one
+        # attaches (track_sync)
+        self._unsynced: Optional[Set[Key]] = None
+        self._unsynced_cats: Set[str] = set()
+        self._unsynced_drops: Set[str] = set()
+        # A write was refused because the file changed; sync_external() retries it
+        self.external_pending = False
+        self.data: Dict[str, Any] = {"categories": []}
+        # template key (model.id_key) -> [category dict, position in category, template]
+        self._index: Dict[Key, List[Any]] = {}
+        # Type-ahead index, built on the first search and then kept current
+        self._search: Optional[SearchIndex] = None
+        # Exact/near-duplicate index (dedup.py), likewise
+        self._dedup: Optional[DuplicateIndex] = None
+        # Guards self.data against the background writer serialising it mid-mutation
+        self._lock = threading.RLock()
+        self._saver = WriteBehind(self._write, save_delay, label="Save")
+        self.load()
+
+    def load(self):
+        with self._lock, PROFILER.span("store.load"):
+            self.data = self.backend.load()
+            self._rebuild_index()
+            self._search = None
+            self._dedup = None
+            self._take_local()
+            if self.shared is not None:
+                self.shared.mark_synced()
+                self.external_pending = False
+
+    # --- Id index ---
+    def _rebuild_index(self):
+        self._index = {}
+        with gc_paused():
+            for cat in self.data["categories"]:
+                cat.setdefault("templates", [])
+            if self.compact_memory:
+                compact_templates(self.data["categories"])
+            for cat in self.data["categories"]:
+                self._index_templates(cat, 0)
+
+    def _index_templates(self, cat: Dict[str, Any], start: int):
+        # (Re)index templates of one category from position `start` onwards
+        templates = cat["templates"]
+        for pos in range(start, len(templates)):
+            tpl = templates[pos]
+            key = tpl.key if type(tpl) is Template else template_key(tpl)
+            if key:
+                self._index[key] = [cat, pos, tpl]
+
+    def find_template(self, template_id: str) -> Optional[Tuple[int, int]]:
+        # Reverse lookup: (category index, template index) of a template id
+        entry = self._index.get(id_key(template_id))
+        if entry is None:
+            return None
+        cat, pos, _ = entry
+        for cat_index, c in enumerate(self.data["categories"]):
+            if c is cat:
+                return cat_index, pos
+        return None
+
+    def get_category_of(self, template_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._index.get(id_key(template_id))
+        return entry[0] if entry else None
+
+    def save(self):
+        PROFILER.count("store.save_requests")
+        self._saver.request()
+
+    def flush(self, check: bool = False):
+        self._saver.flush(check)
+
+    def compact(self):
+        # Fold a non-empty journal back into the snapshot file
+        self._saver.flush()
+        if getattr(self.backend, "journal_size", 0) > 0:
+            self._write(force_snapshot=True)
+        refresh_cache = getattr(self.backend, "refresh_cache", None)
+        if refresh_cache is not None and self._saver.written and not self.external_pending:
+            with self._lock:
+                # Only while the file holds exactly self.data
+                if not self._saver.pending():
+                    refresh_cache(self.data)
+
+    @property
+    def collapsed_saves(self) -> int:
+        return self._saver.collapsed
+
+    def set_save_listener(self, callback: Optional[Callable[[], None]]):
+        # Called from the writing thread after the file has been written
+        self._saver.on_written = callback
+
+    def _write(self, force_snapshot: bool = False):
+        with PROFILER.span("store.write"):
+            with self._lock:
+                if self.shared is not None and self.shared.changed():
+                    # Merge first (sync_external), then write both sides' changes
+                    self.external_pending = True
+                    raise ExternalChange(f"{self.backend.path} başka bir kopya tarafından değiştirildi; "
+                                         "birleştirildikten sonra yazılacak")
+                batch = self.backend.prepare_write(self.data, force_snapshot)
+                local = self._take_local()
+                if self.shared is not None:
+                    before, entry = self.shared.stat, self._change_entry(local)
+            try:
+                self.backend.write(batch)
+            except Exception:
+                with self._lock:
+                    self._restore_local(local)
+                    restore = getattr(self.backend, "restore", None)
+                    if restore is not None:
+                        restore(batch)
+                raise
+            if self.shared is not None:
+                self.shared.log_write(before, entry)
+        if PROFILER.enabled:
+            PROFILER.count("store.written_bytes", os.path.getsize(self.backend.path))
+
+    def export_json(self, path: str):
+        # Plain templates.json format, regardless of the storage backend
+        with self._lock:
+            self.backend.export({"categories": self.data["categories"]}, path)
+
+    # --- Shared file ---
+    def _touch(self, cat: Dict[str, Any], tpl: Dict[str, Any]):
+        # Keep a template's on-disk version before its first local change,
+        # and note it for the next sync
+        key = template_key(tpl)
+        if self._unsynced is not None and key:
+            self._unsynced.add(key)
+        if self.shared is not None and key and key not in self._local:
+            self._local[key] = _version(cat, tpl)
+
+    def _created(self, key: Key):
+        # A template new here (or put back). Deleted earlier and not written
+        # yet: the older base stays
+        self._local.setdefault(key, None)
+        if self._unsynced is not None:
+            self._unsynced.add(key)
+
+    def _take_local(self) -> Tuple[Dict[Key, Optional[Version]], Set[str], Set[str]]:
+        taken = self._local, self._local_cats, self._dropped_cats
+        self._local, self._local_cats, self._dropped_cats = {}, set(), set()
+        return taken
+
+    def _restore_local(self, taken: Tuple[Dict[Key, Optional[Version]], Set[str], Set[str]]):
+        # A failed write: those changes are still local (older base wins)
+        local, local_cats, dropped_cats = taken
+        for key, base in local.items():
+            self._local.setdefault(key, base)
+        self._local_cats |= local_cats
+        self._dropped_cats |= dropped_cats
+
+    def _category_synced(self, added: Optional[str] = None, dropped: Optional[str] = None):
+        # Category names for the next sync
+        if self._unsynced is None:
+            return
+        if dropped is not None:
+            self._unsynced_cats.discard(dropped)
+            self._unsynced_drops.add(dropped)
+        if added is not None:
+            self._unsynced_drops.discard(added)
+            self._unsynced_cats.add(added)
+
+    def has_local_changes(self) -> bool:
+        return bool(self._local or self._local_cats or self._dropped_cats)
+
+    def sync_external(self) -> Optional[MergeResult]:
+        # Fold in what other instances wrote to the shared file. Costs one
+        # stat() when nothing changed. Otherwise the change log supplies just
+        # the templates that changed; only without it is the whole file read
+        # and compared. None if there was nothing to apply
+        if self.shared is None or not self.shared.changed():
+            return None
+        with self._lock, PROFILER.span("store.sync_external"):
+            entries = self.shared.read_changes()
+            if entries == []:
+                # The writer's log entry is not there yet; look again next time
+                return None
+            if entries is not None:
+                result = self._apply_changes(*self._changes_from_log(entries))
+            else:
+                doc = self.shared.read()
+                result = self._apply_changes(*self._diff_document(doc)) if doc is not None else None
+            retry = self.external_pending or self.has_local_changes()
+            self.external_pending = False
+        if retry:
+            self.save()
+        return result
+
+    def _change_entry(self, local: Tuple[Dict[Key, Optional[Version]], Set[str], Set[str]]) -> Dict[str, Any]:
+        # Change log entry for a write (see shared.py); runs under the lock
+        changed, local_cats, dropped_cats = local
+        put, deleted = [], []
+        for key in changed:
+            entry = self._index.get(key)
+            if entry is None:
+                deleted.append(id_str(key))
+            else:
+                put.append({"cat": entry[0].get("name", ""), "tpl": dict(entry[2])})
+        return {"put": put, "del": deleted, "cats": sorted(local_cats), "drop": sorted(dropped_cats)}
+
+    def _changes_from_log(self, entries: List[Dict[str, Any]]) -> Tuple[Dict[Key, Any], List[str], Set[str]]:
+        # Later entries win; keys map to (category name, template) or None (deleted)
+        changes: Dict[Key, Any] = {}
+        added: List[str] = []
+        dropped: Set[str] = set()
+        for entry in entries:
+            for item in entry.get("put", []):
+                tpl = item.get("tpl")
+                if isinstance(tpl, dict) and tpl.get("id"):
+                    changes[template_key(tpl)] = (item.get("cat", ""), tpl)
+            for tid in entry.get("del", []):
+                changes[id_key(tid)] = None
+            for name in entry.get("cats", []):
+                dropped.discard(name)
+                added.append(name)
+            for name in entry.get("drop", []):
+                dropped.add(name)
+        return changes, added, dropped
+
+    def _diff_document(self, doc: Dict[str, Any]) -> Tuple[Dict[Key, Any], List[str], Set[str]]:
+        # Same shape as _changes_from_log(), from a whole document: the
+        # templates that differ from memory, or are changed here
+        changes: Dict[Key, Any] = {}
+        their_cats: List[str] = []
+        seen: Set[Key] = set()
+        index, local = self._index, self._local
+        for cat in doc["categories"]:
+            if not isinstance(cat, dict):
+                continue
+            name = cat.get("name", "")
+            their_cats.append(name)
+            for tpl in cat.get("templates") or []:
+                key = template_key(tpl) if isinstance(tpl, dict) else None
+                if not key:
+                    continue
+                seen.add(key)
+                entry = index.get(key)
+                if (entry is None or key in local or entry[0].get("name", "") != name
+                        or entry[2].get("title", "") != tpl.get("title", "")
+                        or entry[2].get("text", "") != tpl.get("text", "")):
+                    changes[key] = (name, tpl)
+        for key in index:
+            if key not in seen:
+                changes[key] = None
+        for key in local:
+            if key not in seen and key not in index:
+                changes[key] = None
+        ours = {cat.get("name", "") for cat in self.data["categories"]}
+        return changes, [name for name in their_cats if name not in ours], ours - set(their_cats)
+
+    def _apply_changes(self, changes: Dict[Key, Any], cats_added: List[str], cats_dropped: Set[str]) -> MergeResult:
+        # Three-way merge by template id: their version, ours and, for
+        # templates changed here, the version both started from (self._local)
+        result = MergeResult()
+        cats: Dict[str, Dict[str, Any]] = {}
+        for cat in self.data["categories"]:
+            cats.setdefault(cat.get("name", ""), cat)
+        # category dict id -> (category, positions to remove)
+        removals: Dict[int, Tuple[Dict[str, Any], Set[int]]] = {}
+
+        def category(name: str) -> Dict[str, Any]:
+            cat = cats.get(name)
+            if cat is None:
+                cat = cats[name] = {"name": name, "templates": []}
+                self.data["categories"].append(cat)
+                result.structure = True
+            return cat
+
+        def unlink(entry: List[Any]):
+            old = entry[0]
+            removals.setdefault(id(old), (old, set()))[1].add(entry[1])
+            result.categories.add(old.get("name", ""))
+
+        def insert(name: str, key: Key, tpl: Dict[str, Any]):
+            cat = category(name)
+            cat["templates"].append(tpl)
+            self._index[key] = [cat, len(cat["templates"]) - 1, tpl]
+            result.categories.add(name)
+
+        def add(name: str, their: Dict[str, Any], key: Key, title: str):
+            tpl = dict(their, id=id_str(key), title=title)
+            if self.compact_memory:
+                tpl = make_template(tpl)
+            insert(name, key, tpl)
+            self._text_added(key, tpl.get("title", ""), tpl.get("text", ""))
+
+        for key, change in changes.items():
+            entry = self._index.get(key)
+            ours = _version(entry[0], entry[2]) if entry else None
+            other = (change[0], change[1].get("title", ""), change[1].get("text", "")) if change else None
+            if ours == other:
+                self._local.pop(key, None)
+                continue
+            if key in self._local:
+                if other == self._local[key]:
+                    # Only changed here; goes out with our next write
+                    continue
+                if ours is None:
+                    add(change[0], change[1], key, other[1])
+                    self._local.pop(key)
+                    result.added.append(id_str(key))
+                    result.conflicts.append((other[1], "burada silinmişti, diğer kopyada değiştirildi; geri getirildi"))
+                elif other is None:
+                    result.conflicts.append((ours[1], "diğer kopyada silindi, burada değiştirilmişti; saklandı"))
+                else:
+                    copy_id = str(uuid.uuid4())
+                    copy_key = id_key(copy_id)
+                    add(change[0], change[1], copy_key, other[1] + CONFLICT_SUFFIX)
+                    self._local[copy_key] = None
+                    result.added.append(copy_id)
+                    result.conflicts.append((ours[1], "iki kopyada da değiştirildi; diğer sürüm "
+                                                      f"'{other[1] + CONFLICT_SUFFIX}' olarak eklendi"))
+                continue
+            if other is None:
+                del self._index[key]
+                unlink(entry)
+                self._text_removed(key)
+                result.removed.append(id_str(key))
+            elif entry is None:
+                add(change[0], change[1], key, other[1])
+                result.added.append(id_str(key))
+            else:
+                tpl = entry[2]
+                if ours[1:] != other[1:]:
+                    if type(tpl) is Template:
+                        tpl["title"], tpl["text"] = other[1], other[2]
+                    else:
+                        tpl.update(change[1])
+                    self._text_changed(key, other[1], other[2])
+                if ours[0] != other[0]:
+                    unlink(entry)
+                    insert(other[0], key, tpl)
+                result.changed.append(id_str(key))
+
+        # Entries leave their old lists last, highest position first, so the
+        # positions recorded above stay valid; then the tails are reindexed
+        for cat, positions in removals.values():
+            templates = cat["templates"]
+            for pos in sorted(positions, reverse=True):
+                del templates[pos]
+            self._index_templates(cat, min(positions))
+
+        # Categories new there are appended (unless deleted here); ones gone
+        # there (renamed or deleted) go once empty, unless created here
+        for name in cats_added:
+            if name not in self._dropped_cats:
+                category(name)
+        gone = cats_dropped - self._local_cats
+        if gone:
+            categories = self.data["categories"]
+            for pos in range(len(categories) - 1, -1, -1):
+                if categories[pos].get("name", "") in gone and not categories[pos]["templates"]:
+                    del categories[pos]
+                    result.structure = True
+        return result
+
+    # --- Category ops ---
+    def list_categories(self) -> List[Dict[str, Any]]:
+        return self.data["categories"]
+
+    def add_category(self, name: str):
+        with self._lock:
+            self.data["categories"].append({"name": name, "templates": []})
+            self._local_cats.add(name)
+            self._category_synced(added=name)
+            self.backend.record({"op": "add_category", "name": name})
+        self.save()
+
+    def rename_category(self, index: int, new_name: str):
+        with self._lock:
+            cat = self.data["categories"][index]
+            if self.shared is not None or self._unsynced is not None:
+                # Every template moves to the new name
+                for tpl in cat["templates"]:
+                    self._touch(cat, tpl)
+            if self.shared is not None:
+                self._dropped_cats.add(cat["name"])
+                self._local_cats.add(new_name)
+            self._category_synced(added=new_name, dropped=cat["name"])
+            cat["name"] = new_name
+            self.backend.record({"op": "rename_category", "cat": index, "name": new_name})
+        self.save()
+
+    def delete_category(self, index: int):
+        with self._lock:
+            cat = self.data["categories"][index]
+            self._dropped_cats.add(cat["name"])
+            self._category_synced(dropped=cat["name"])
+            for tpl in cat["templates"]:
+                self._touch(cat, tpl)
+                key = template_key(tpl)
+                self._index.pop(key, None)
+                self._text_removed(key)
+            del self.data["categories"][index]
+            self.backend.record({"op": "delete_category", "cat": index})
+        self.save()
+
+    def insert_category(self, index: int, name: str, templates: List[Dict[str, Any]]):
+        # Put a category back at `index` with its templates, ids kept (undo
+        # of delete_category, see history.py). The template objects are reused
+        with self._lock:
+            cat = {"name": name, "templates": [self._own_template(tpl) for tpl in templates]}
+            for tpl in cat["templates"]:
+                if template_key(tpl) in self._index:
+                    raise ValueError(f"şablon zaten var: {tpl['id']}")
+            self.data["categories"].insert(index, cat)
+            self._index_templates(cat, 0)
+            self._local_cats.add(name)
+            self._dropped_cats.discard(name)
+            self._category_synced(added=name)
+            for tpl in cat["templates"]:
+                key = template_key(tpl)
+                self._created(key)
+                self._text_added(key, tpl.get("title", ""), tpl.get("text", ""))
+            self.backend.record({"op": "insert_category", "cat": index, "name": name,
+                                 "templates": [dict(tpl) for tpl in cat["templates"]]})
+        self.save()
+
+    # --- Template ops ---
+    def list_templates(self, cat_index: int) -> List[Dict[str, Any]]:
+        return self.data["categories"][cat_index]["templates"]
+
+    def add_template(self, cat_index: int, title: str, text: str) -> str:
+        tid = str(uuid.uuid4())
+        with self._lock:
+            cat = self.data["categories"][cat_index]
+            key, tpl = self._new_template(tid, title, text)
+            cat["templates"].append(tpl)
+            self._index[key] = [cat, len(cat["templates"]) - 1, tpl]
+            self._created(key)
+            self._text_added(key, title, text)
+            self.backend.record({"op": "add_template", "cat": cat_index, "id": tid, "title": title, "text": text})
+        self.save()
+        return tid
+
+    def edit_template(self, cat_index: int, tpl_index: int, title: str, text: str):
+        # The template is edited in place, so its index entry stays valid
+        with self._lock:
+            cat = self.data["categories"][cat_index]
+            tpl = cat["templates"][tpl_index]
+            self._touch(cat, tpl)
+            tpl["title"] = title
+            tpl["text"] = text
+            self._text_changed(template_key(tpl), title, text)
+            self.backend.record({"op": "edit_template", "id": tpl.get("id"), "title": title, "text": text})
+        self.save()
+
+    def delete_template(self, cat_index: int, tpl_index: int):
+        with self._lock:
+            cat = self.data["categories"][cat_index]
+            tpl = cat["templates"].pop(tpl_index)
+            self._touch(cat, tpl)
+            key = template_key(tpl)
+            self._index.pop(key, None)
+            # Only the templates after the removed one shift position
+            self._index_templates(cat, tpl_index)
+            self._text_removed(key)
+            self.backend.record({"op": "delete_template", "id": tpl.get("id")})
+        self.save()
+
+    def insert_template(self, cat_index: int, tpl_index: int, tpl: Dict[str, Any]):
+        # Put a template back at a position, id kept (undo, see history.py)
+        with self._lock:
+            cat = self.data["categories"][cat_index]
+            tpl = self._own_template(tpl)
+            key = template_key(tpl)
+            if key in self._index:
+                raise ValueError(f"şablon zaten var: {tpl['id']}")
+            cat["templates"].insert(tpl_index, tpl)
+            # The template and the ones after it (shifted by one)
+            self._index_templates(cat, tpl_index)
+            self._created(key)
+            self._text_added(key, tpl.get("title", ""), tpl.get("text", ""))
+            self.backend.record({"op": "insert_template", "cat": cat_index, "pos": tpl_index, "id": tpl["id"],
+                                 "title": tpl["title"], "text": tpl["text"]})
+        self.save()
+
+    @profiled("store.add_templates")
+    def add_templates(self, items: Iterable[Tuple[str, str, str, str]]) -> int:
+        # Bulk append of (category name, id, title, text) with one save for
+        # all; categories are created by name as needed. All or nothing: if
+        # `items` raises, whatever it had added is taken out again
+        added: List[Tuple[int, Key, Dict[str, Any]]] = []
+        with self._lock:
+            categories = self.data["categories"]
+            first_new_cat = len(categories)
+            cats: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+            for cat_index, cat in enumerate(categories):
+                cats.setdefault(cat["name"], (cat_index, cat))
+            # category dict id -> (category, template count before the import)
+            lengths: Dict[int, Tuple[Dict[str, Any], int]] = {}
+            try:
+                for name, tid, title, text in items:
+                    entry = cats.get(name)
+                    if entry is None:
+                        entry = cats[name] = (len(categories), {"name": name, "templates": []})
+                        categories.append(entry[1])
+                    cat_index, cat = entry
+                    lengths.setdefault(id(cat), (cat, len(cat["templates"])))
+                    key, tpl = self._new_template(tid, title, text)
+                    cat["templates"].append(tpl)
+                    self._index[key] = [cat, len(cat["templates"]) - 1, tpl]
+                    self._text_added(key, title, text)
+                    added.append((cat_index, key, tpl))
+            except BaseException:
+                for cat, length in lengths.values():
+                    del cat["templates"][length:]
+                del categories[first_new_cat:]
+                for _, key, _ in added:
+                    self._index.pop(key, None)
+                    self._text_removed(key)
+                raise
+            for cat in categories[first_new_cat:]:
+                self._local_cats.add(cat["name"])
+                self._category_synced(added=cat["name"])
+                self.backend.record({"op": "add_category", "name": cat["name"]})
+            for cat_index, key, tpl in added:
+                self._created(key)
+                self.backend.record({"op": "add_template", "cat": cat_index, "id": tpl["id"],
+                                     "title": tpl["title"], "text": tpl["text"]})
+        if added:
+            self.save()
+        return len(added)
+
+    def _new_template(self, tid: str, title: str, text: str) -> Tuple[Key, Dict[str, Any]]:
+        key = id_key(tid)
+        if self.compact_memory:
+            return key, Template(key, title, text)
+        return key, {"id": tid, "title": title, "text": text}
+
+    def _own_template(self, tpl: Dict[str, Any]) -> Dict[str, Any]:
+        # A template handed back in (undo) in the form this store holds
+        if self.compact_memory:
+            return tpl if type(tpl) is Template else make_template(dict(tpl))
+        return tpl.to_dict() if type(tpl) is Template else tpl
+
+    @profiled("store.get_template_by_id", log=False)
+    def get_template_by_id(self, template_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._index.get(id_key(template_id))
+        return entry[2] if entry else None
+
+    # --- Sync (sync.py) ---
+    def track_sync(self):
+        # Start noting local changes for a sync client
+        with self._lock:
+            if self._unsynced is None:
+                self._unsynced = set()
+
+    def take_sync_changes(self) -> Tuple[List[str], List[str], List[str]]:
+        # Ids of the templates added, edited, moved or deleted here since the
+        # last call, and the category names added and dropped
+        with self._lock:
+            if self._unsynced is None:
+                return [], [], []
+            keys, cats, drops = self._unsynced, self._unsynced_cats, self._unsynced_drops
+            self._unsynced, self._unsynced_cats, self._unsynced_drops = set(), set(), set()
+        return [id_str(key) for key in keys], sorted(cats), sorted(drops)
+
+    # --- Text indexes ---
+    # Kept current by every mutation once built; the caller holds the lock
+    def _text_added(self, key: Key, title: str, text: str):
+        if self._search is not None:
+            self._search.add(key, title, text)
+        if self._dedup is not None:
+            self._dedup.add(key, text)
+
+    def _text_changed(self, key: Key, title: str, text: str):
+        if self._search is not None:
+            self._search.update(key, title, text)
+        if self._dedup is not None:
+            self._dedup.update(key, text)
+
+    def _text_removed(self, key: Key):
+        if self._search is not None:
+            self._search.remove(key)
+        if self._dedup is not None:
+            self._dedup.remove(key)
+
+    # --- Search ---
+    @profiled("store.search")
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        # Type-ahead search across all categories (see search.py)
+        with self._lock:
+            if self._search is None:
+                self._search = SearchIndex()
+                self._search.build((key, entry[2]) for key, entry in self._index.items())
+            return [self._index[key][2] for key in self._search.search(query, limit)]
+
+    # --- Duplicates ---
+    def _duplicates(self) -> DuplicateIndex:
+        if self._dedup is None:
+            self._dedup = DuplicateIndex()
+            self._dedup.build((key, entry[2]) for key, entry in self._index.items())
+        return self._dedup
+
+    @profiled("store.find_duplicates")
+    def find_duplicates(self, text: str, exclude_id: Optional[str] = None,
+                        threshold: float = NEAR_THRESHOLD) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], float]]]:
+        # Templates with the same text, and (template, similarity) of near
+        # duplicates; `exclude_id` is the template being edited
+        exclude = id_key(exclude_id) if exclude_id else None
+        with self._lock:
+            dedup = self._duplicates()
+            exact = [self._index[key][2] for key in dedup.exact(text, exclude)]
+            near = [(self._index[key][2], score) for key, score in dedup.similar(text, threshold, exclude=exclude)]
+        return exact, near
+
+    @profiled("store.duplicate_groups")
+    def duplicate_groups(self, threshold: float = NEAR_THRESHOLD) -> Tuple[List[List[Dict[str, Any]]], List[List[Tuple[Dict[str, Any], float]]]]:
+        # The whole library: groups of exact duplicates and clusters of near
+        # duplicates (see dedup.format_report)
+        with self._lock:
+            exact, near = self._duplicates().groups(threshold)
+            return ([[self._index[key][2] for key in group] for group in exact],
+                    [[(self._index[key][2], score) for key, score in group] for group in near])
+
+class SettingsStore:
+    def __init__(self, settings_file: str, save_delay: Optional[float] = None):
+        self.settings_file = resource_path(settings_file)
+        self.settings: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._saver = WriteBehind(self._write, 0.0, label="Settings save")
+        self.load()
+        # By default the settings file's own "save_delay_ms" applies
+        self._saver.delay = self.save_delay() if save_delay is None else save_delay
+
+    @profiled("settings.load")
+    def load(self):
+        try:
+            with open(self.settings_file, "r", encoding="utf-8") as f:
+                self.settings = json.load(f)
+        except Exception:
+            self.settings = {"hotkeys": {}, "auto_paste_on_click": True, "minimize_to_tray_on_close": True}
+
+    def save(self):
+        self._saver.request()
+
+    def flush(self):
+        self._saver.flush()
+
+    @property
+    def collapsed_saves(self) -> int:
+        return self._saver.collapsed
+
+    def set_save_listener(self, callback: Optional[Callable[[], None]]):
+        # Called from the writing thread after the file has been written
+        self._saver.on_written = callback
+
+    def _write(self):
+        with PROFILER.span("settings.write"):
+            with self._lock:
+                payload = json.dumps(self.settings, ensure_ascii=False, indent=2)
+            write_text_atomic(self.settings_file, payload)
+        PROFILER.count("settings.written_bytes", len(payload))
+
+    def save_delay(self) -> float:
+        # Write-behind window in seconds (0 = write synchronously)
+        return max(0, int(self.settings.get("save_delay_ms", 500))) / 1000.0
+
+    def make_storage_backend(self, data_file: str):
+        # "storage": "json" (default), "journal" (append-only, see storage.py) or
+        # "lazy" (bodies read on demand, see lazy_storage.py);
+        # "sqlite" is a separate store, see open_template_store()
+        kind = self.settings.get("storage", "json")
+        # Parsed copy of templates.json for fast starts (storage.read_document_cached)
+        snapshot_cache = bool(self.settings.get("snapshot_cache", True))
+        if kind == "journal":
+            compact_kb = max(1, int(self.settings.get("journal_compact_kb", 1024)))
+            return make_backend(resource_path(data_file), kind, compact_bytes=compact_kb * 1024,
+                                snapshot_cache=snapshot_cache)
+        if kind == "lazy":
+            cache_size = max(1, int(self.settings.get("body_cache_size", 256)))
+            return make_backend(resource_path(data_file), kind, cache_size=cache_size)
+        return make_backend(resource_path(data_file), kind, snapshot_cache=snapshot_cache)
+
+    def get_hotkey_target(self, combo: str) -> Optional[str]:
+        return self.settings.get("hotkeys", {}).get(combo)
+
+    def set_hotkey_target(self, combo: str, template_id: Optional[str]):
+        with self._lock:
+            self.settings.setdefault("hotkeys", {})
+            self.settings["hotkeys"][combo] = template_id
+        self.save()
+
+    def auto_paste_on_click(self) -> bool:
+        return bool(self.settings.get("auto_paste_on_click", True))
+
+    def set_auto_paste_on_click(self, value: bool):
+        with self._lock:
+            self.settings["auto_paste_on_click"] = bool(value)
+        self.save()
+
+def open_template_store(settings: SettingsStore):
+    # "storage": "sqlite" keeps the library in templates.db (migrated once from
+    # templates.json on first use); the other modes are TemplateStore backends
+    if settings.settings.get("storage") == "sqlite":
+        from sqlite_store import SqliteTemplateStore, migrate_json_to_sqlite
+        db_path = resource_path(DB_FILE)
+        if not os.path.exists(db_path):
+            return migrate_json_to_sqlite(resource_path(DATA_FILE), db_path)
+        return SqliteTemplateStore(db_path)
+    # "watch_file": merge changes other instances write to templates.json
+    return TemplateStore(DATA_FILE, save_delay=settings.save_delay(),
+                         backend=settings.make_storage_backend(DATA_FILE),
+                         watch=bool(settings.settings.get("watch_file", True)))
@@ -0,0 +1,662 @@
+import sys, json, uuid, zlib, socket, struct, secrets, argparse, threading, socketserver
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Set
+
+from storage import WriteBehind, write_text_atomic
+from shared import MergeResult, CONFLICT_SUFFIX
+from profiling import PROFILER, profiled
+
+# Team-wide template library over a small sync server. Every machine keeps its
+# own templates.json (any storage); the server holds the shared copy and
+# numbers every change.
+#
+#   python sync.py --serve                  # server (sync_server.json here)
+#   python sync.py                          # sync this library once
+#
+# Revisions: the library has one counter; each template and category name
+# carries the revision of its last change (deletions stay as tombstones). A
+# client remembers the revision it last synced at (its ETag) and in one round
+# trip sends the templates changed here since then and receives those changed
+# elsewhere, nothing else. A template changed here and on the server after
+# that revision is a conflict: the server's version stays under the id, ours
+# is kept next to it as "... (çakışma)" and the user is told.
+#
+# Protocol: one persistent TCP connection; frames are a 4-byte big-endian
+# length and a JSON object, zlib-compressed when longer than COMPRESS_FROM
+# (a compressed frame never starts with "{").
+#   {"cmd": "hello", "token": ...}    -> {"ok", "library", "revision"}
+#   {"cmd": "sync", "library", "since": rev, "put": [{"id", "cat", "title", "text"}],
+#    "del": [id], "cats": [name], "drop": [name]}
+#       -> {"ok", "library", "revision", "put", "del", "cats", "drop", "conflicts": [{"id", "theirs"}]}
+#       "full": true instead when `since` predates the tombstones kept: "put"
+#       is then the whole library; "reset": true when the library is another
+#   {"cmd": "status"}                 -> {"ok", "revision", "templates", ...}
+
+SYNC_PORT = 47814
+SERVER_FILE = "sync_server.json"
+STATE_FILE = "sync_state.json"
+COMPRESS_FROM = 512
+MAX_FRAME = 256 * 1024 * 1024
+# Deleted template ids remembered; clients behind the oldest get the whole library
+MAX_TOMBSTONES = 50000
+
+_HEADER = struct.Struct(">I")
+
+class SyncError(Exception):
+    # The server refused a request (token, protocol)
+    pass
+
+# ---------- Framing ----------
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(payload) > COMPRESS_FROM:
+        payload = zlib.compress(payload, 6)
+    return _HEADER.pack(len(payload)) + payload
+
+def read_frame(f) -> Tuple[Optional[Dict[str, Any]], int]:
+    # (message, bytes read); (None, 0) when the peer closed the connection
+    header = f.read(_HEADER.size)
+    if not header:
+        return None, 0
+    if len(header) < _HEADER.size:
+        raise ValueError("kesik çerçeve")
+    size = _HEADER.unpack(header)[0]
+    if size > MAX_FRAME:
+        raise ValueError(f"çerçeve çok büyük: {size}")
+    payload = f.read(size)
+    if len(payload) < size:
+        raise ValueError("kesik çerçeve")
+    if payload[:1] != b"{":
+        payload = zlib.decompress(payload)
+    message = json.loads(payload)
+    if not isinstance(message, dict):
+        raise ValueError("geçersiz ileti")
+    return message, _HEADER.size + size
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = str(address).rpartition(":")
+    if not host:
+        return port or "127.0.0.1", SYNC_PORT
+    return host, int(port)
+
+# ---------- Server ----------
+class SyncServer:
+    def __init__(self, path: str, token: str, save_delay: float = 1.0):
+        self.path = path
+        self.token = token
+        self.library = uuid.uuid4().hex
+        self.revision = 0
+        # Oldest revision a delta can start from (older tombstones are gone)
+        self.floor = 0
+        # id -> [rev, category, title, text], oldest change first
+        self.templates: "OrderedDict[str, List[Any]]" = OrderedDict()
+        # id -> rev of its deletion, oldest first
+        self.deleted: "OrderedDict[str, int]" = OrderedDict()
+        # Category name -> rev (added / dropped), and templates per name
+        self.categories: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+        self._counts: Dict[str, int] = {}
+        self.syncs = 0
+        self._lock = threading.Lock()
+        self._saver = WriteBehind(self._write, save_delay, label="Sync server save")
+        self._server: Optional[socketserver.BaseServer] = None
+        # Open client connections, closed by stop()
+        self._conns: Set[socket.socket] = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        self.library = str(data["library"])
+        self.revision = int(data["revision"])
+        self.floor = int(data.get("floor", 0))
+        self.templates = OrderedDict((tid, [rev, cat, title, text]) for tid, rev, cat, title, text in data["templates"])
+        self.deleted = OrderedDict((tid, rev) for tid, rev in data.get("deleted", []))
+        self.categories = {name: rev for name, rev in data.get("categories", [])}
+        self.dropped = {name: rev for name, rev in data.get("dropped", [])}
+        self._counts = {}
+        for rec in self.templates.values():
+            self._counts[rec[1]] = self._counts.get(rec[1], 0) + 1
+
+    def flush(self):
+        self._saver.flush()
+
+    def _write(self):
+        with self._lock:
+            payload = json.dumps({
+                "version": 1, "library": self.library, "revision": self.revision, "floor": self.floor,
+                "templates": [[tid, *rec] for tid, rec in self.templates.items()],
+                "deleted": list(self.deleted.items()),
+                "categories": list(self.categories.items()), "dropped": list(self.dropped.items()),
+            }, ensure_ascii=False)
+        write_text_atomic(self.path, payload)
+
+    # --- Changes ---
+    def _bump(self) -> int:
+        self.revision += 1
+        return self.revision
+
+    def _put(self, tid: str, cat: str, title: str, text: str):
+        old = self.templates.pop(tid, None)
+        if old is not None:
+            self._counts[old[1]] -= 1
+        self.deleted.pop(tid, None)
+        self.templates[tid] = [self._bump(), cat, title, text]
+        self._counts[cat] = self._counts.get(cat, 0) + 1
+        if cat not in self.categories:
+            self._add_category(cat)
+
+    def _delete(self, tid: str):
+        old = self.templates.pop(tid)
+        self._counts[old[1]] -= 1
+        self.deleted[tid] = self._bump()
+        if len(self.deleted) > MAX_TOMBSTONES:
+            self.floor = self.deleted.popitem(last=False)[1]
+
+    def _add_category(self, name: str):
+        self.dropped.pop(name, None)
+        self.categories[name] = self._bump()
+
+    def sync(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        since = int(request.get("since", 0))
+        with self._lock:
+            if request.get("library") not in (None, self.library) or since > self.revision:
+                # Another library (the server file was replaced): start over
+                return {"ok": True, "reset": True, "library": self.library, "revision": self.revision}
+            start = self.revision
+            mine: Set[str] = set()
+            conflicts: List[Dict[str, Any]] = []
+
+            def theirs(tid: str) -> Optional[Dict[str, str]]:
+                rec = self.templates.get(tid)
+                return None if rec is None else {"id": tid, "cat": rec[1], "title": rec[2], "text": rec[3]}
+
+            for item in request.get("put", []):
+                tid = str(item["id"])
+                new = (str(item.get("cat", "")), str(item.get("title", "")), str(item.get("text", "")))
+                rec = self.templates.get(tid)
+                if rec is not None and tuple(rec[1:]) == new:
+                    mine.add(tid)
+                elif (rec is not None and rec[0] > since) or self.deleted.get(tid, 0) > since:
+                    conflicts.append({"id": tid, "theirs": theirs(tid)})
+                else:
+                    self._put(tid, *new)
+                    mine.add(tid)
+            for tid in request.get("del", []):
+                tid = str(tid)
+                rec = self.templates.get(tid)
+                if rec is None:
+                    continue
+                if rec[0] > since:
+                    conflicts.append({"id": tid, "theirs": theirs(tid)})
+                else:
+                    self._delete(tid)
+                    mine.add(tid)
+            for name in request.get("cats", []):
+                if name not in self.categories:
+                    self._add_category(str(name))
+            for name in request.get("drop", []):
+                # Only once empty; a template added elsewhere keeps it
+                if name in self.categories and not self._counts.get(name):
+                    del self.categories[name]
+                    self.dropped[name] = self._bump()
+            reply = self._delta(since, mine | {c["id"] for c in conflicts})
+            reply["conflicts"] = conflicts
+            self.syncs += 1
+            changed = self.revision != start
+        if changed:
+            self._saver.request()
+        PROFILER.count("sync.server_syncs")
+        return reply
+
+    def _delta(self, since: int, skip: Set[str]) -> Dict[str, Any]:
+        # What changed after `since`, newest first, without `skip` (the
+        # client's own changes just accepted, and its conflicts)
+        reply: Dict[str, Any] = {"ok": True, "library": self.library, "revision": self.revision}
+        if since == 0 or since < self.floor:
+            reply["full"] = True
+            reply["put"] = [{"id": tid, "cat": rec[1], "title": rec[2], "text": rec[3]}
+                            for tid, rec in self.templates.items()]
+            reply["cats"] = list(self.categories)
+            return reply
+        put, deleted = [], []
+        for tid in reversed(self.templates):
+            rec = self.templates[tid]
+            if rec[0] <= since:
+                break
+            if tid not in skip:
+                put.append({"id": tid, "cat": rec[1], "title": rec[2], "text": rec[3]})
+        for tid in reversed(self.deleted):
+            if self.deleted[tid] <= since:
+                break
+            if tid not in skip:
+                deleted.append(tid)
+        put.reverse()
+        reply["put"] = put
+        reply["del"] = deleted
+        reply["cats"] = [name for name, rev in self.categories.items() if rev > since]
+        reply["drop"] = [name for name, rev in self.dropped.items() if rev > since]
+        return reply
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ok": True, "library": self.library, "revision": self.revision, "floor": self.floor,
+                    "templates": len(self.templates), "tombstones": len(self.deleted),
+                    "categories": len(self.categories), "syncs": self.syncs}
+
+    # --- Network ---
+    def serve(self, host: str, port: int) -> int:
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server._conns.add(self.connection)
+
+            def finish(self):
+                with server._lock:
+                    server._conns.discard(self.connection)
+                super().finish()
+
+            def handle(self):
+                authed = False
+                while True:
+                    try:
+                        request, _ = read_frame(self.rfile)
+                    except (OSError, ValueError, zlib.error) as e:
+                        print("Sync bağlantı hatası:", e)
+                        return
+                    if request is None:
+                        return
+                    cmd = request.get("cmd")
+                    try:
+                        if cmd == "hello":
+                            authed = secrets.compare_digest(str(request.get("token", "")), server.token)
+                            reply = ({"ok": True, "library": server.library, "revision": server.revision}
+                                     if authed else {"ok": False, "error": "yetkisiz"})
+                        elif not authed:
+                            reply = {"ok": False, "error": "yetkisiz"}
+                        elif cmd == "sync":
+                            reply = server.sync(request)
+                        elif cmd == "status":
+                            reply = server.status()
+                        else:
+                            reply = {"ok": False, "error": f"bilinmeyen komut: {cmd}"}
+                    except (KeyError, TypeError, ValueError) as e:
+                        reply = {"ok": False, "error": str(e)}
+                    try:
+                        self.wfile.write(encode_frame(reply))
+                    except OSError:
+                        return
+                    if not authed:
+                        return
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.flush()
+
+# ---------- Client ----------
+def _append_at(store, cat_index: int) -> int:
+    # Position after a category's last template
+    count = getattr(store, "count_templates", None)
+    return count(cat_index) if count is not None else len(store.list_templates(cat_index))
+
+class SyncClient:
+    # Syncs a TemplateStore or SqliteTemplateStore. A round is begin() and
+    # finish() on the thread that edits the store (the GUI thread) with
+    # exchange() in between, which the GUI runs on a worker thread; sync()
+    # does all three
+    def __init__(self, store, address: str, token: str, state_path: str, timeout: float = 5.0):
+        self.store = store
+        self.address = address
+        self.token = token
+        self.state_path = state_path
+        self.timeout = timeout
+        self.library: Optional[str] = None
+        self.revision = 0
+        # Changed here and not yet accepted by the server
+        self.pending: Set[str] = set()
+        self.pending_cats: Set[str] = set()
+        self.pending_drops: Set[str] = set()
+        self.syncs = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.last_error: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._rfile = None
+        store.track_sync()
+        self.load_state()
+
+    # --- State ---
+    def load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("server") == self.address:
+                self.library = data.get("library")
+                self.revision = int(data.get("revision", 0))
+            self.pending = set(data.get("pending", []))
+            self.pending_cats = set(data.get("cats", []))
+            self.pending_drops = set(data.get("drop", []))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print("Sync state load error:", e)
+
+    def save_state(self):
+        self._take_local()
+        payload = json.dumps({"version": 1, "server": self.address, "library": self.library,
+                              "revision": self.revision, "pending": sorted(self.pending),
+                              "cats": sorted(self.pending_cats), "drop": sorted(self.pending_drops)},
+                             ensure_ascii=False)
+        try:
+            write_text_atomic(self.state_path, payload)
+        except OSError as e:
+            print("Sync state write error:", e)
+
+    def _take_local(self):
+        ids, cats, drops = self.store.take_sync_changes()
+        self.pending.update(ids)
+        self.pending_cats.difference_update(drops)
+        self.pending_drops.difference_update(cats)
+        self.pending_cats.update(cats)
+        self.pending_drops.update(drops)
+
+    # --- Connection ---
+    def _round_trip(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        # One frame each way on the open connection
+        frame = encode_frame(message)
+        self._sock.sendall(frame)
+        self.bytes_sent += len(frame)
+        try:
+            reply, size = read_frame(self._rfile)
+        except (ValueError, zlib.error) as e:
+            raise SyncError(f"geçersiz yanıt: {e}")
+        if reply is None:
+            raise ConnectionError("sunucu bağlantıyı kapattı")
+        self.bytes_received += size
+        return reply
+
+    def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(2):
+            fresh = self._sock is None
+            if fresh:
+                self._connect()
+            try:
+                reply = self._round_trip(message)
+                break
+            except (OSError, SyncError):
+                self.close()
+                if fresh or attempt:
+                    raise
+                # A kept connection the server has dropped (restarted): once
+                # more on a new one; a repeated sync changes nothing on the server
+        if not reply.get("ok"):
+            raise SyncError(reply.get("error", "bilinmeyen hata"))
+        return reply
+
+    def _connect(self):
+        host, port = parse_address(self.address)
+        sock = socket.create_connection((host, port), timeout=self.timeout)
+        self._sock, self._rfile = sock, sock.makefile("rb")
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            reply = self._round_trip({"cmd": "hello", "token": self.token})
+            if not reply.get("ok"):
+                raise SyncError(reply.get("error", "bilinmeyen hata"))
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._rfile.close()
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = self._rfile = None
+
+    # --- Sync ---
+    def _all_changed(self):
+        # First sync with this server: offer the whole library
+        for cat_index, cat in enumerate(self.store.list_categories()):
+            self.pending_cats.add(cat["name"])
+            self.pending.update(tpl["id"] for tpl in self.store.list_templates(cat_index))
+
+    def _outgoing(self) -> Dict[str, Any]:
+        put, deleted = [], []
+        for tid in sorted(self.pending):
+            tpl = self.store.get_template_by_id(tid)
+            cat = self.store.get_category_of(tid) if tpl is not None else None
+            if tpl is None or cat is None:
+                deleted.append(tid)
+            else:
+                put.append({"id": tid, "cat": cat["name"], "title": tpl.get("title", ""), "text": tpl.get("text", "")})
+        return {"put": put, "del": deleted, "cats": sorted(self.pending_cats), "drop": sorted(self.pending_drops)}
+
+    def begin(self) -> Dict[str, Any]:
+        # First step of a round, on the thread that edits the store: the
+        # request to send (changes made here since the last round)
+        self._take_local()
+        if self.library is None:
+            self._all_changed()
+        return dict(self._outgoing(), cmd="sync", library=self.library, since=self.revision)
+
+    def exchange(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # The network step; may run on a worker thread (it does not touch the
+        # store). OSError / SyncError on failure, with everything kept for next time
+        try:
+            return self._request(request)
+        except (OSError, SyncError) as e:
+            self.last_error = str(e)
+            raise
+
+    def finish(self, reply: Dict[str, Any]) -> Optional[MergeResult]:
+        # Last step, back on the store's thread: the changes received are
+        # applied. None if the server has another library; the next round
+        # offers ours again, from scratch
+        if reply.get("reset"):
+            self.library, self.revision = None, 0
+            return None
+        self.last_error = None
+        result = self._apply(reply)
+        self.library = reply["library"]
+        self.revision = int(reply["revision"])
+        self.syncs += 1
+        self.save_state()
+        return result
+
+    @profiled("sync.client")
+    def sync(self) -> MergeResult:
+        # A whole round on the calling thread
+        for attempt in range(2):
+            result = self.finish(self.exchange(self.begin()))
+            if result is not None:
+                return result
+        raise SyncError("sunucu kütüphaneyi yeniden istedi")
+
+    def _apply(self, reply: Dict[str, Any]) -> MergeResult:
+        store = self.store
+        result = MergeResult()
+        # Edited here while the request was out: not sent yet
+        late_ids, late_cats, late_drops = store.take_sync_changes()
+        # Conflict versions kept here, to send next time; ids received
+        keep: Set[str] = set()
+        seen: Set[str] = set()
+        cats: Dict[str, int] = {}
+
+        def index_categories():
+            cats.clear()
+            for i, cat in enumerate(store.list_categories()):
+                cats.setdefault(cat["name"], i)
+
+        def category(name: str) -> int:
+            if name not in cats:
+                store.add_category(name)
+                cats[name] = len(store.list_categories()) - 1
+                result.structure = True
+            return cats[name]
+
+        def put(item: Dict[str, str], pos: Optional[Tuple[int, int]]):
+            tid, name = item["id"], item["cat"]
+            fields = {"id": tid, "title": item["title"], "text": item["text"]}
+            moved = pos is not None and store.list_categories()[pos[0]]["name"] != name
+            if moved:
+                result.categories.add(store.list_categories()[pos[0]]["name"])
+                store.delete_template(*pos)
+            if pos is None or moved:
+                cat_index = category(name)
+                store.insert_template(cat_index, _append_at(store, cat_index), fields)
+                result.categories.add(name)
+                (result.changed if moved or tid in seen else result.added).append(tid)
+                return
+            tpl = store.get_template_by_id(tid)
+            if (tpl.get("title", ""), tpl.get("text", "")) != (item["title"], item["text"]):
+                store.edit_template(*pos, item["title"], item["text"])
+                result.categories.add(name)
+                result.changed.append(tid)
+
+        index_categories()
+        for conflict in reply.get("conflicts", []):
+            tid, theirs = conflict["id"], conflict.get("theirs")
+            pos = store.find_template(tid)
+            tpl = store.get_template_by_id(tid) if pos is not None else None
+            if theirs is None:
+                if tpl is not None:
+                    # Deleted on the server, changed here: ours goes back up
+                    keep.add(tid)
+                    result.conflicts.append((tpl.get("title", ""), "sunucuda silinmişti, burada değiştirilmişti; saklandı"))
+                continue
+            if tpl is None:
+                put(theirs, None)
+                result.conflicts.append((theirs["title"], "burada silinmişti, sunucuda değiştirildi; geri getirildi"))
+                continue
+            # Taken out before the template is overwritten in place
+            ours = (tpl.get("title", ""), tpl.get("text", ""))
+            title = ours[0] + CONFLICT_SUFFIX
+            copy_id = store.add_template(pos[0], title, ours[1])
+            keep.add(copy_id)
+            result.added.append(copy_id)
+            seen.add(tid)
+            put(theirs, store.find_template(tid))
+            result.conflicts.append((ours[0], f"burada ve sunucuda değiştirildi; sizinki '{title}' olarak eklendi"))
+
+        for item in reply.get("put", []):
+            put(item, store.find_template(item["id"]))
+            seen.add(item["id"])
+        gone = list(reply.get("del", []))
+        if reply.get("full"):
+            # Whatever the server does not have (except what we keep) goes
+            known = seen | keep | {c["id"] for c in reply.get("conflicts", [])}
+            for cat_index in range(len(store.list_categories())):
+                gone.extend(tpl["id"] for tpl in store.list_templates(cat_index) if tpl["id"] not in known)
+        for tid in gone:
+            pos = store.find_template(tid)
+            if pos is not None:
+                result.categories.add(store.list_categories()[pos[0]]["name"])
+                store.delete_template(*pos)
+                result.removed.append(tid)
+        for name in reply.get("cats", []):
+            category(name)
+        for name in reply.get("drop", []):
+            if name in cats and _append_at(store, cats[name]) == 0:
+                store.delete_category(cats[name])
+                result.structure = True
+                index_categories()
+
+        # The store noted what was just applied as local changes; only the
+        # kept conflict versions and the late edits go back up
+        store.take_sync_changes()
+        self.pending = keep | set(late_ids)
+        self.pending_cats = set(late_cats)
+        self.pending_drops = set(late_drops)
+        return result
+
+    def summary(self) -> str:
+        state = f"hata: {self.last_error}" if self.last_error else "bağlı" if self._sock is not None else "bağlı değil"
+        return (f"{self.address} ({state}), sürüm {self.revision}, {self.syncs} eşitleme, "
+                f"gönderilen {self.bytes_sent / 1024:.1f} KB, alınan {self.bytes_received / 1024:.1f} KB, "
+                f"bekleyen {len(self.pending)} şablon")
+
+def client_from_settings(settings: Dict[str, Any], store, state_path: str) -> Optional[SyncClient]:
+    # None unless settings.json has "sync_server" ("host:port")
+    address = settings.get("sync_server")
+    if not address:
+        return None
+    return SyncClient(store, str(address), str(settings.get("sync_token", "")), state_path,
+                      timeout=max(0.1, int(settings.get("sync_timeout_ms", 2000)) / 1000.0))
+
+def main(argv: List[str]) -> int:
+    from store import SettingsStore, open_template_store, ensure_default_files, resource_path, SETTINGS_FILE
+
+    parser = argparse.ArgumentParser(description="Şablon eşitleme sunucusu ve istemcisi")
+    parser.add_argument("--serve", action="store_true", help="sunucuyu çalıştır")
+    parser.add_argument("--host", default="127.0.0.1", help="sunucu adresi (--serve; ağ için 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=SYNC_PORT, help=f"sunucu portu (varsayılan {SYNC_PORT})")
+    parser.add_argument("--data", default=None, help=f"sunucu dosyası (varsayılan {SERVER_FILE})")
+    parser.add_argument("--token", default=None, help="erişim anahtarı (varsayılan settings.json \"sync_token\")")
+    args = parser.parse_args(argv)
+
+    ensure_default_files()
+    settings = SettingsStore(SETTINGS_FILE)
+    token = args.token if args.token is not None else str(settings.settings.get("sync_token", ""))
+    if args.serve:
+        if not token:
+            token = secrets.token_hex(16)
+            print(f"Erişim anahtarı (istemcilerde \"sync_token\"): {token}")
+        server = SyncServer(args.data or resource_path(SERVER_FILE), token)
+        port = server.serve(args.host, args.port)
+        print(f"Eşitleme sunucusu çalışıyor ({args.host}:{port}, sürüm {server.revision}). Durdurmak için Ctrl+C.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+        return 0
+
+    store = open_template_store(settings)
+    client = client_from_settings(settings.settings, store, resource_path(STATE_FILE))
+    if client is None:
+        print("settings.json içinde \"sync_server\" (ör. \"127.0.0.1:47814\") tanımlı değil.")
+        return 1
+    if args.token is not None:
+        client.token = args.token
+    try:
+        result = client.sync()
+    except (OSError, SyncError) as e:
+        print("Eşitleme başarısız:", e)
+        client.save_state()
+        store.flush()
+        return 1
+    finally:
+        client.close()
+    store.compact()
+    print(result.summary())
+    print(client.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import storage
+from bulk import import_file, export_file, main
+from store import TemplateStore, DATA_DIR_ENV
+
+def make_store(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({"categories": [{"name": "Genel", "templates": []}]}), encoding="utf-8")
+    return TemplateStore(str(path))
+
+def contents(store):
+    return sorted((cat["name"], tpl["id"], tpl["title"], tpl["text"])
+                  for i, cat in enumerate(store.list_categories()) for tpl in store.list_templates(i))
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_import_round_trip(tmp_path, fmt):
+    source = make_store(tmp_path)
+    source.add_category("Kargo")
+    source.add_template(0, "Selam", "Merhaba,\n\"nasıl\" yardımcı olabilirim?")
+    source.add_template(1, "Yolda", "Kargonuz yolda; 2 gün içinde elinizde.")
+    out = tmp_path / f"yedek.{fmt}"
+    assert export_file(source, str(out)) == 2
+
+    (tmp_path / "bos").mkdir()
+    target = make_store(tmp_path / "bos")
+    report = import_file(target, str(out))
+    assert (report.rows, report.added, report.save_error) == (2, 2, None)
+    assert contents(target) == contents(source)
+
+    # A second import adds nothing
+    again = import_file(target, str(out))
+    assert (again.added, again.duplicate_ids) == (0, 2)
+
+def test_turkish_csv_duplicates_and_bad_rows(tmp_path):
+    store = make_store(tmp_path)
+    store.add_template(0, "Var olan", "Zaten kayıtlı")
+    src = tmp_path / "excel.csv"
+    src.write_text("Başlık;Metin;Kategori\n"
+                   "İade;İadeniz yapıldı;Destek\n"
+                   "Kopya;Zaten kayıtlı;\n"
+                   ";Başlıksız;\n"
+                   "Fazla;a;b;c\n"
+                   "Yeni;Yeni metin;\n", encoding="utf-8")
+    report = import_file(store, str(src), dry_run=True)
+    assert (report.added, report.duplicate_texts, report.invalid) == (2, 1, 2)
+    assert len(contents(store)) == 1
+
+    report = import_file(store, str(src))
+    assert [line for line, _ in report.errors] == [4, 5]
+    assert ("Destek", "İade", "İadeniz yapıldı") in [(c, t, x) for c, _, t, x in contents(store)]
+    assert ("İçe aktarılanlar", "Yeni", "Yeni metin") in [(c, t, x) for c, _, t, x in contents(store)]
+
+def test_failed_save_is_reported(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    src = tmp_path / "yeni.jsonl"
+    src.write_text(json.dumps({"title": "Merhaba", "text": "Selam"}) + "\n", encoding="utf-8")
+
+    def refuse(batch):
+        raise OSError("disk dolu")
+    monkeypatch.setattr(store.backend, "write", refuse)
+    report = import_file(store, str(src))
+    assert report.added == 1
+    assert report.save_error == "disk dolu"
+    assert "diske yazılamadı" in report.summary()
+
+def test_cli_exits_non_zero_when_save_fails(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path))
+    src = tmp_path / "yeni.csv"
+    src.write_text("title,text\nMerhaba,Selam\n", encoding="utf-8")
+
+    def refuse(self, batch):
+        raise OSError("disk dolu")
+    monkeypatch.setattr(storage.JsonBackend, "write", refuse)
+    assert main(["import", str(src)]) == 1
+    assert "diske yazılamadı: disk dolu" in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import json, time, socket
+
+import pytest
+
+import daemon
+from daemon import HotkeyDaemon, send_command, TOKEN_FILE
+from paste import PasteEngine, NullKeyboard, MemoryClipboard
+from store import SettingsStore, TemplateStore, DATA_DIR_ENV
+
+TOKEN = "test-token"
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+@pytest.fixture
+def running(tmp_path, monkeypatch):
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path))
+    write_json(tmp_path / "templates.json", {"categories": [{"name": "Genel", "templates": [
+        {"id": "t1", "title": "Selam", "text": "Merhaba"},
+        {"id": "t2", "title": "Kargo", "text": "Sayın {musteri_adi}, siparişiniz yolda."},
+    ]}]})
+    write_json(tmp_path / "settings.json", {"hotkeys": {"ctrl+shift+t": "t1", "ctrl+shift+k": "t2"}})
+    (tmp_path / TOKEN_FILE).write_text(TOKEN, encoding="utf-8")
+    keyboard, clipboard = NullKeyboard(), MemoryClipboard()
+    engine = PasteEngine(clipboard, keyboard, settle=0.0, adaptive=False, min_interval=0.0, target_of=lambda: "")
+    d = HotkeyDaemon(SettingsStore("settings.json"), TemplateStore(str(tmp_path / "templates.json")),
+                     keyboard, clipboard, engine)
+    d.start()
+    d.register_hotkeys()
+    port = d.serve(0, TOKEN)
+    yield d, port, keyboard, clipboard, tmp_path
+    d.stop()
+
+def raw_command(port, request):
+    # send_command() always sends the stored token; this one sends whatever it is given
+    with socket.create_connection((daemon.DAEMON_HOST, port), timeout=2) as sock:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+def test_trigger_pastes_through_fake_layer(running):
+    d, port, keyboard, clipboard, _ = running
+    assert send_command("ping", port)["ok"]
+    assert send_command("trigger", port, combo="Shift+Ctrl+T") == {"ok": True}
+    assert wait_for(lambda: keyboard.sent == ["ctrl+v"])
+    assert clipboard.text == "Merhaba"
+    assert wait_for(lambda: send_command("status", port)["pastes"] == 1)
+
+def test_hook_callback_pastes(running):
+    d, port, keyboard, clipboard, _ = running
+    keyboard.hotkeys["ctrl+shift+t"]()
+    assert wait_for(lambda: keyboard.sent == ["ctrl+v"])
+    assert clipboard.text == "Merhaba"
+
+def test_values_fill_variables(running):
+    d, port, keyboard, clipboard, _ = running
+    reply = send_command("trigger", port, combo="ctrl+shift+k", values={"musteri_adi": "Ayşe"})
+    assert reply == {"ok": True}
+    assert wait_for(lambda: keyboard.sent == ["ctrl+v"])
+    assert clipboard.text == "Sayın Ayşe, siparişiniz yolda."
+
+def test_unknown_combo_is_refused(running):
+    d, port, keyboard, _, _ = running
+    assert send_command("trigger", port, combo="ctrl+alt+q") == {"ok": False}
+    time.sleep(0.05)
+    assert keyboard.sent == []
+
+def test_reload_picks_up_files(running):
+    d, port, keyboard, clipboard, tmp_path = running
+    write_json(tmp_path / "templates.json", {"categories": [{"name": "Genel", "templates": [
+        {"id": "t1", "title": "Selam", "text": "İyi günler"}]}]})
+    write_json(tmp_path / "settings.json", {"hotkeys": {"ctrl+alt+y": "t1"}})
+    assert send_command("reload", port) == {"ok": True}
+    assert set(keyboard.hotkeys) == {"ctrl+alt+y"}
+    assert send_command("trigger", port, combo="ctrl+alt+y") == {"ok": True}
+    assert wait_for(lambda: keyboard.sent == ["ctrl+v"])
+    assert clipboard.text == "İyi günler"
+    assert send_command("status", port)["reloads"] == 1
+
+@pytest.mark.parametrize("cmd", ["trigger", "reload", "status", "stop"])
+def test_wrong_token_is_refused(running, cmd):
+    d, port, keyboard, _, _ = running
+    for token in ("yanlis", None):
+        request = {"cmd": cmd, "combo": "ctrl+shift+t", "values": {"musteri_adi": "x"}}
+        if token is not None:
+            request["token"] = token
+        assert raw_command(port, request) == {"ok": False, "error": "yetkisiz"}
+    time.sleep(0.05)
+    assert keyboard.sent == []
+    assert d.reloads == 0
+    assert d.placeholders.last_values == {}
+    assert send_command("ping", port)["ok"]
+
+def test_no_token_file_means_no_daemon(running):
+    d, port, _, _, tmp_path = running
+    (tmp_path / TOKEN_FILE).unlink()
+    assert send_command("ping", port) is None
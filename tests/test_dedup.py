@@ -0,0 +1,79 @@
+import json, random
+
+import dedup
+from dedup import DuplicateIndex
+from store import TemplateStore
+
+WORDS = ("sipariş kargo iade ödeme fatura teslimat adres müşteri ürün indirim kampanya "
+         "hafta gün saat teşekkür ederiz bilgi destek hesap şifre").split()
+
+def long_text(seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(60))
+
+def make_store(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({"categories": [{"name": "Genel", "templates": [
+        {"id": "t1", "title": "Kargo", "text": long_text(1)},
+        {"id": "t2", "title": "Kargo kopya", "text": "  " + long_text(1).replace(" ", "\n", 3)},
+        {"id": "t3", "title": "Kargo benzer", "text": long_text(1) + " teşekkürler"},
+        {"id": "t4", "title": "Başka", "text": long_text(2)},
+        {"id": "t5", "title": "Boş", "text": ""},
+        {"id": "t6", "title": "Boş 2", "text": "   "},
+    ]}]}, ensure_ascii=False), encoding="utf-8")
+    return TemplateStore(str(path))
+
+def ids(templates):
+    return sorted(tpl["id"] for tpl in templates)
+
+def test_exact_and_near_duplicates(tmp_path):
+    store = make_store(tmp_path)
+    exact, near = store.find_duplicates(long_text(1), exclude_id="t1")
+    assert ids(exact) == ["t2"]
+    assert [tpl["id"] for tpl, _ in near] == ["t3"]
+    assert near[0][1] >= dedup.NEAR_THRESHOLD
+    assert store.find_duplicates("") == ([], [])
+
+def test_index_follows_edits(tmp_path):
+    store = make_store(tmp_path)
+    assert ids(store.find_duplicates(long_text(1))[0]) == ["t1", "t2"]
+    store.edit_template(0, 1, "Kargo kopya", long_text(3))
+    store.delete_template(0, 0)
+    assert store.find_duplicates(long_text(1))[0] == []
+    tid = store.add_template(0, "Yeni", long_text(2))
+    assert ids(store.find_duplicates(long_text(2))[0]) == sorted(["t4", tid])
+
+def test_duplicate_groups(tmp_path):
+    store = make_store(tmp_path)
+    exact, near = store.duplicate_groups()
+    assert [ids(group) for group in exact] == [["t1", "t2"]]
+    assert [sorted(tpl["id"] for tpl, _ in group) for group in near] == [["t1", "t3"]]
+    report = dedup.format_report(store, exact, near)
+    assert "Birebir aynı metin: 1 grup, 1 fazla şablon" in report
+
+def test_edits_match_a_fresh_build(monkeypatch):
+    # Enough edits to merge the pending ones into the sorted tables a few times
+    monkeypatch.setattr(dedup, "MERGE_MIN", 16)
+    rng = random.Random(7)
+    texts = {i: long_text(i % 40) for i in range(200)}
+    index = DuplicateIndex()
+    index.build((tid, {"text": text}) for tid, text in texts.items())
+    for step in range(300):
+        tid = rng.randrange(260)
+        if tid in texts and rng.random() < 0.4:
+            del texts[tid]
+            index.remove(tid)
+        else:
+            texts[tid] = long_text(rng.randrange(60))
+            index.update(tid, texts[tid])
+    fresh = DuplicateIndex()
+    fresh.build((tid, {"text": text}) for tid, text in texts.items())
+    for seed in range(60):
+        text = long_text(seed)
+        assert sorted(index.exact(text)) == sorted(fresh.exact(text))
+        assert sorted(index.similar(text, 0.5, 500)) == sorted(fresh.similar(text, 0.5, 500))
+    exact, near = index.groups()
+    fresh_exact, fresh_near = fresh.groups()
+    assert sorted(map(sorted, exact)) == sorted(map(sorted, fresh_exact))
+    assert sorted(sorted(tid for tid, _ in group) for group in near) == \
+        sorted(sorted(tid for tid, _ in group) for group in fresh_near)
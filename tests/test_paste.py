@@ -0,0 +1,149 @@
+import sys
+
+import pytest
+
+from paste import PasteEngine, ManualScheduler, MemoryClipboard
+
+class FakeKeyboard:
+    # Records each key press with the fake clock's time
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send(self, combo):
+        self.sent.append((combo, self.clock()))
+
+class FailingClipboard(MemoryClipboard):
+    def set_text(self, text):
+        raise OSError("pano kilitli")
+
+@pytest.fixture
+def fake():
+    sched = ManualScheduler()
+    clipboard = MemoryClipboard()
+    keyboard = FakeKeyboard(sched.clock)
+    return sched, clipboard, keyboard
+
+def make_engine(fake, **kwargs):
+    sched, clipboard, keyboard = fake
+    options = dict(schedule=sched, clock=sched.clock, target_of=lambda: "pencere",
+                   settle=0.05, adaptive=False, restore=False, restore_delay=0.3, min_interval=0.1)
+    options.update(kwargs)
+    return PasteEngine(clipboard, keyboard, **options)
+
+def test_paste_waits_for_settle(fake):
+    sched, clipboard, keyboard = fake
+    engine = make_engine(fake)
+    done = []
+    engine.submit("Merhaba", on_done=lambda: done.append(sched.now))
+    assert clipboard.text == "Merhaba"
+    assert keyboard.sent == []
+    sched.advance(0.04)
+    assert keyboard.sent == []
+    sched.advance(0.02)
+    assert keyboard.sent == [("ctrl+v", pytest.approx(0.05))]
+    assert done == [pytest.approx(0.05)]
+    assert engine.pasted == 1
+    assert not engine._active
+
+def test_clipboard_restored_after_paste(fake):
+    sched, clipboard, keyboard = fake
+    clipboard.text = "önceki"
+    engine = make_engine(fake, restore=True)
+    engine.submit("şablon")
+    sched.advance(0.05)
+    assert clipboard.text == "şablon"
+    sched.advance(0.29)
+    assert clipboard.text == "şablon"
+    sched.advance(0.02)
+    assert clipboard.text == "önceki"
+    assert engine.restored == 1
+    assert not engine._active
+
+def test_restore_skipped_when_user_copied_meanwhile(fake):
+    sched, clipboard, keyboard = fake
+    clipboard.text = "önceki"
+    engine = make_engine(fake, restore=True)
+    engine.submit("şablon")
+    sched.advance(0.1)
+    clipboard.text = "kullanıcının kopyaladığı"
+    sched.advance(1.0)
+    assert clipboard.text == "kullanıcının kopyaladığı"
+    assert engine.restored == 0
+
+def test_back_to_back_pastes_restore_once(fake):
+    sched, clipboard, keyboard = fake
+    clipboard.text = "önceki"
+    engine = make_engine(fake, restore=True, min_interval=0.0)
+    engine.submit("bir")
+    sched.advance(0.1)
+    # Arrives while the restore is waiting; the restore moves after it
+    engine.submit("iki")
+    sched.advance(0.26)
+    assert clipboard.text == "iki"
+    sched.advance(0.05)
+    assert [c for c, _ in keyboard.sent] == ["ctrl+v", "ctrl+v"]
+    sched.advance(0.28)
+    assert clipboard.text == "iki"
+    sched.advance(0.02)
+    assert clipboard.text == "önceki"
+    assert engine.restored == 1
+    assert not engine._active
+
+def test_rate_limit_per_target(fake):
+    sched, clipboard, keyboard = fake
+    targets = iter(["a", "a", "b"])
+    engine = make_engine(fake, settle=0.0, min_interval=0.1, target_of=lambda: next(targets))
+    for text in ("1", "2", "3"):
+        engine.submit(text)
+    sched.advance(1.0)
+    times = [t for _, t in keyboard.sent]
+    assert times == [pytest.approx(0.0), pytest.approx(0.1), pytest.approx(0.1)]
+    assert clipboard.text == "3"
+
+def test_rate_limit_spaces_later_pastes(fake):
+    sched, clipboard, keyboard = fake
+    engine = make_engine(fake, settle=0.0, min_interval=0.1)
+    engine.submit("1")
+    sched.advance(0.03)
+    engine.submit("2")
+    sched.advance(0.05)
+    assert len(keyboard.sent) == 1
+    sched.advance(0.05)
+    assert [t for _, t in keyboard.sent] == [pytest.approx(0.0), pytest.approx(0.1)]
+
+def test_long_copy_only_queue(fake):
+    sched, clipboard, keyboard = fake
+    engine = make_engine(fake)
+    done = []
+    # Copy-only jobs queue up behind a paste and then all finish at once
+    engine.submit("yapıştır", on_done=lambda: done.append("yapıştır"))
+    count = sys.getrecursionlimit() * 2
+    for i in range(count):
+        engine.submit(str(i), paste=False, on_done=lambda i=i: done.append(i))
+    assert len(done) == 0
+    sched.advance(0.05)
+    assert done == ["yapıştır"] + list(range(count))
+    assert engine.copied == count
+    assert clipboard.text == str(count - 1)
+    assert len(keyboard.sent) == 1
+    assert not engine._active
+
+def test_failed_clipboard_moves_on(fake):
+    sched, _, keyboard = fake
+    engine = PasteEngine(FailingClipboard(), keyboard, schedule=sched, clock=sched.clock, target_of=lambda: "")
+    done = []
+    for text in ("1", "2"):
+        engine.submit(text, on_done=lambda: done.append(text))
+    sched.advance(1.0)
+    assert len(done) == 2
+    assert keyboard.sent == []
+    assert not engine._active
+
+def test_on_done_may_submit(fake):
+    sched, clipboard, keyboard = fake
+    engine = make_engine(fake, settle=0.0, min_interval=0.0)
+    engine.submit("bir", paste=False, on_done=lambda: engine.submit("iki", paste=False))
+    assert clipboard.text == "iki"
+    assert engine.copied == 2
+    assert not engine._active
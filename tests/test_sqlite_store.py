@@ -0,0 +1,45 @@
+import pytest
+
+from sqlite_store import SqliteTemplateStore, fts5_available
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def store(tmp_path, request):
+    if request.param and not fts5_available():
+        pytest.skip("SQLite built without FTS5")
+    db = SqliteTemplateStore(str(tmp_path / "templates.db"))
+    db.has_fts = request.param
+    db.add_category("Genel")
+    db.add_template(0, "Işık arızası", "Sokak lambası yanmıyor.")
+    db.add_template(0, "İade", "İadeniz 3 gün içinde yapılır.")
+    yield db
+    db.close()
+
+def titles(rows):
+    return sorted(row["title"] for row in rows)
+
+def test_search_folds_turkish_letters(store):
+    assert titles(store.search("ışık")) == ["Işık arızası"]
+    assert titles(store.search("ISIK")) == ["Işık arızası"]
+    assert titles(store.search("iade")) == ["İade"]
+    assert titles(store.search("lamba sokak")) == ["Işık arızası"]
+
+def test_search_follows_edits_and_deletes(store):
+    store.edit_template(0, 0, "Elektrik", "Sigorta attı.")
+    assert store.search("ışık") == []
+    assert titles(store.search("sigorta")) == ["Elektrik"]
+    store.delete_template(0, 0)
+    assert store.search("sigorta") == []
+
+def test_like_fallback_escapes_wildcards(tmp_path):
+    db = SqliteTemplateStore(str(tmp_path / "templates.db"))
+    db.has_fts = False
+    db.add_category("Genel")
+    db.add_template(0, "İndirim", "%50_indirim kodu")
+    db.add_template(0, "Kampanya", "50 indirim")
+    assert titles(db.search("%50_")) == ["İndirim"]
+    db.close()
+
+def test_list_titles_leaves_out_text(store):
+    rows = store.list_titles(0)
+    assert [row["title"] for row in rows] == [tpl["title"] for tpl in store.list_templates(0)]
+    assert all("text" not in row for row in rows)
@@ -0,0 +1,103 @@
+import json
+
+import storage
+from storage import JournalBackend, JsonBackend, read_document_cached, CACHE_SUFFIX
+from store import TemplateStore
+
+def library():
+    return {"categories": [
+        {"name": "Genel", "templates": [{"id": "t1", "title": "Merhaba", "text": "Merhaba, nasıl yardımcı olabilirim?"}]},
+    ]}
+
+def write_library(tmp_path, data=None):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps(data or library(), ensure_ascii=False), encoding="utf-8")
+    return path
+
+def contents(store):
+    return sorted((cat["name"], tpl["id"], tpl["title"], tpl["text"])
+                  for i, cat in enumerate(store.list_categories()) for tpl in store.list_templates(i))
+
+def journal_store(path, **options):
+    return TemplateStore(str(path), backend=JournalBackend(str(path), **options))
+
+def test_journal_replays_on_load(tmp_path):
+    path = write_library(tmp_path)
+    store = journal_store(path)
+    tid = store.add_template(0, "Kargo", "Kargonuz yolda.")
+    store.edit_template(0, 0, "Selam", "Selam!")
+    store.add_category("İade")
+    store.delete_template(0, 1)
+    store.flush()
+    # Only the journal grew; the snapshot is untouched
+    assert json.loads(path.read_text(encoding="utf-8")) == library()
+    assert store.backend.journal_size > 0
+
+    reopened = journal_store(path)
+    assert contents(reopened) == contents(store) == [("Genel", "t1", "Selam", "Selam!")]
+    assert [c["name"] for c in reopened.list_categories()] == ["Genel", "İade"]
+    assert reopened.get_template_by_id(tid) is None
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    path = write_library(tmp_path)
+    store = journal_store(path, compact_bytes=200)
+    for i in range(5):
+        store.add_template(0, f"Şablon {i}", "Metin " + "x" * 50)
+    store.flush()
+    assert store.backend.compactions >= 1
+    snapshot = json.loads(path.read_text(encoding="utf-8"))
+    assert snapshot[JournalBackend.SEQ_KEY] > 0
+
+    store.compact()
+    assert store.backend.journal_size == 0
+    assert (tmp_path / "templates.json.journal").read_text(encoding="utf-8") == ""
+    reopened = journal_store(path)
+    assert contents(reopened) == contents(store)
+    assert len(contents(reopened)) == 6
+
+def test_records_before_the_snapshot_are_not_replayed(tmp_path):
+    path = write_library(tmp_path)
+    store = journal_store(path)
+    store.add_template(0, "Kargo", "Kargonuz yolda.")
+    store.flush()
+    journal = (tmp_path / "templates.json.journal").read_text(encoding="utf-8")
+    store.compact()
+    # A crash between writing the snapshot and emptying the journal
+    (tmp_path / "templates.json.journal").write_text(journal, encoding="utf-8")
+    assert len(contents(journal_store(path))) == 2
+
+def test_failed_append_is_written_with_the_next_batch(tmp_path, monkeypatch):
+    path = write_library(tmp_path)
+    store = journal_store(path)
+
+    def refuse(batch):
+        raise OSError("disk dolu")
+    monkeypatch.setattr(store.backend, "write", refuse)
+    store.add_template(0, "Kargo", "Kargonuz yolda.")
+    monkeypatch.undo()
+    store.add_template(0, "İade", "İadeniz yapıldı.")
+    store.flush()
+    assert len(contents(journal_store(path))) == 3
+
+def test_snapshot_cache_serves_current_file(tmp_path, monkeypatch):
+    path = write_library(tmp_path)
+    store = TemplateStore(str(path), backend=JsonBackend(str(path), snapshot_cache=True))
+    store.add_template(0, "Kargo", "Kargonuz yolda.")
+    store.compact()
+    assert (tmp_path / ("templates.json" + CACHE_SUFFIX)).exists()
+
+    # A current cache answers without parsing the JSON
+    def no_json(raw):
+        raise AssertionError("JSON parsed despite a current cache")
+    monkeypatch.setattr(storage.json, "loads", no_json)
+    assert contents(TemplateStore(str(path), backend=JsonBackend(str(path), snapshot_cache=True))) == contents(store)
+
+def test_snapshot_cache_misses_after_outside_edit(tmp_path):
+    path = write_library(tmp_path)
+    assert read_document_cached(str(path)) == library()
+    # Same size, so only the mtime and digest tell the two apart
+    raw = path.read_text(encoding="utf-8")
+    changed = raw.replace('"Merhaba"', '"Selam"  ')
+    assert len(changed) == len(raw)
+    path.write_text(changed, encoding="utf-8")
+    assert read_document_cached(str(path))["categories"][0]["templates"][0]["title"] == "Selam"
@@ -0,0 +1,190 @@
+import io, json, socket, threading
+
+import pytest
+
+from store import TemplateStore
+from shared import CONFLICT_SUFFIX
+from sync import SyncServer, SyncClient, SyncError, encode_frame, read_frame, COMPRESS_FROM
+
+TOKEN = "gizli"
+
+def library():
+    return {"categories": [
+        {"name": "İptal", "templates": [{"id": "t1", "title": "İptal onayı", "text": "Siparişiniz iptal edildi."},
+                                        {"id": "t2", "title": "İade", "text": "İadeniz 3 gün içinde yapılır."}]},
+        {"name": "Kargo", "templates": [{"id": "t3", "title": "Yolda", "text": "Kargonuz yolda."}]},
+    ]}
+
+def contents(store):
+    return sorted((cat["name"], tpl["id"], tpl["title"], tpl["text"])
+                  for i, cat in enumerate(store.list_categories()) for tpl in store.list_templates(i))
+
+@pytest.fixture
+def server(tmp_path):
+    srv = SyncServer(str(tmp_path / "sync_server.json"), TOKEN, save_delay=0)
+    port = srv.serve("127.0.0.1", 0)
+    yield srv, f"127.0.0.1:{port}"
+    srv.stop()
+
+def make_client(tmp_path, name, address, data=None):
+    folder = tmp_path / name
+    folder.mkdir()
+    path = folder / "templates.json"
+    path.write_text(json.dumps(data or {"categories": []}, ensure_ascii=False), encoding="utf-8")
+    store = TemplateStore(str(path))
+    return store, SyncClient(store, address, TOKEN, str(folder / "sync_state.json"), timeout=2.0)
+
+@pytest.fixture
+def pair(tmp_path, server):
+    srv, address = server
+    a, ca = make_client(tmp_path, "a", address, library())
+    b, cb = make_client(tmp_path, "b", address)
+    ca.sync()
+    cb.sync()
+    yield a, ca, b, cb
+    ca.close()
+    cb.close()
+
+def round_trip(*clients):
+    # Two rounds: every client sends its changes, then picks up the others'
+    for _ in range(2):
+        for client in clients:
+            client.sync()
+
+def test_first_sync_copies_library(pair):
+    a, ca, b, cb = pair
+    assert contents(b) == contents(a)
+    assert len(contents(b)) == 3
+    assert ca.revision == cb.revision > 0
+
+def test_add_edit_delete(pair):
+    a, ca, b, cb = pair
+    a.add_template(1, "Teslim", "Kargonuz teslim edildi.")
+    b.edit_template(*b.find_template("t1"), "İptal onayı", "Siparişiniz iptal edildi, ücret iade edilecek.")
+    a.delete_template(*a.find_template("t2"))
+    round_trip(ca, cb)
+    assert contents(a) == contents(b)
+    titles = {tpl[2]: tpl[3] for tpl in contents(a)}
+    assert titles["Teslim"] == "Kargonuz teslim edildi."
+    assert titles["İptal onayı"].endswith("iade edilecek.")
+    assert "İade" not in titles
+
+def test_category_rename_and_delete(pair):
+    a, ca, b, cb = pair
+    a.rename_category(1, "Teslimat")
+    round_trip(ca, cb)
+    assert [c["name"] for c in b.list_categories()] == ["İptal", "Teslimat"]
+    assert b.get_category_of("t3")["name"] == "Teslimat"
+    b.delete_category(0)
+    round_trip(cb, ca)
+    assert [c["name"] for c in a.list_categories()] == ["Teslimat"]
+    assert contents(a) == contents(b)
+
+def test_conflict_keeps_both_versions(pair):
+    a, ca, b, cb = pair
+    a.edit_template(*a.find_template("t3"), "Yolda", "A: kargonuz yarın gelir.")
+    b.edit_template(*b.find_template("t3"), "Yolda", "B: kargonuz bugün çıktı.")
+    ca.sync()
+    result = cb.sync()
+    assert result.conflicts
+    round_trip(ca, cb)
+    assert contents(a) == contents(b)
+    # The server's version keeps the id, ours comes back as a copy
+    assert a.get_template_by_id("t3")["text"] == "A: kargonuz yarın gelir."
+    copies = [tpl for tpl in contents(a) if tpl[2] == "Yolda" + CONFLICT_SUFFIX]
+    assert [tpl[3] for tpl in copies] == ["B: kargonuz bugün çıktı."]
+
+def test_idle_sync_sends_little(pair):
+    a, ca, b, cb = pair
+    sent, received = cb.bytes_sent, cb.bytes_received
+    assert not cb.sync().changed
+    assert cb.bytes_sent - sent < 512
+    assert cb.bytes_received - received < 512
+
+def test_pending_changes_survive_a_down_server(tmp_path, server):
+    srv, address = server
+    a, ca = make_client(tmp_path, "a", address, library())
+    ca.sync()
+    ca.close()
+    srv.stop()
+    a.add_template(0, "Bekleyen", "sunucu kapalıyken eklendi")
+    with pytest.raises((OSError, SyncError)):
+        ca.sync()
+    ca.save_state()
+    # Same data folder, server back on another port
+    srv2 = SyncServer(srv.path, TOKEN, save_delay=0)
+    port = srv2.serve("127.0.0.1", 0)
+    try:
+        ca2 = SyncClient(a, f"127.0.0.1:{port}", TOKEN, str(tmp_path / "a" / "sync_state.json"), timeout=2.0)
+        ca2.sync()
+        b, cb = make_client(tmp_path, "b", f"127.0.0.1:{port}")
+        cb.sync()
+        assert contents(b) == contents(a)
+        assert "Bekleyen" in [tpl[2] for tpl in contents(b)]
+        ca2.close()
+        cb.close()
+    finally:
+        srv2.stop()
+
+def test_wrong_token_is_refused(tmp_path, server):
+    srv, address = server
+    store, client = make_client(tmp_path, "x", address, library())
+    client.token = "yanlis"
+    with pytest.raises(SyncError):
+        client.sync()
+    client.close()
+    assert srv.status()["templates"] == 0
+
+def test_frames_round_trip():
+    small = {"cmd": "sync", "since": 3}
+    big = {"put": [{"id": str(i), "text": "şablon metni " * 10} for i in range(50)]}
+    for message in (small, big):
+        frame = encode_frame(message)
+        assert read_frame(io.BytesIO(frame)) == (message, len(frame))
+    assert len(encode_frame(big)) < len(json.dumps(big).encode("utf-8"))
+    assert len(json.dumps(big)) > COMPRESS_FROM
+    assert read_frame(io.BytesIO(b"")) == (None, 0)
+
+def test_non_sync_peer_fails_once(tmp_path):
+    # Something else listening on the port (an HTTP server here): one
+    # connection, a SyncError, no reconnect loop
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    accepted = []
+
+    def answer():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+            conn.recv(4096)
+            conn.sendall(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            conn.close()
+    threading.Thread(target=answer, daemon=True).start()
+    store, client = make_client(tmp_path, "x", f"127.0.0.1:{listener.getsockname()[1]}", library())
+    try:
+        with pytest.raises(SyncError):
+            client.sync()
+        with pytest.raises(SyncError):
+            client.sync()
+    finally:
+        listener.close()
+    assert len(accepted) == 2
+    assert client.last_error
+
+def test_edit_during_exchange_is_sent_next_round(pair):
+    # The GUI runs exchange() on a worker thread; edits made meanwhile stay pending
+    a, ca, b, cb = pair
+    a.edit_template(*a.find_template("t1"), "İptal onayı", "ilk")
+    request = ca.begin()
+    a.edit_template(*a.find_template("t3"), "Yolda", "beklerken değişti")
+    result = ca.finish(ca.exchange(request))
+    assert result is not None
+    assert ca.pending == {"t3"}
+    round_trip(ca, cb)
+    assert b.get_template_by_id("t1")["text"] == "ilk"
+    assert b.get_template_by_id("t3")["text"] == "beklerken değişti"
+    assert contents(a) == contents(b)
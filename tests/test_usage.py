@@ -0,0 +1,61 @@
+import json
+
+from store import TemplateStore
+from usage import UsageStats, rank_templates
+
+DAY = 86400.0
+
+def make_usage(tmp_path):
+    return UsageStats(str(tmp_path / "usage.json"), save_delay=0, half_life_days=7)
+
+def make_store(tmp_path, count):
+    path = tmp_path / "templates.json"
+    templates = [{"id": f"t{i}", "title": f"Kargo {i}", "text": "Kargonuz yolda."} for i in range(count)]
+    path.write_text(json.dumps({"categories": [{"name": "Kargo", "templates": templates}]}), encoding="utf-8")
+    return TemplateStore(str(path))
+
+def test_recent_uses_outrank_old_ones(tmp_path):
+    usage = make_usage(tmp_path)
+    now = 100 * DAY
+    for _ in range(20):
+        usage.record("eski", now=now - 60 * DAY)
+    for day in range(3):
+        usage.record("yeni", now=now - day * DAY)
+    usage.record("bir kez", now=now - 30 * DAY)
+    assert usage.top(3) == ["yeni", "eski", "bir kez"]
+
+    # The ranks survive a restart
+    usage.flush()
+    assert make_usage(tmp_path).top(3) == ["yeni", "eski", "bir kez"]
+
+def test_half_life_halves_the_score(tmp_path):
+    usage = make_usage(tmp_path)
+    usage.record("a", now=0)
+    usage.record("a", now=0)
+    usage.record("b", now=7 * DAY)
+    # Two uses a half-life ago are worth one use now
+    assert abs(usage.rank("a") - usage.rank("b")) < 1e-9
+
+def test_frecent_search_result_past_limit_moves_up(tmp_path):
+    store = make_store(tmp_path, 20)
+    usage = make_usage(tmp_path)
+    usage.record("t12")
+    rows = rank_templates(store, usage, "kargo", limit=5)
+    assert len(rows) == 5
+    assert rows[0]["id"] == "t12"
+
+def test_empty_query_lists_frecent_first(tmp_path):
+    store = make_store(tmp_path, 5)
+    usage = make_usage(tmp_path)
+    usage.record("t3", now=10.0)
+    usage.record("t1", now=20.0)
+    usage.record("silinmiş", now=30.0)
+    assert [tpl["id"] for tpl in rank_templates(store, usage, limit=4)] == ["t1", "t3", "t0", "t2"]
+
+def test_forget_drops_a_template(tmp_path):
+    usage = make_usage(tmp_path)
+    usage.record("a")
+    usage.forget("a")
+    usage.flush()
+    assert usage.top(5) == []
+    assert make_usage(tmp_path).top(5) == []
@@ -0,0 +1,114 @@
+import json, math, time, heapq, threading
+from typing import Optional, Dict, Any, List
+
+from storage import WriteBehind, write_text_atomic
+from profiling import PROFILER
+
+# Template usage for the quick palette (app.py PaletteWindow), ranked by
+# frecency: each use adds 1 to a template's score and scores halve every
+# `half_life` days, so a template used every day this week outranks one used
+# fifty times last year.
+#
+# Instead of decaying every score on each use, a template keeps one number,
+#   rank = log2(score at time t) + t / half_life
+# which stays comparable between templates without knowing the current time
+# (the decay term is the same for all of them). Ranking is a heap over a small
+# dict. Uses are counted in memory and written to usage.json in batches.
+
+USAGE_FILE = "usage.json"
+# Entries kept in usage.json; the lowest ranked are forgotten first
+MAX_ENTRIES = 5000
+# Search results ranked per palette row shown
+SEARCH_DEPTH = 4
+
+class UsageStats:
+    def __init__(self, path: str, save_delay: float = 30.0, half_life_days: float = 7.0):
+        self.path = path
+        self.half_life = max(0.01, half_life_days) * 86400.0
+        # template id -> rank (see above)
+        self._ranks: Dict[str, float] = {}
+        self.uses = 0
+        self._lock = threading.Lock()
+        self._saver = WriteBehind(self._write, save_delay, label="Usage save")
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            ranks = data.get("ranks", {})
+            self._ranks = {str(k): float(v) for k, v in ranks.items()}
+        except FileNotFoundError:
+            self._ranks = {}
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print("Usage load error:", e)
+            self._ranks = {}
+
+    def record(self, template_id: str, now: Optional[float] = None):
+        # One use; written with the next batch
+        now = time.time() if now is None else now
+        with self._lock:
+            rank = self._ranks.get(template_id)
+            score = 2.0 ** (rank - now / self.half_life) if rank is not None else 0.0
+            self._ranks[template_id] = math.log2(score + 1.0) + now / self.half_life
+            self.uses += 1
+        PROFILER.count("usage.recorded")
+        self._saver.request()
+
+    def forget(self, template_id: str):
+        # The template was deleted
+        with self._lock:
+            if self._ranks.pop(template_id, None) is None:
+                return
+        self._saver.request()
+
+    def rank(self, template_id: str) -> float:
+        # Sort key, higher first; -inf for templates never used
+        return self._ranks.get(template_id, -math.inf)
+
+    def top(self, n: int) -> List[str]:
+        with self._lock:
+            return heapq.nlargest(n, self._ranks, key=self._ranks.__getitem__)
+
+    def flush(self):
+        self._saver.flush()
+
+    def _write(self):
+        with self._lock:
+            ranks = self._ranks
+            if len(ranks) > MAX_ENTRIES:
+                ranks = self._ranks = dict(heapq.nlargest(MAX_ENTRIES, ranks.items(), key=lambda kv: kv[1]))
+            payload = json.dumps({"version": 1, "half_life_days": self.half_life / 86400.0,
+                                  "ranks": ranks}, ensure_ascii=False)
+        write_text_atomic(self.path, payload)
+
+def usage_from_settings(settings: Dict[str, Any], path: str) -> UsageStats:
+    return UsageStats(path, save_delay=max(0, int(settings.get("usage_save_delay_ms", 30000))) / 1000.0,
+                      half_life_days=float(settings.get("frecency_half_life_days", 7)))
+
+def rank_templates(store, usage: UsageStats, query: str = "", limit: int = 50) -> List[Dict[str, Any]]:
+    # Palette rows: without a query the most frecent templates, then the rest
+    # of the library in order; with one, the search results with the
+    # frecent ones first (sorted() is stable, so search order breaks ties).
+    # More results than shown are ranked, so a frecent template just past
+    # `limit` in search order still makes it to the top
+    query = query.strip()
+    if query:
+        found = store.search(query, limit * SEARCH_DEPTH)
+        return sorted(found, key=lambda tpl: -usage.rank(tpl["id"]))[:limit]
+    rows: List[Dict[str, Any]] = []
+    seen = set()
+    for tid in usage.top(limit):
+        tpl = store.get_template_by_id(tid)
+        if tpl is not None:
+            rows.append(tpl)
+            seen.add(tid)
+    for cat_index in range(len(store.list_categories())):
+        if len(rows) >= limit:
+            break
+        for tpl in store.list_templates(cat_index):
+            if tpl["id"] not in seen:
+                rows.append(tpl)
+                if len(rows) >= limit:
+                    break
+    return rows